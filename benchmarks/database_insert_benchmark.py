@@ -0,0 +1,42 @@
+"""
+Compare the row-by-row INSERT path with the COPY based bulk-load path of DatabaseClient. Requires a local Postgres as
+configured in config/main-config.ini (see setup-db.sh). A separate database is used, the configured one is not touched.
+
+Usage: python -m benchmarks.database_insert_benchmark [n_rows]
+"""
+import sys
+import time
+
+from benchmarks.synthetic_klines import generate_klines
+from binance_bot.client.database_client import DatabaseClient
+from binance_bot.configs.main_config import DatabaseConfig, MainConfig
+
+
+def main(n_rows: int) -> None:
+    conf = MainConfig().DATABASE_CONFIG
+    client = DatabaseClient(DatabaseConfig(
+        host=conf.host,
+        port=conf.port,
+        dbname=conf.dbname + '_benchmark',
+        user=conf.user,
+        password=conf.password
+    ))
+    client.open_database_connection(recreate_db=True)
+    data = generate_klines(n_rows)
+
+    client.create_klines_table('insert_benchmark')
+    start = time.perf_counter()
+    client.insert_klines_into_table('insert_benchmark', data)
+    insert_rows_per_second = n_rows / (time.perf_counter() - start)
+
+    client.create_klines_table('copy_benchmark')
+    copied_rows, copy_seconds = client.copy_klines_into_table('copy_benchmark', data)
+    copy_rows_per_second = copied_rows / copy_seconds
+
+    client.close_database_connection()
+    print(f"INSERT: {insert_rows_per_second:.0f} rows/s")
+    print(f"COPY:   {copy_rows_per_second:.0f} rows/s ({copy_rows_per_second / insert_rows_per_second:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,369 @@
+"""
+Local stand-in for the order and account endpoints of the Binance REST API, for exercising OrderPipeline and
+BalanceLedger without touching the real exchange. Orders are kept in memory by client order id and filled right away at
+a fixed price; a configurable share of the order requests fails with a transient error, optionally after the order has
+been stored (like a response which got lost), and every order request is answered after a configurable latency. Like on
+the real exchange, test orders are only validated and never stored, so looking them up fails.
+Every fill is published as an execution report and an account position to the LocalUserDataStreams of the exchange.
+The klines endpoint serves a deterministic price series for every pair; throttle() makes the next kline requests fail
+with 429/418 and a Retry-After header, like the real API does when the request weight limit is exceeded.
+
+Usage: python -m benchmarks.fake_exchange [--port 8765] [--latency 0.05] [--failure-rate 0.1]
+       BinanceClient(credentials, api_url='http://127.0.0.1:8765/api', test_orders=False)
+"""
+import argparse
+import json
+import math
+import queue
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeExchange:
+
+    # Quote assets by which the pairs are split into their target and base symbol
+    QUOTE_ASSETS = ('USDT', 'BUSD', 'BTC', 'ETH', 'BNB')
+    KLINE_LIMIT = 1000
+
+    def __init__(
+            self,
+            pairs: List[str],
+            port: int = 0,
+            latency_seconds: float = 0.0,
+            failure_rate: float = 0.0,
+            seed: int = 0,
+            price: float = 1.0,
+            balance: float = 1000000.0,
+            kline_start_ms: int = 1500000000000,
+            kline_interval_ms: int = 60000
+    ):
+        """
+        Every order is filled at `price`, every asset of the pairs starts with a free balance of `balance`. Every pair
+        has a kline every kline_interval_ms (whatever interval is requested) from kline_start_ms until kline_end_ms,
+        which is the current time while it is None.
+        """
+        self.pairs = pairs
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.price = price
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.order_requests = 0
+        self.test_order_requests = 0
+        # Share of the order lookups which fail with a transient error
+        self.lookup_failure_rate = 0.0
+        self.kline_start_ms = kline_start_ms
+        self.kline_interval_ms = kline_interval_ms
+        self.kline_end_ms: Optional[int] = None
+        self.kline_requests = 0
+        self._throttles: Deque[Tuple[int, float]] = deque()
+        self.balances: Dict[str, List[float]] = {
+            symbol: [balance, 0.0] for pair in pairs for symbol in self.split_pair(pair)
+        }
+        self._event_listeners: List[Callable[[dict], None]] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._create_handler())
+        self.port = self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/api"
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @classmethod
+    def split_pair(cls, pair: str) -> Tuple[str, str]:
+        for quote_asset in cls.QUOTE_ASSETS:
+            if pair.endswith(quote_asset):
+                return pair[:-len(quote_asset)], quote_asset
+        raise ValueError(f"Unknown quote asset of {pair}")
+
+    def subscribe(self, on_event: Callable[[dict], None]) -> None:
+        """Call on_event with every event of the user data stream."""
+        self._event_listeners.append(on_event)
+
+    def _account(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'updateTime': int(time.time() * 1000),
+                'balances': [{'asset': symbol, 'free': f"{free:.8f}", 'locked': f"{locked:.8f}"}
+                             for symbol, (free, locked) in self.balances.items()]
+            }
+
+    def _fill(self, order: Dict[str, Any]) -> None:
+        """Update the balances with the fill of the order and publish it. Requires the lock to be held."""
+        target_symbol, base_symbol = self.split_pair(order['symbol'])
+        quantity = float(order['origQty'])
+        sign = 1 if order['side'] == 'BUY' else -1
+        self.balances[target_symbol][0] += sign * quantity
+        self.balances[base_symbol][0] -= sign * quantity * self.price
+        events = [{
+            'e': 'executionReport',
+            'E': order['transactTime'],
+            's': order['symbol'],
+            'c': order['clientOrderId'],
+            'S': order['side'],
+            'o': order['type'],
+            'x': 'TRADE',
+            'X': 'FILLED',
+            'l': order['origQty'],
+            'L': f"{self.price:.8f}",
+            'Y': f"{quantity * self.price:.8f}",
+            'n': '0',
+            'N': None,
+            'T': order['transactTime']
+        }, {
+            'e': 'outboundAccountPosition',
+            'E': order['transactTime'],
+            'u': order['transactTime'],
+            'B': [{'a': symbol, 'f': f"{self.balances[symbol][0]:.8f}", 'l': f"{self.balances[symbol][1]:.8f}"}
+                  for symbol in (target_symbol, base_symbol)]
+        }]
+        for event in events:
+            for on_event in self._event_listeners:
+                on_event(event)
+
+    def throttle(self, status: int = 429, retry_after_seconds: float = 1.0, requests: int = 1) -> None:
+        """Answer the next kline requests with the given status (429 or 418) and Retry-After header."""
+        with self._lock:
+            self._throttles.extend([(status, retry_after_seconds)] * requests)
+
+    def kline(self, pair: str, time_open: int) -> list:
+        """Return the kline of the pair opened at time_open in the format of the klines endpoint."""
+        step = (time_open - self.kline_start_ms) // self.kline_interval_ms
+        phase = sum(map(ord, pair))
+        close = self.price * (1 + 0.01 * math.sin((step + phase) / 10))
+        open_ = self.price * (1 + 0.01 * math.sin((step + phase - 1) / 10))
+        volume = 1000 + 500 * math.cos((step + phase) / 7)
+        return [time_open, f"{open_:.8f}", f"{max(open_, close) * 1.001:.8f}", f"{min(open_, close) * 0.999:.8f}",
+                f"{close:.8f}", f"{volume:.8f}", time_open + self.kline_interval_ms - 1, f"{volume * close:.8f}",
+                100, "0.0", "0.0", "0"]
+
+    def _klines(self, params: Dict[str, str]):
+        """Return the status code, body and headers of a klines request."""
+        with self._lock:
+            self.kline_requests += 1
+            if self._throttles:
+                status, retry_after = self._throttles.popleft()
+                return status, {'code': -1003, 'msg': 'Too many requests.'}, {'Retry-After': str(retry_after)}
+        interval = self.kline_interval_ms
+        end_ms = self.kline_end_ms if self.kline_end_ms is not None else int(time.time() * 1000)
+        if 'endTime' in params:
+            end_ms = min(end_ms, int(params['endTime']))
+        limit = min(int(params.get('limit', 500)), self.KLINE_LIMIT)
+        last_time_open = self.kline_start_ms + (end_ms - self.kline_start_ms) // interval * interval
+        if 'startTime' in params:
+            # Open time of the first kline at or after startTime
+            start_ms = int(params['startTime'])
+            first_time_open = max(self.kline_start_ms - (self.kline_start_ms - start_ms) // interval * interval,
+                                  self.kline_start_ms)
+        else:
+            first_time_open = max(last_time_open - (limit - 1) * interval, self.kline_start_ms)
+        time_opens = range(first_time_open, last_time_open + 1, interval)[:limit]
+        return 200, [self.kline(params['symbol'], time_open) for time_open in time_opens], {
+            'X-MBX-USED-WEIGHT-1M': str(self.kline_requests)
+        }
+
+    def _exchange_info(self) -> Dict[str, Any]:
+        return {'symbols': [{
+            'symbol': pair,
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'minPrice': '0.00000100', 'maxPrice': '100000.00000000',
+                 'tickSize': '0.00000100'},
+                {'filterType': 'LOT_SIZE', 'minQty': '0.10000000', 'maxQty': '9000000.00000000',
+                 'stepSize': '0.10000000'}
+            ]
+        } for pair in self.pairs]}
+
+    def _place_order(self, params: Dict[str, str]):
+        """Return the status code and body of an order request."""
+        time.sleep(self.latency_seconds)
+        client_order_id = params.get('newClientOrderId')
+        with self._lock:
+            self.order_requests += 1
+            fails = self._random.random() < self.failure_rate
+            response_lost = fails and self._random.random() < 0.5
+            if client_order_id in self.orders:
+                return 400, {'code': -2010, 'msg': 'Duplicate order sent.'}
+            if fails and not response_lost:
+                return 503, {'code': -1006, 'msg': 'Unexpected response from the message bus.'}
+            order = {
+                'symbol': params.get('symbol'),
+                'clientOrderId': client_order_id,
+                'side': params.get('side'),
+                'type': params.get('type'),
+                'origQty': params.get('quantity'),
+                'status': 'FILLED',
+                'transactTime': int(time.time() * 1000)
+            }
+            if client_order_id is not None:
+                self.orders[client_order_id] = order
+            self._fill(order)
+        if response_lost:
+            return 504, {'code': -1007, 'msg': 'Timeout waiting for response from backend server.'}
+        return 200, order
+
+    def _place_test_order(self, params: Dict[str, str]):
+        time.sleep(self.latency_seconds)
+        with self._lock:
+            self.test_order_requests += 1
+        if params.get('symbol') not in self.pairs:
+            return 400, {'code': -1121, 'msg': 'Invalid symbol.'}
+        return 200, {}
+
+    def _get_order(self, params: Dict[str, str]):
+        with self._lock:
+            if self._random.random() < self.lookup_failure_rate:
+                return 503, {'code': -1006, 'msg': 'Unexpected response from the message bus.'}
+            order = self.orders.get(params.get('origClientOrderId'))
+        if order is None:
+            return 400, {'code': -2013, 'msg': 'Order does not exist.'}
+        return 200, order
+
+    def _create_handler(self):
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _respond(self, status: int, body: Any, headers: Dict[str, str] = None) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _params(self) -> Dict[str, str]:
+                url = urlparse(self.path)
+                query = url.query
+                if self.command == 'POST':
+                    query += '&' + self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+                return {key: values[0] for key, values in parse_qs(query).items()}
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == '/api/v3/ping':
+                    self._respond(200, {})
+                elif path == '/api/v3/time':
+                    self._respond(200, {'serverTime': int(time.time() * 1000)})
+                elif path == '/api/v3/exchangeInfo':
+                    self._respond(200, exchange._exchange_info())
+                elif path == '/api/v3/order':
+                    self._respond(*exchange._get_order(self._params()))
+                elif path == '/api/v3/account':
+                    self._respond(200, exchange._account())
+                elif path == '/api/v3/klines':
+                    self._respond(*exchange._klines(self._params()))
+                else:
+                    self._respond(404, {'code': -1000, 'msg': 'Unknown path.'})
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                if path == '/api/v3/order':
+                    self._respond(*exchange._place_order(self._params()))
+                elif path == '/api/v3/order/test':
+                    self._respond(*exchange._place_test_order(self._params()))
+                elif path == '/api/v3/userDataStream':
+                    self._respond(200, {'listenKey': 'local'})
+                else:
+                    self._respond(404, {'code': -1000, 'msg': 'Unknown path.'})
+
+            def do_PUT(self):
+                if urlparse(self.path).path == '/api/v3/userDataStream':
+                    self._respond(200, {})
+                else:
+                    self._respond(404, {'code': -1000, 'msg': 'Unknown path.'})
+
+            def log_message(self, *_):
+                pass
+
+        return Handler
+
+
+class LocalUserDataStream:
+    """
+    Stand-in for UserDataStream which receives the events of a FakeExchange. Events are delivered from a thread of the
+    stream after a latency; a configurable share of them is lost, which has to be repaired by reconciliation.
+    """
+
+    def __init__(self, exchange: FakeExchange, latency_seconds: float = 0.0, loss_rate: float = 0.0, seed: int = 0):
+        self._exchange = exchange
+        self._latency_seconds = latency_seconds
+        self._loss_rate = loss_rate
+        self._random = random.Random(seed)
+        self._event_listeners: List[Callable[[dict], None]] = []
+        self._reconnect_listeners: List[Callable[[], None]] = []
+        self._events: queue.Queue = queue.Queue()
+        self._thread = None
+        self.lost = 0
+
+    def add_listener(self, on_event: Callable[[dict], None], on_reconnect: Callable[[], None] = None) -> None:
+        self._event_listeners.append(on_event)
+        if on_reconnect is not None:
+            self._reconnect_listeners.append(on_reconnect)
+
+    def start(self) -> None:
+        self._exchange.subscribe(self._events.put)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._events.put(None)
+        self._thread.join()
+
+    def join(self) -> None:
+        """Block until all events published so far have been delivered."""
+        self._events.join()
+
+    def reconnect(self) -> None:
+        """Simulate a reconnect, after which the listeners have to catch up on missed events."""
+        for on_reconnect in self._reconnect_listeners:
+            on_reconnect()
+
+    def _run(self) -> None:
+        while True:
+            event = self._events.get()
+            try:
+                if event is None:
+                    return
+                time.sleep(self._latency_seconds)
+                if self._random.random() < self._loss_rate:
+                    self.lost += 1
+                    continue
+                for on_event in self._event_listeners:
+                    on_event(event)
+            finally:
+                self._events.task_done()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help="latency of order requests in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.1, help="share of order requests which fail")
+    parser.add_argument('--pairs', default='VETUSDT', help="comma separated list of tradable pairs")
+    args = parser.parse_args()
+    fake_exchange = FakeExchange(
+        pairs=args.pairs.split(','),
+        port=args.port,
+        latency_seconds=args.latency,
+        failure_rate=args.failure_rate
+    )
+    print(f"Fake exchange listening on {fake_exchange.api_url}")
+    fake_exchange._server.serve_forever()
@@ -0,0 +1,184 @@
+"""
+Local stand-in for the combined kline websocket streams of Binance, for exercising KlineStream without touching the
+real exchange. It implements just enough of RFC 6455 for websocket-client: the handshake, unmasked text frames from the
+server and close/ping frames from the client. The klines are the ones the klines endpoint of a FakeExchange serves, so
+a KlineStream can backfill its windows from the same exchange.
+
+Usage: LocalKlineWebSocket(fake_exchange).start()
+       KlineStream(client, pairs, interval, base_url=local_kline_websocket.base_url)
+"""
+import base64
+import hashlib
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_exchange import FakeExchange
+
+_HANDSHAKE_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+_OPCODE_TEXT = 0x1
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+
+
+def _encode_frame(opcode: int, payload: bytes) -> bytes:
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + struct.pack('!H', len(payload))
+    else:
+        header += bytes([127]) + struct.pack('!Q', len(payload))
+    return header + payload
+
+
+class LocalKlineWebSocket:
+
+    def __init__(self, exchange: FakeExchange, port: int = 0):
+        self._exchange = exchange
+        self._connections: List['_Connection'] = []
+        self._lock = threading.Lock()
+        self._connected = threading.Condition(self._lock)
+        self.connection_count = 0
+        websocket_server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+                connection = _Connection(self.request, self.rfile)
+                if not connection.handshake():
+                    return
+                with websocket_server._lock:
+                    websocket_server._connections.append(connection)
+                    websocket_server.connection_count += 1
+                    websocket_server._connected.notify_all()
+                try:
+                    connection.receive_until_closed()
+                finally:
+                    with websocket_server._lock:
+                        if connection in websocket_server._connections:
+                            websocket_server._connections.remove(connection)
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.disconnect()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def wait_for_connections(self, count: int, timeout: float = 5.0) -> bool:
+        """Block until `count` connections have been opened since the start, return False if the timeout expired."""
+        with self._connected:
+            return self._connected.wait_for(lambda: self.connection_count >= count, timeout=timeout)
+
+    def close_candle(self, time_open: int, pairs: List[str] = None) -> None:
+        """Publish the closed kline opened at time_open of the given pairs (default: all subscribed ones)."""
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            for pair in connection.pairs:
+                if pairs is None or pair in pairs:
+                    connection.send_text(json.dumps(self._message(pair, time_open)))
+
+    def disconnect(self) -> None:
+        """Drop all connections without a close handshake, like a network failure."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.abort()
+
+    def _message(self, pair: str, time_open: int) -> dict:
+        kline = self._exchange.kline(pair, time_open)
+        return {
+            'stream': f"{pair.lower()}@kline",
+            'data': {
+                'e': 'kline',
+                'E': int(time.time() * 1000),
+                's': pair,
+                'k': {
+                    't': kline[0], 'T': kline[6], 's': pair, 'o': kline[1], 'h': kline[2], 'l': kline[3],
+                    'c': kline[4], 'v': kline[5], 'n': kline[8], 'x': True, 'q': kline[7]
+                }
+            }
+        }
+
+
+class _Connection:
+
+    def __init__(self, sock: socket.socket, rfile):
+        self._socket = sock
+        self._rfile = rfile
+        self._send_lock = threading.Lock()
+        self.pairs: List[str] = []
+
+    def handshake(self) -> bool:
+        request_line = self._rfile.readline().decode()
+        headers = {}
+        while True:
+            line = self._rfile.readline().decode().strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'sec-websocket-key' not in headers:
+            return False
+        streams = parse_qs(urlparse(request_line.split(' ')[1]).query).get('streams', [''])[0]
+        self.pairs = [stream.split('@')[0].upper() for stream in streams.split('/') if stream]
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + _HANDSHAKE_GUID).encode()).digest())
+        self._socket.sendall(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\n'
+            b'Connection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n'
+        )
+        return True
+
+    def send_text(self, text: str) -> None:
+        self._send(_OPCODE_TEXT, text.encode())
+
+    def abort(self) -> None:
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def receive_until_closed(self) -> None:
+        """Answer the control frames of the client until it closes the connection or the connection is lost."""
+        while True:
+            header = self._rfile.read(2)
+            if len(header) < 2:
+                return
+            opcode, length = header[0] & 0x0F, header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', self._rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', self._rfile.read(8))[0]
+            mask = self._rfile.read(4) if header[1] & 0x80 else bytes(4)
+            payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(self._rfile.read(length)))
+            if opcode == _OPCODE_CLOSE:
+                self._send(_OPCODE_CLOSE, payload[:2])
+                return
+            if opcode == _OPCODE_PING:
+                self._send(_OPCODE_PONG, payload)
+
+    def _send(self, opcode: int, payload: bytes) -> None:
+        try:
+            with self._send_lock:
+                self._socket.sendall(_encode_frame(opcode, payload))
+        except OSError:
+            pass
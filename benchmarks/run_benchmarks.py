@@ -0,0 +1,313 @@
+"""
+Offline benchmark suite for the hot paths of the bot. All data is synthetic, the database benchmarks are only run with
+--database and require a local Postgres as configured in config/main-config.ini (see setup-db.sh).
+The results are written as JSON so that they can be compared between branches.
+
+Usage: python -m benchmarks.run_benchmarks [--output results.json] [--rows 1000000] [--database]
+"""
+import argparse
+import datetime as dt
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.fake_exchange import FakeExchange, LocalUserDataStream
+from benchmarks.synthetic_klines import generate_klines, generate_klines_response, generate_pairs
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.database_client import DatabaseClient
+from binance_bot.client.kline_parser import KlineParser
+from binance_bot.configs.credentials import Credentials
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.configs.main_config import DatabaseConfig, MainConfig
+from binance_bot.executor.batch_simulator import BatchSimulator
+from binance_bot.executor.order_pipeline import OrderPipeline
+from binance_bot.executor.training_executor import TrainingExecutor
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.processing.timestamp_aligner import TimestampAligner
+from binance_bot.state.balance_ledger import BalanceLedger
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.state.training_state import TrainingState
+from binance_bot.strategy.random_strategy import RandomStrategy
+from binance_bot.strategy.strategy_action import StrategyAction
+
+
+def measure(name: str, function: Callable[[], Any], repeats: int, **params) -> Dict[str, Any]:
+    """Call the function `repeats` times and return the timing statistics in seconds."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    result = {
+        'name': name,
+        'params': params,
+        'repeats': repeats,
+        'min_s': min(durations),
+        'median_s': float(np.median(durations)),
+        'mean_s': float(np.mean(durations)),
+        'max_s': max(durations)
+    }
+    print(f"{name} {params}: median {result['median_s'] * 1000:.3f} ms")
+    return result
+
+
+# Share of the klines of the feature pairs which are missing, so that the alignment has something to do
+MISSING_RATE = 0.01
+
+
+def bench_calculate_features(
+        main_config: MainConfig,
+        feature_calc: FeatureCalculator,
+        rows: int
+) -> List[Dict[str, Any]]:
+    """Calculate the features of the target pair alone and with the aligned klines of the feature pairs."""
+    aligner = TimestampAligner(main_config.MISSING_KLINE_POLICY)
+    feature_pairs = main_config.FEATURE_PAIRS or []
+    results = []
+    for window_size in [500, 5000, 50000, rows]:
+        tables = generate_pairs([main_config.TARGET_PAIR] + feature_pairs, window_size, missing_rate=MISSING_RATE)
+        klines = tables[main_config.TARGET_PAIR]
+
+        def calculate_with_feature_pairs():
+            target, aligned = aligner.align_dataframes(klines, {pair: tables[pair] for pair in feature_pairs})
+            return feature_calc.calculate_features(target, aligned)
+
+        repeats = max(3, min(100, 500000 // window_size))
+        results.append(measure(
+            'FeatureCalculator.calculate_features',
+            lambda: feature_calc.calculate_features(klines),
+            repeats=repeats,
+            window_size=window_size
+        ))
+        results.append(measure(
+            'FeatureCalculator.calculate_features',
+            calculate_with_feature_pairs,
+            repeats=repeats,
+            window_size=window_size,
+            feature_pairs=len(feature_pairs),
+            policy=aligner.policy
+        ))
+    return results
+
+
+def bench_training(main_config: MainConfig, feature_calc: FeatureCalculator, rows: int) -> List[Dict[str, Any]]:
+    feature_pairs = main_config.FEATURE_PAIRS or []
+    tables = generate_pairs([main_config.TARGET_PAIR] + feature_pairs, rows, missing_rate=MISSING_RATE)
+    state = TrainingState(
+        main_config=main_config,
+        feature_calculator=feature_calc,
+        target_pair_table=tables[main_config.TARGET_PAIR],
+        feature_pair_tables={pair: tables[pair] for pair in feature_pairs}
+    )
+    strategy = RandomStrategy(main_config)
+    executor = TrainingExecutor(state=state, main_config=main_config)
+    state.next_batch()
+
+    def run_epoch():
+        state.next_batch()
+        for _ in range(0, state.BATCH_SIZE):
+            state.next_step()
+            action = strategy.apply(klines=state.klines, features=state.features, assets=state.assets)
+            executor.execute(action)
+
+    return [
+        measure('TrainingState.next_step', state.next_step, repeats=state.BATCH_SIZE, rows=rows,
+                feature_pairs=len(feature_pairs)),
+        measure('train.epoch', run_epoch, repeats=5, rows=rows, batch_size=state.BATCH_SIZE,
+                feature_pairs=len(feature_pairs))
+    ]
+
+
+def bench_batch_backtest(main_config: MainConfig, rows: int) -> List[Dict[str, Any]]:
+    klines = generate_klines(rows)
+    strategy = RandomStrategy(main_config, seed=0)
+    simulator = BatchSimulator(main_config)
+
+    def backtest():
+        assets = Portfolio(symbols=[main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL], free=[0, 10000])
+        simulator.run(strategy, klines=klines, features=klines, assets=assets)
+
+    return [measure('BatchSimulator.run', backtest, repeats=5, rows=rows)]
+
+
+def bench_order_pipeline(main_config: MainConfig, orders: int = 200) -> List[Dict[str, Any]]:
+    """Submit orders against a local fake exchange with latency and transient failures."""
+    exchange = FakeExchange(pairs=[main_config.TARGET_PAIR], latency_seconds=0.005, failure_rate=0.1)
+    exchange.start()
+    client = BinanceClient(Credentials(api_key='benchmark', api_secret='benchmark'), api_url=exchange.api_url,
+                           test_orders=False)
+    pipeline = OrderPipeline(client, max_queue_size=orders, backoff_seconds=0.01)
+    pipeline.start()
+
+    def submit():
+        for _ in range(orders):
+            pipeline.execute(StrategyAction(side="BUY", pair=main_config.TARGET_PAIR, quantity=1.23456))
+        pipeline.join()
+
+    result = measure('OrderPipeline.execute', submit, repeats=1, orders=orders)
+    result.update({
+        'submitted': pipeline.submitted,
+        'failed': pipeline.failed,
+        'retries': pipeline.retries,
+        # Equal to `submitted` if no order was placed twice
+        'orders_on_exchange': len(exchange.orders)
+    })
+    pipeline.stop()
+    exchange.stop()
+    return [result]
+
+
+def bench_balance_ledger(main_config: MainConfig, orders: int = 200) -> List[Dict[str, Any]]:
+    """
+    Trade against a local fake exchange whose user data stream loses some events, and compare the balances of the
+    ledger with the ones of the exchange before and after a reconciliation.
+    """
+    exchange = FakeExchange(pairs=[main_config.TARGET_PAIR], price=0.05)
+    exchange.start()
+    client = BinanceClient(Credentials(api_key='benchmark', api_secret='benchmark'), api_url=exchange.api_url,
+                           test_orders=False)
+    stream = LocalUserDataStream(exchange, loss_rate=0.05)
+    ledger = BalanceLedger(
+        client,
+        stream,
+        pairs={main_config.TARGET_PAIR: (main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL)},
+        reconcile_interval_seconds=3600
+    )
+    ledger.start()
+    pipeline = OrderPipeline(client, max_queue_size=orders)
+    pipeline.start()
+    for order in range(orders):
+        side = "BUY" if order % 3 else "SELL"
+        pipeline.execute(StrategyAction(side=side, pair=main_config.TARGET_PAIR, quantity=1.5))
+    pipeline.join()
+    stream.join()
+    symbols = [main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL]
+
+    def drift() -> float:
+        portfolio = ledger.get_portfolio(symbols)
+        return float(max(abs(portfolio.get_free(symbol) - exchange.balances[symbol][0]) for symbol in symbols))
+
+    result = measure('BalanceLedger.get_portfolio', lambda: ledger.get_portfolio(symbols), repeats=1000)
+    result.update({
+        'orders': orders,
+        'events': ledger.events,
+        'lost_events': stream.lost,
+        'drift_before_reconcile': drift()
+    })
+    ledger.reconcile()
+    result['drift_after_reconcile'] = drift()
+    print(f"Balance drift {result['drift_before_reconcile']} before and {result['drift_after_reconcile']} after "
+          f"reconciling, {stream.lost} of {stream.lost + ledger.events} events lost")
+    pipeline.stop()
+    ledger.stop()
+    exchange.stop()
+    return [result]
+
+
+def measure_peak_memory(function: Callable[[], Any]) -> float:
+    """Return the peak of the memory allocated while the function runs (including its result) in MB."""
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak / 2 ** 20
+
+
+def bench_klines_parsing(rows: int) -> List[Dict[str, Any]]:
+    """Parse a history of 12 field klines at once and page by page, as while paging through the klines-API."""
+    response = generate_klines_response(rows)
+    page_limit = BinanceClient.KLINES_PAGE_LIMIT
+
+    def parse_all():
+        return BinanceClient._klines_to_dataframe(response)
+
+    def parse_pages():
+        parser = KlineParser(len(response))
+        for start in range(0, len(response), page_limit):
+            parser.add_page(response[start:start + page_limit])
+        return parser.to_dataframe()
+
+    results = [
+        measure('BinanceClient._klines_to_dataframe', parse_all, repeats=5, rows=rows),
+        measure('KlineParser.add_page', parse_pages, repeats=5, rows=rows, page_limit=page_limit)
+    ]
+    for result, function in zip(results, [parse_all, parse_pages]):
+        result['rows_per_s'] = rows / result['median_s']
+        result['peak_memory_mb'] = measure_peak_memory(function)
+        print(f"{result['name']}: {result['rows_per_s']:.0f} rows/s, peak memory {result['peak_memory_mb']:.1f} MB")
+    return results
+
+
+def bench_database(main_config: MainConfig, rows: int) -> List[Dict[str, Any]]:
+    conf = main_config.DATABASE_CONFIG
+    client = DatabaseClient(DatabaseConfig(
+        host=conf.host,
+        port=conf.port,
+        dbname=conf.dbname + '_benchmark',
+        user=conf.user,
+        password=conf.password
+    ))
+    client.open_database_connection(recreate_db=True)
+    klines = generate_klines(rows)
+    tables = iter(range(1000))
+
+    def insert(method: Callable):
+        table = f"benchmark_{next(tables)}"
+        client.create_klines_table(table)
+        method(table, klines)
+
+    results = [
+        measure('DatabaseClient.insert_klines_into_table', lambda: insert(client.insert_klines_into_table),
+                repeats=1, rows=rows),
+        measure('DatabaseClient.copy_klines_into_table', lambda: insert(client.copy_klines_into_table),
+                repeats=3, rows=rows),
+        measure('DatabaseClient.read_table', lambda: client.read_table('benchmark_0'), repeats=3, rows=rows)
+    ]
+    client.close_database_connection()
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument('--output', default='benchmark-results.json', help="path of the JSON result file")
+    parser.add_argument('--rows', type=int, default=1000000, help="number of synthetic klines per pair")
+    parser.add_argument('--database', action='store_true', help="also run the benchmarks against a local Postgres")
+    args = parser.parse_args()
+
+    main_config = MainConfig()
+    feature_calc = FeatureCalculator(FeatureConfig())
+    results = bench_calculate_features(main_config, feature_calc, args.rows) \
+        + bench_training(main_config, feature_calc, args.rows) \
+        + bench_batch_backtest(main_config, args.rows) \
+        + bench_klines_parsing(args.rows) \
+        + bench_order_pipeline(main_config) \
+        + bench_balance_ledger(main_config)
+    if args.database:
+        results += bench_database(main_config, min(args.rows, 100000))
+
+    with open(args.output, 'w') as output_file:
+        json.dump({
+            'revision': git_revision(),
+            'timestamp': dt.datetime.now(dt.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results
+        }, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
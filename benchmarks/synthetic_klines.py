@@ -0,0 +1,53 @@
+"""Offline generator of synthetic OHLCV klines for benchmarks."""
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.constants import KlineProps
+
+
+def generate_klines(
+        n_rows: int,
+        seed: int = 0,
+        start_ms: int = 1500000000000,
+        interval_ms: int = 60000
+) -> pd.DataFrame:
+    """Return n_rows klines of a geometric random walk in the format of BinanceClient._klines_to_dataframe."""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n_rows)))
+    opens = np.concatenate([[closes[0]], closes[:-1]])
+    spread = np.abs(rng.normal(0, 0.0005, n_rows))
+    return pd.DataFrame({
+        KlineProps.TIME_OPEN: start_ms + np.arange(n_rows, dtype=np.float64) * interval_ms,
+        KlineProps.OPEN: opens,
+        KlineProps.HIGH: np.maximum(opens, closes) * (1 + spread),
+        KlineProps.LOW: np.minimum(opens, closes) * (1 - spread),
+        KlineProps.CLOSE: closes,
+        KlineProps.VOLUME: rng.exponential(1000, n_rows)
+    })
+
+
+def generate_pairs(pairs: List[str], n_rows: int, seed: int = 0, missing_rate: float = 0.0) -> Dict[str, pd.DataFrame]:
+    """
+    Return n_rows klines for every pair over the same timeline. A share of missing_rate of the klines of every pair but
+    the first one is left out, so that the pairs have to be aligned to the first one.
+    """
+    tables = {}
+    for i, pair in enumerate(pairs):
+        klines = generate_klines(n_rows, seed=seed + i)
+        if i > 0 and missing_rate > 0:
+            keep = np.random.default_rng(seed + i).random(n_rows) >= missing_rate
+            klines = klines[keep].reset_index(drop=True)
+        tables[pair] = klines
+    return tables
+
+
+def generate_klines_response(n_rows: int, seed: int = 0, interval_ms: int = 60000) -> List[list]:
+    """Return n_rows klines in the raw format of the klines API (list of 12 fields, prices as strings)."""
+    klines = generate_klines(n_rows, seed=seed, interval_ms=interval_ms)
+    return [
+        [int(row[0]), f"{row[1]:.8f}", f"{row[2]:.8f}", f"{row[3]:.8f}", f"{row[4]:.8f}", f"{row[5]:.8f}",
+         int(row[0]) + interval_ms - 1, "0.0", 100, "0.0", "0.0", "0"]
+        for row in klines.itertuples(index=False)
+    ]
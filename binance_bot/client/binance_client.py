@@ -1,50 +1,217 @@
 import datetime as dt
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 from binance.client import Client
+from binance.exceptions import BinanceAPIException
+from binance.helpers import interval_to_milliseconds
 
+from binance_bot.client.kline_parser import KlineParser
+from binance_bot.client.request_weight_budget import RequestWeightBudget
 from binance_bot.configs.credentials import Credentials
-from binance_bot.constants import KlineProps, OrderProps, AssetProps
+from binance_bot.constants import AssetProps
 
 
 class BinanceClient:
 
-    def __init__(self, credentials: Credentials):
-        self._client = Client(api_key=credentials.API_KEY, api_secret=credentials.API_SECRET)
+    # Number of requests which can be in flight at the same time, each thread keeps its own keep-alive connection
+    MAX_CONCURRENT_REQUESTS = 16
+
+    # Error code of the API for an order which does not exist
+    UNKNOWN_ORDER_CODE = -2013
+
+    # Maximum number of klines per request of the klines-API
+    KLINES_PAGE_LIMIT = 1000
+
+    # Request weight of a klines request with KLINES_PAGE_LIMIT klines
+    KLINES_PAGE_WEIGHT = 2
+
+    # Status codes of the API for exceeded request limits (429) and for a ban after ignoring them (418)
+    RETRY_STATUS_CODES = (429, 418)
+
+    # Number of times a klines page is requested again after the API rejected it for exceeded request limits
+    MAX_RETRIES = 5
+
+    def __init__(
+            self,
+            credentials: Credentials,
+            api_url: str = None,
+            test_orders: bool = True,
+            budget: RequestWeightBudget = None,
+            backoff_seconds: float = 1.0
+    ):
+        """
+        Create a client for the Binance API. api_url replaces the REST endpoint (e.g. http://localhost:8765/api for a
+        local fake exchange); it has to be known before the client is created, since the client pings it right away.
+        With test_orders, orders are sent to the test endpoint, which validates them but neither places nor stores them.
+        Every thread which sends requests gets its own python-binance Client, which stores the last response on the
+        instance and therefore must not be shared between threads. The klines pages of get_historical_data are throttled
+        by the request weight budget, which can be shared with a KlineDownloader.
+        """
+        self._client_class = Client if api_url is None else type('LocalClient', (Client,), {'API_URL': api_url})
+        self._credentials = credentials
+        self._test_orders = test_orders
+        self._budget = budget or RequestWeightBudget()
+        self._backoff_seconds = backoff_seconds
+        self._thread_local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS)
+        self.request_timings: Dict[str, float] = {}
+        # The client of the creating thread is created right away, so that an unreachable API is reported here
+        self._thread_local.client = self._create_client()
+
+    @property
+    def _client(self) -> Client:
+        """The python-binance Client of the calling thread."""
+        if not hasattr(self._thread_local, 'client'):
+            self._thread_local.client = self._create_client()
+        return self._thread_local.client
+
+    def _create_client(self) -> Client:
+        return self._client_class(api_key=self._credentials.API_KEY, api_secret=self._credentials.API_SECRET)
+
+    def run_concurrently(self, requests: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Issue the given named requests concurrently from the thread pool and return their results by name. The
+        duration of each request in seconds is stored in request_timings.
+        """
+        def timed(request: Callable[[], Any]):
+            start = time.perf_counter()
+            result = request()
+            return result, time.perf_counter() - start
+
+        futures = {name: self._executor.submit(timed, request) for name, request in requests.items()}
+        results = {}
+        for name, future in futures.items():
+            results[name], self.request_timings[name] = future.result()
+        return results
 
     def place_order_sell_market(self, pair: str, quantity: np.double) -> None:
-        print("SELL", str(quantity), pair)
-        self._client.create_test_order(
-            symbol=pair,
-            side=Client.SIDE_SELL,
-            type=Client.ORDER_TYPE_MARKET,
-            quantity=quantity
-        )
+        self.place_order_market(pair=pair, side=Client.SIDE_SELL, quantity=quantity)
 
     def place_order_buy_market(self, pair: str, quantity: np.double) -> None:
-        print("BUY", str(quantity), pair)
-        self._client.create_test_order(
+        self.place_order_market(pair=pair, side=Client.SIDE_BUY, quantity=quantity)
+
+    def place_order_market(
+            self,
+            pair: str,
+            side: str,
+            quantity: Union[np.double, str],
+            client_order_id: str = None
+    ) -> None:
+        """
+        Place a market order. The exchange rejects a second order with the same client_order_id, which makes retries of
+        an order idempotent. Test orders are not stored, so they are neither rejected as duplicates nor found by
+        get_order_by_client_id.
+        """
+        print(side, str(quantity), pair)
+        params = {'newClientOrderId': client_order_id} if client_order_id is not None else {}
+        create_order = self._client.create_test_order if self._test_orders else self._client.create_order
+        create_order(
             symbol=pair,
-            side=Client.SIDE_BUY,
+            side=side,
             type=Client.ORDER_TYPE_MARKET,
-            quantity=quantity
+            quantity=quantity,
+            **params
         )
 
-    def get_historical_data(self, pair: str, interval: str) -> pd.DataFrame:
-        response = self._client.get_historical_klines(symbol=pair, interval=interval, start_str=0)
-        return self._klines_to_dataframe(np.array(response))
+    def get_order_by_client_id(self, pair: str, client_order_id: str) -> Optional[Dict[str, Any]]:
+        """Return the order with the given client order id, or None if the exchange does not know it."""
+        try:
+            return self._client.get_order(symbol=pair, origClientOrderId=client_order_id)
+        except BinanceAPIException as e:
+            if e.code == self.UNKNOWN_ORDER_CODE:
+                return None
+            raise
 
-    def get_klines(self, pair: str, interval: str) -> pd.DataFrame:
-        response = self._client.get_klines(symbol=pair, interval=interval)
-        return self._klines_to_dataframe(np.array(response))
+    def get_symbol_filters(self, pair: str) -> Dict[str, Dict[str, Any]]:
+        """Return the trading rules of the pair (e.g. LOT_SIZE, PRICE_FILTER) by filter type."""
+        symbol_info = self._client.get_symbol_info(pair)
+        return {symbol_filter['filterType']: symbol_filter for symbol_filter in symbol_info['filters']}
+
+    def get_historical_data(self, pair: str, interval: str, start_ms: int = 0) -> pd.DataFrame:
+        """
+        Download all klines which were opened at or after start_ms (unix timestamp in milliseconds). Each page is parsed
+        as soon as it arrives; the buffers are sized after the first page for all klines up to the current server time.
+        """
+        page = self._get_klines_page(pair, interval, start_ms)
+        if len(page) == 0:
+            return KlineParser().to_dataframe()
+        interval_ms = interval_to_milliseconds(interval)
+        # Monthly klines have no fixed length, their buffers simply grow
+        capacity = (self.get_server_time_ms() - page[0][0]) // interval_ms + 1 if interval_ms is not None else 0
+        parser = KlineParser(max(capacity, len(page)))
+        parser.add_page(page)
+        while len(page) == self.KLINES_PAGE_LIMIT:
+            page = self._get_klines_page(pair, interval, parser.last_time_open() + 1)
+            parser.add_page(page)
+        return parser.to_dataframe()
+
+    def _get_klines_page(self, pair: str, interval: str, start_ms: int) -> List[list]:
+        """
+        Request one page of klines within the request weight budget. The budget is aligned with the weight the API
+        reports as used; after a 429 or 418 it is paused for the Retry-After time before the page is requested again.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._budget.acquire(self.KLINES_PAGE_WEIGHT)
+            try:
+                page = self._client.get_klines(
+                    symbol=pair, interval=interval, startTime=start_ms, limit=self.KLINES_PAGE_LIMIT
+                )
+            except BinanceAPIException as e:
+                if e.status_code not in self.RETRY_STATUS_CODES or attempt == self.MAX_RETRIES:
+                    raise
+                retry_after = e.response.headers.get('Retry-After') if e.response is not None else None
+                self._budget.pause(float(retry_after or self._backoff_seconds * 2 ** attempt))
+                continue
+            used_weight = self._client.response.headers.get('X-MBX-USED-WEIGHT-1M')
+            if used_weight is not None:
+                self._budget.sync_used_weight(int(used_weight))
+            return page
+
+    def get_klines(self, pair: str, interval: str, start_ms: int = None, limit: int = 500) -> pd.DataFrame:
+        """
+        Return the latest `limit` klines, or with start_ms, the first `limit` klines which were opened at or after
+        start_ms. The request weight and the response size grow with the limit.
+        """
+        params = {'startTime': start_ms} if start_ms is not None else {}
+        response = self._client.get_klines(symbol=pair, interval=interval, limit=limit, **params)
+        return self._klines_to_dataframe(response)
+
+    def get_server_time_ms(self) -> int:
+        return self._client.get_server_time()['serverTime']
 
     def get_open_orders(self) -> pd.DataFrame:
         return pd.DataFrame(self._client.get_open_orders())
 
+    def get_asset_balance(self, symbol: str) -> Dict[str, str]:
+        return self._client.get_asset_balance(asset=symbol)
+
+    def get_account_balances(self) -> Tuple[Dict[str, Dict[str, str]], int]:
+        """
+        Return the balances of all assets of the account by symbol, in the format of get_asset_balance, and the time of
+        the last update of the account in milliseconds.
+        """
+        account = self._client.get_account()
+        return {balance['asset']: balance for balance in account['balances']}, account['updateTime']
+
+    def create_listen_key(self) -> str:
+        """Start a user data stream and return its listen key, which expires 60 minutes after the last keepalive."""
+        return self._client.stream_get_listen_key()
+
+    def keepalive_listen_key(self, listen_key: str) -> None:
+        self._client.stream_keepalive(listen_key)
+
     def get_assets(self, symbols: List[str]) -> pd.DataFrame:
-        return pd.DataFrame([self._client.get_asset_balance(asset=asset) for asset in symbols])\
+        balances, _ = self.get_account_balances()
+        return self.asset_balances_to_dataframe([balances[symbol] for symbol in symbols])
+
+    @staticmethod
+    def asset_balances_to_dataframe(balances: List[Dict[str, str]]) -> pd.DataFrame:
+        return pd.DataFrame(balances)\
             .astype({AssetProps.ASSET: 'str', AssetProps.FREE: 'float64', AssetProps.LOCKED: 'float64'})
 
     @staticmethod
@@ -55,16 +222,8 @@ class BinanceClient:
         return time_str
 
     @staticmethod
-    def _klines_to_dataframe(klines: np.ndarray) -> pd.DataFrame:
-        """
-        Convert the response from the klines-API to a dataframe.
-        https://binance-docs.github.io/apidocs/spot/en/#kline-candlestick-data
-        """
-        return pd.DataFrame({
-            KlineProps.TIME_OPEN: klines[:, 0],
-            KlineProps.OPEN: klines[:, 1],
-            KlineProps.HIGH: klines[:, 2],
-            KlineProps.LOW: klines[:, 3],
-            KlineProps.CLOSE: klines[:, 4],
-            KlineProps.VOLUME: klines[:, 5]
-        }).astype(float)
+    def _klines_to_dataframe(klines: List[list]) -> pd.DataFrame:
+        """Convert the response from the klines-API to a dataframe, see KlineParser."""
+        parser = KlineParser(len(klines))
+        parser.add_page(klines)
+        return parser.to_dataframe()
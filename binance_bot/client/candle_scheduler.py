@@ -0,0 +1,84 @@
+import time
+from typing import Callable
+
+from binance.helpers import interval_to_milliseconds
+
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.instrumentation import instrumentation
+
+
+class CandleScheduler:
+    """
+    Wake up right after each candle close according to the clock of the exchange. The offset between the local clock
+    and the server time is measured with the request of lowest round trip time out of a few and refreshed periodically,
+    so local clock drift does not shift the wake-up time. After the interval boundary has passed on the server clock,
+    the scheduler polls with a short, growing backoff until the closed candle is available, and logs how late it was.
+    """
+
+    CLOCK_SAMPLES = 5
+    CLOCK_SYNC_INTERVAL_SECONDS = 600
+    # Time after the boundary before the first poll, the exchange needs a moment to close the candle
+    CLOSE_GUARD_MS = 5
+    MIN_POLL_BACKOFF_SECONDS = 0.002
+    MAX_POLL_BACKOFF_SECONDS = 0.1
+
+    def __init__(self, client: BinanceClient, interval: str, poll_timeout_seconds: float = 10.0):
+        self._client = client
+        self._interval_ms = interval_to_milliseconds(interval)
+        self._poll_timeout_seconds = poll_timeout_seconds
+        # Server time minus local time in milliseconds
+        self.offset_ms = 0.0
+        self._last_sync = None
+        self._next_close_ms = None
+
+    def sync_clock(self) -> None:
+        """Measure the offset to the server time. The estimate of the request with the lowest round trip time wins."""
+        best_round_trip = None
+        for _ in range(self.CLOCK_SAMPLES):
+            start_ms = time.time() * 1000
+            server_ms = self._client.get_server_time_ms()
+            end_ms = time.time() * 1000
+            if best_round_trip is None or end_ms - start_ms < best_round_trip:
+                best_round_trip = end_ms - start_ms
+                # Assume that the server read its clock halfway through the request
+                self.offset_ms = server_ms - (start_ms + end_ms) / 2
+        self._last_sync = time.monotonic()
+
+    def server_time_ms(self) -> float:
+        return time.time() * 1000 + self.offset_ms
+
+    def wait_for_close(self, is_closed: Callable[[int], bool]) -> int:
+        """
+        Sleep until the current candle has been closed on the server clock, then poll is_closed(time_open) until it
+        returns True or the poll timeout has expired. Return the open time of the closed candle. If the caller was busy
+        for longer than an interval, the missed candles are skipped and the latest closed one is returned immediately.
+        """
+        if self._last_sync is None or time.monotonic() - self._last_sync > self.CLOCK_SYNC_INTERVAL_SECONDS:
+            self.sync_clock()
+        last_close_ms = self.server_time_ms() // self._interval_ms * self._interval_ms
+        if self._next_close_ms is None:
+            self._next_close_ms = last_close_ms + self._interval_ms
+        elif self._next_close_ms < last_close_ms:
+            print(f"Skipping {int((last_close_ms - self._next_close_ms) // self._interval_ms)} missed candles")
+            self._next_close_ms = last_close_ms
+        close_ms = self._next_close_ms
+        time_open = int(close_ms - self._interval_ms)
+        sleep_seconds = (close_ms + self.CLOSE_GUARD_MS - self.server_time_ms()) / 1000
+        if sleep_seconds > 0:
+            time.sleep(sleep_seconds)
+
+        backoff = self.MIN_POLL_BACKOFF_SECONDS
+        deadline = time.monotonic() + self._poll_timeout_seconds
+        closed = is_closed(time_open)
+        while not closed and time.monotonic() < deadline:
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.MAX_POLL_BACKOFF_SECONDS)
+            closed = is_closed(time_open)
+        lateness_ms = self.server_time_ms() - close_ms
+        if closed:
+            print(f"Candle {time_open} closed, available {lateness_ms:.0f} ms after the close")
+            instrumentation.observe('candle_close_lateness', lateness_ms / 1000)
+        else:
+            print(f"Candle {time_open} not available {lateness_ms:.0f} ms after the close, continuing anyway")
+        self._next_close_ms = close_ms + self._interval_ms
+        return time_open
@@ -1,4 +1,6 @@
-from typing import Any
+import io
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import psycopg2
@@ -11,6 +13,7 @@ from binance_bot.constants import KlineProps
 class DatabaseClient:
 
     con = None
+    PRICE_COLUMNS = [KlineProps.OPEN, KlineProps.HIGH, KlineProps.LOW, KlineProps.CLOSE, KlineProps.VOLUME]
 
     def __init__(self, database_config: DatabaseConfig):
         self.conf = database_config
@@ -39,9 +42,17 @@ class DatabaseClient:
         finally:
             self._create_database()
 
-    def open_database_connection(self, recreate_db: bool = False) -> Any:
+    def _create_database_if_missing(self) -> None:
+        try:
+            self._create_database()
+        except psycopg2.errors.DuplicateDatabase:
+            pass
+
+    def open_database_connection(self, recreate_db: bool = False, create_db: bool = False) -> Any:
         if recreate_db:
             self._recreate_database()
+        elif create_db:
+            self._create_database_if_missing()
         self.con = psycopg2.connect(
             host=self.conf.host,
             port=self.conf.port,
@@ -57,12 +68,56 @@ class DatabaseClient:
     def create_klines_table(self, pair: str) -> None:
         _cur = self.con.cursor()
         _cur.execute(f"CREATE TABLE {pair} ("
-                     f"{KlineProps.TIME_OPEN} BIGINT, "
-                     f"{KlineProps.OPEN} NUMERIC, "
-                     f"{KlineProps.HIGH} NUMERIC, "
-                     f"{KlineProps.LOW} NUMERIC, "
-                     f"{KlineProps.CLOSE} NUMERIC, "
-                     f"{KlineProps.VOLUME} NUMERIC)")
+                     f"{KlineProps.TIME_OPEN} BIGINT PRIMARY KEY, "
+                     f"{KlineProps.OPEN} DOUBLE PRECISION, "
+                     f"{KlineProps.HIGH} DOUBLE PRECISION, "
+                     f"{KlineProps.LOW} DOUBLE PRECISION, "
+                     f"{KlineProps.CLOSE} DOUBLE PRECISION, "
+                     f"{KlineProps.VOLUME} DOUBLE PRECISION)")
+        self.con.commit()
+        _cur.close()
+
+    def migrate_klines_table(self, pair: str) -> None:
+        """
+        Migrate a table created with the old schema (NUMERIC columns, no primary key) to the current one. Duplicate
+        klines are removed before the primary key on time_open is added. Tables which are up to date are not changed.
+        """
+        _cur = self.con.cursor()
+        _cur.execute("SELECT column_name FROM information_schema.columns "
+                     "WHERE table_name = %s AND data_type = 'numeric'", (pair.lower(),))
+        numeric_columns = [row[0] for row in _cur.fetchall()]
+        if numeric_columns:
+            _cur.execute(f"ALTER TABLE {pair} " + ", ".join(
+                f"ALTER COLUMN {column} TYPE DOUBLE PRECISION" for column in numeric_columns
+            ))
+        _cur.execute("SELECT 1 FROM pg_index WHERE indrelid = to_regclass(%s) AND indisprimary", (pair,))
+        if _cur.fetchone() is None:
+            _cur.execute(f"DELETE FROM {pair} a USING {pair} b "
+                         f"WHERE a.ctid < b.ctid AND a.{KlineProps.TIME_OPEN} = b.{KlineProps.TIME_OPEN}")
+            _cur.execute(f"ALTER TABLE {pair} ADD PRIMARY KEY ({KlineProps.TIME_OPEN})")
+        self.con.commit()
+        _cur.close()
+
+    def table_exists(self, pair: str) -> bool:
+        _cur = self.con.cursor()
+        _cur.execute("SELECT to_regclass(%s)", (pair,))
+        exists = _cur.fetchone()[0] is not None
+        _cur.close()
+        return exists
+
+    def get_time_open_range(self, pair: str) -> Tuple[Optional[int], Optional[int]]:
+        """Return the first and the last time_open stored for the pair, or (None, None) if the table is empty."""
+        _cur = self.con.cursor()
+        _cur.execute(f"SELECT MIN({KlineProps.TIME_OPEN}), MAX({KlineProps.TIME_OPEN}) FROM {pair}")
+        time_open_range = _cur.fetchone()
+        _cur.close()
+        return time_open_range
+
+    def trim_klines_table(self, pair: str, min_time_open: int, max_time_open: int) -> None:
+        """Delete all klines which were opened before min_time_open or after max_time_open."""
+        _cur = self.con.cursor()
+        _cur.execute(f"DELETE FROM {pair} WHERE {KlineProps.TIME_OPEN} < %s OR {KlineProps.TIME_OPEN} > %s",
+                     (min_time_open, max_time_open))
         self.con.commit()
         _cur.close()
 
@@ -73,5 +128,84 @@ class DatabaseClient:
         self.con.commit()
         _cur.close()
 
+    def copy_klines_into_table(self, pair: str, data: pd.DataFrame, chunk_size: int = 100000) -> Tuple[int, float]:
+        """
+        Bulk-load the klines via COPY FROM STDIN in CSV format. The dataframe is streamed in chunks of `chunk_size`
+        rows, so only one chunk is serialized in memory at a time. Return the number of copied rows and the elapsed
+        seconds, so that callers which copy many pages can report the throughput once.
+        """
+        columns = [KlineProps.TIME_OPEN, KlineProps.OPEN, KlineProps.HIGH, KlineProps.LOW, KlineProps.CLOSE,
+                   KlineProps.VOLUME]
+        start = time.perf_counter()
+        _cur = self.con.cursor()
+        for chunk_start in range(0, data.shape[0], chunk_size):
+            buffer = io.StringIO()
+            data.iloc[chunk_start: chunk_start + chunk_size][columns]\
+                .astype({KlineProps.TIME_OPEN: 'int64'})\
+                .to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            _cur.copy_expert(f"COPY {pair} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        self.con.commit()
+        _cur.close()
+        return data.shape[0], time.perf_counter() - start
+
     def read_table(self, pair: str) -> pd.DataFrame:
-        return pd.read_sql_query(f"SELECT * from {pair}", self.con)
+        return pd.read_sql_query(f"SELECT * from {pair} ORDER BY {KlineProps.TIME_OPEN}", self.con)
+
+    def _iter_query(self, query: str, params: tuple, chunk_size: int) -> Iterator[List[tuple]]:
+        """Execute the query with a server-side cursor and yield the result rows in chunks of chunk_size."""
+        _cur = self.con.cursor(name=f"binance_bot_{id(query)}")
+        _cur.itersize = chunk_size
+        _cur.execute(query, params)
+        try:
+            while True:
+                rows = _cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            _cur.close()
+            self.con.commit()
+
+    def iter_range(self, pair: str, start: int, end: int, chunk_size: int = 100000) -> Iterator[pd.DataFrame]:
+        """Yield the klines of the pair with start <= time_open < end in chunks of at most chunk_size rows."""
+        columns = [KlineProps.TIME_OPEN] + self.PRICE_COLUMNS
+        query = f"SELECT {', '.join(columns)} FROM {pair} " \
+                f"WHERE {KlineProps.TIME_OPEN} >= %s AND {KlineProps.TIME_OPEN} < %s ORDER BY {KlineProps.TIME_OPEN}"
+        for rows in self._iter_query(query, (start, end), chunk_size):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def read_range(self, pair: str, start: int, end: int, chunk_size: int = 100000) -> pd.DataFrame:
+        """Return the klines of the pair with start <= time_open < end."""
+        chunks = list(self.iter_range(pair, start, end, chunk_size))
+        if not chunks:
+            return pd.DataFrame(columns=[KlineProps.TIME_OPEN] + self.PRICE_COLUMNS)
+        return pd.concat(chunks, ignore_index=True)
+
+    def iter_aligned_range(
+            self,
+            pairs: List[str],
+            start: int,
+            end: int,
+            chunk_size: int = 100000
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        Yield the klines of all pairs with start <= time_open < end in chunks of at most chunk_size rows. Only klines
+        whose time_open exists for all pairs are returned, so the dataframes of a chunk have identical timestamps.
+        """
+        select = [f"{pairs[0]}.{KlineProps.TIME_OPEN}"] + \
+                 [f"{pair}.{column}" for pair in pairs for column in self.PRICE_COLUMNS]
+        joins = " ".join(f"JOIN {pair} USING ({KlineProps.TIME_OPEN})" for pair in pairs[1:])
+        query = f"SELECT {', '.join(select)} FROM {pairs[0]} {joins} " \
+                f"WHERE {pairs[0]}.{KlineProps.TIME_OPEN} >= %s AND {pairs[0]}.{KlineProps.TIME_OPEN} < %s " \
+                f"ORDER BY {pairs[0]}.{KlineProps.TIME_OPEN}"
+        n_columns = len(self.PRICE_COLUMNS)
+        for rows in self._iter_query(query, (start, end), chunk_size):
+            chunk = pd.DataFrame.from_records(rows)
+            yield {
+                pair: pd.DataFrame(
+                    {KlineProps.TIME_OPEN: chunk[0], **{
+                        column: chunk[1 + i * n_columns + j] for j, column in enumerate(self.PRICE_COLUMNS)
+                    }}
+                ) for i, pair in enumerate(pairs)
+            }
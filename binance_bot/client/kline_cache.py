@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.client.database_client import DatabaseClient
+from binance_bot.constants import KlineProps
+
+
+class KlineCache:
+    """
+    Columnar on-disk cache of the kline tables. Each column of a pair is stored as a .npy file and memory-mapped when it
+    is read, so loading a cached table costs no conversion at all. A cached table is rebuilt from the database as soon
+    as the oldest or newest time_open stored in the database differs from the cached one.
+    """
+
+    COLUMNS = {
+        KlineProps.TIME_OPEN: np.int64,
+        KlineProps.OPEN: np.float64,
+        KlineProps.HIGH: np.float64,
+        KlineProps.LOW: np.float64,
+        KlineProps.CLOSE: np.float64,
+        KlineProps.VOLUME: np.float64
+    }
+    META_FILE = 'meta.json'
+
+    def __init__(self, database_client: DatabaseClient, cache_dir: str):
+        self._database_client = database_client
+        self._cache_dir = cache_dir
+
+    def read_table(self, pair: str) -> pd.DataFrame:
+        """Return the klines of the pair from the cache, rebuilding the cache from the database if it is stale."""
+        min_time_open, max_time_open = self._database_client.get_time_open_range(pair)
+        meta = self._read_meta(pair)
+        if meta is None or meta['min_time_open'] != min_time_open or meta['max_time_open'] != max_time_open:
+            self._write_table(pair, self._database_client.read_table(pair), min_time_open, max_time_open)
+        return pd.DataFrame({
+            column: np.load(self._column_path(pair, column), mmap_mode='r') for column in self.COLUMNS.keys()
+        }, copy=False)
+
+    def _pair_dir(self, pair: str) -> str:
+        return os.path.join(self._cache_dir, pair)
+
+    def _column_path(self, pair: str, column: str) -> str:
+        return os.path.join(self._pair_dir(pair), column + '.npy')
+
+    def _read_meta(self, pair: str):
+        try:
+            with open(os.path.join(self._pair_dir(pair), self.META_FILE)) as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_table(self, pair: str, table: pd.DataFrame, min_time_open: int, max_time_open: int) -> None:
+        os.makedirs(self._pair_dir(pair), exist_ok=True)
+        # Remove the meta file first, so that an interrupted write leaves the cache invalid
+        meta_path = os.path.join(self._pair_dir(pair), self.META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for column, dtype in self.COLUMNS.items():
+            np.save(self._column_path(pair, column), np.asarray(table[column], dtype=dtype))
+        with open(meta_path + '.tmp', 'w') as meta_file:
+            json.dump({
+                'min_time_open': None if min_time_open is None else int(min_time_open),
+                'max_time_open': None if max_time_open is None else int(max_time_open),
+                'rows': table.shape[0]
+            }, meta_file)
+        os.replace(meta_path + '.tmp', meta_path)
@@ -0,0 +1,124 @@
+import itertools
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, Tuple
+
+import pandas as pd
+import requests
+from binance.helpers import interval_to_milliseconds
+
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.request_weight_budget import RequestWeightBudget
+
+
+class DownloadError(Exception):
+    pass
+
+
+class KlineDownloader:
+    """
+    Download the klines of several pairs concurrently. Each pair's history is split into pages that are requested from
+    a thread pool, all threads share one RequestWeightBudget. Pages are yielded per pair in chronological order as soon
+    as they are available, so they can be written to the database while the download is still running. At most
+    PAGES_PER_WORKER pages per worker are requested or waiting to be yielded at any time, so the memory used does not
+    depend on the length of the history.
+    """
+
+    KLINES_PATH = '/api/v3/klines'
+    PAGE_LIMIT = 1000
+    PAGE_WEIGHT = 2
+    RETRY_STATUS_CODES = (429, 418)
+    PAGES_PER_WORKER = 2
+
+    def __init__(
+            self,
+            budget: RequestWeightBudget = None,
+            base_url: str = 'https://api.binance.com',
+            max_workers: int = 8,
+            max_retries: int = 5,
+            backoff_seconds: float = 1.0
+    ):
+        self._budget = budget or RequestWeightBudget()
+        self._base_url = base_url
+        self._max_workers = max_workers
+        self._max_retries = max_retries
+        self._backoff_seconds = backoff_seconds
+        self._session = requests.Session()
+
+    def _request_klines(self, pair: str, interval: str, start_ms: int, end_ms: int, limit: int) -> list:
+        params = {'symbol': pair, 'interval': interval, 'startTime': start_ms, 'endTime': end_ms, 'limit': limit}
+        for attempt in range(self._max_retries + 1):
+            self._budget.acquire(self.PAGE_WEIGHT)
+            try:
+                response = self._session.get(self._base_url + self.KLINES_PATH, params=params, timeout=30)
+            except requests.RequestException:
+                time.sleep(self._backoff_seconds * 2 ** attempt)
+                continue
+            if 'X-MBX-USED-WEIGHT-1M' in response.headers:
+                self._budget.sync_used_weight(int(response.headers['X-MBX-USED-WEIGHT-1M']))
+            if response.status_code in self.RETRY_STATUS_CODES:
+                retry_after = float(response.headers.get('Retry-After', self._backoff_seconds * 2 ** attempt))
+                self._budget.pause(retry_after)
+                continue
+            if response.status_code >= 500:
+                time.sleep(self._backoff_seconds * 2 ** attempt)
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise DownloadError(f"Downloading klines of {pair} failed after {self._max_retries} retries.")
+
+    def _get_first_time_open(self, pair: str, interval: str, start_ms: int, end_ms: int) -> int:
+        """Return the open time of the first kline after start_ms, or end_ms if there is none."""
+        klines = self._request_klines(pair, interval, start_ms, end_ms, limit=1)
+        return klines[0][0] if len(klines) > 0 else end_ms
+
+    def _download_page(self, pair: str, interval: str, start_ms: int, end_ms: int) -> pd.DataFrame:
+        klines = self._request_klines(pair, interval, start_ms, end_ms, limit=self.PAGE_LIMIT)
+        return BinanceClient._klines_to_dataframe(klines)
+
+    def download(
+            self,
+            start_ms: Dict[str, int],
+            interval: str,
+            end_ms: int = None
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Download the klines of all pairs in `start_ms` which were opened between the pair's start time and end_ms
+        (default: now). Yield (pair, klines) pages; the pages of a pair are yielded in chronological order.
+        """
+        end_ms = end_ms if end_ms is not None else int(time.time() * 1000)
+        page_ms = self.PAGE_LIMIT * interval_to_milliseconds(interval)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            first_time_opens = dict(zip(start_ms.keys(), pool.map(
+                lambda pair: self._get_first_time_open(pair, interval, start_ms[pair], end_ms), start_ms.keys()
+            )))
+            pages = (
+                (pair, page, page_start)
+                for pair, first_time_open in first_time_opens.items()
+                for page, page_start in enumerate(range(first_time_open, end_ms, page_ms))
+            )
+            max_pages = self.PAGES_PER_WORKER * self._max_workers
+            futures: Dict[Future, Tuple[str, int]] = {}
+            # Yield the pages of each pair in order, buffering the ones which arrive early. The pages are submitted in
+            # order, so the page a pair waits for is always still running.
+            next_page: Dict[str, int] = {pair: 0 for pair in start_ms.keys()}
+            pending: Dict[str, Dict[int, pd.DataFrame]] = {pair: {} for pair in start_ms.keys()}
+            n_pending = 0
+            while True:
+                for pair, page, page_start in itertools.islice(pages, max_pages - len(futures) - n_pending):
+                    future = pool.submit(self._download_page, pair, interval, page_start,
+                                         min(page_start + page_ms, end_ms) - 1)
+                    futures[future] = (pair, page)
+                if not futures:
+                    return
+                for future in wait(futures, return_when=FIRST_COMPLETED).done:
+                    pair, page = futures.pop(future)
+                    pending[pair][page] = future.result()
+                    n_pending += 1
+                for pair in pending.keys():
+                    while next_page[pair] in pending[pair]:
+                        klines = pending[pair].pop(next_page[pair])
+                        next_page[pair] += 1
+                        n_pending -= 1
+                        if klines.shape[0] > 0:
+                            yield pair, klines
@@ -0,0 +1,73 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.constants import KlineProps
+
+
+class KlineParser:
+    """
+    Parse responses of the klines-API into preallocated column buffers. Only the six fields the bot uses are read, page
+    by page, straight into an int64 buffer for the open time and float64 buffers for the prices and the volume, so no
+    array of all twelve fields and no string array of the whole history is ever created. The buffers grow by doubling
+    if more rows are added than the capacity given upfront.
+    https://binance-docs.github.io/apidocs/spot/en/#kline-candlestick-data
+    """
+
+    # Columns and their index in a kline of the API response
+    FLOAT_COLUMNS = {
+        KlineProps.OPEN: 1,
+        KlineProps.HIGH: 2,
+        KlineProps.LOW: 3,
+        KlineProps.CLOSE: 4,
+        KlineProps.VOLUME: 5
+    }
+
+    def __init__(self, capacity: int = 0):
+        self._time_opens = np.empty(capacity, dtype=np.int64)
+        self._values = {column: np.empty(capacity, dtype=np.float64) for column in self.FLOAT_COLUMNS.keys()}
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def capacity(self) -> int:
+        return self._time_opens.shape[0]
+
+    def last_time_open(self) -> int:
+        return int(self._time_opens[self._rows - 1])
+
+    def add_page(self, klines: List[list]) -> None:
+        """Append the klines of one response."""
+        n_rows = len(klines)
+        if n_rows == 0:
+            return
+        self._reserve(self._rows + n_rows)
+        rows = slice(self._rows, self._rows + n_rows)
+        self._time_opens[rows] = np.fromiter((kline[0] for kline in klines), dtype=np.int64, count=n_rows)
+        for column, index in self.FLOAT_COLUMNS.items():
+            self._values[column][rows] = np.fromiter(
+                (float(kline[index]) for kline in klines), dtype=np.float64, count=n_rows
+            )
+        self._rows += n_rows
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the parsed klines. The columns are views of the buffers, which must not be added to afterwards."""
+        return pd.DataFrame({
+            KlineProps.TIME_OPEN: self._time_opens[:self._rows],
+            **{column: values[:self._rows] for column, values in self._values.items()}
+        }, copy=False)
+
+    def _reserve(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, 2 * self.capacity)
+        self._time_opens = self._grow(self._time_opens, capacity)
+        self._values = {column: self._grow(values, capacity) for column, values in self._values.items()}
+
+    def _grow(self, buffer: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.empty(capacity, dtype=buffer.dtype)
+        grown[:self._rows] = buffer[:self._rows]
+        return grown
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import websocket
+from binance.helpers import interval_to_milliseconds
+
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.constants import KlineProps
+from binance_bot.state.ring_buffer import RingBuffer
+
+
+class KlineStream:
+    """
+    Keep rolling windows of closed klines for several pairs up to date via the Binance kline websocket streams.
+    The windows are filled via REST when the stream is started and backfilled via REST after every reconnect or when a
+    gap is detected. wait_for_close() returns as soon as the current candle of all pairs has been closed. The windows
+    are kept in ring buffers, so a closed kline is appended without copying the window.
+    https://binance-docs.github.io/apidocs/spot/en/#kline-candlestick-streams
+    """
+
+    RECONNECT_DELAY_SECONDS = 1
+    KLINE_COLUMNS = [KlineProps.TIME_OPEN, KlineProps.OPEN, KlineProps.HIGH, KlineProps.LOW, KlineProps.CLOSE,
+                     KlineProps.VOLUME]
+
+    def __init__(
+            self,
+            client: BinanceClient,
+            pairs: List[str],
+            interval: str,
+            window_size: int = 500,
+            base_url: str = 'wss://stream.binance.com:9443'
+    ):
+        self._client = client
+        self._pairs = pairs
+        self._interval = interval
+        self._interval_ms = interval_to_milliseconds(interval)
+        self._window_size = window_size
+        streams = '/'.join(f"{pair.lower()}@kline_{interval}" for pair in pairs)
+        self._url = f"{base_url}/stream?streams={streams}"
+        self._windows = {pair: RingBuffer(self.KLINE_COLUMNS, window_size) for pair in pairs}
+        self._last_closed_time_open = None
+        self._consumed_time_open = None
+        self._condition = threading.Condition()
+        self._websocket_app = None
+        self._thread = None
+        self._running = False
+        self._connected_before = False
+
+    def start(self) -> None:
+        self._backfill(self._pairs)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._websocket_app is not None:
+            self._websocket_app.close()
+
+    def get_klines(self, pair: str) -> pd.DataFrame:
+        """Return a copy of the window of the pair, the buffer itself is written by the thread of the stream."""
+        with self._condition:
+            return self._windows[pair].to_dataframe().copy()
+
+    def has_closed(self, time_open: int) -> bool:
+        """Return True if the candle opened at time_open (or a newer one) has been closed for all pairs."""
+        with self._condition:
+            return self._last_closed_time_open is not None and self._last_closed_time_open >= time_open
+
+    def wait_for_close(self, timeout: float = None) -> bool:
+        """
+        Block until a candle has been closed for all pairs which is newer than the one of the previous call. Returns
+        immediately if such a candle was closed in the meantime. Return False if the timeout expired before.
+        """
+        with self._condition:
+            closed = self._condition.wait_for(
+                lambda: self._last_closed_time_open is not None
+                and self._last_closed_time_open != self._consumed_time_open,
+                timeout=timeout
+            )
+            if closed:
+                self._consumed_time_open = self._last_closed_time_open
+            return closed
+
+    def _run(self) -> None:
+        while self._running:
+            self._websocket_app = websocket.WebSocketApp(
+                self._url,
+                on_open=lambda _: self._on_open(),
+                on_message=lambda _, message: self._on_message(json.loads(message))
+            )
+            self._websocket_app.run_forever()
+            if self._running:
+                time.sleep(self.RECONNECT_DELAY_SECONDS)
+
+    def _on_open(self) -> None:
+        # Candles closed while the connection was down are missing after a reconnect
+        if self._connected_before:
+            self._backfill(self._pairs)
+        self._connected_before = True
+
+    def _backfill(self, pairs: List[str]) -> None:
+        """Replace the windows of the given pairs with the latest closed klines from the REST API."""
+        for pair in pairs:
+            klines = self._client.get_klines(pair, self._interval)
+            klines = klines[klines[KlineProps.TIME_OPEN] + self._interval_ms <= time.time() * 1000]
+            with self._condition:
+                window = self._windows[pair]
+                window.clear()
+                for kline in klines[self.KLINE_COLUMNS].iloc[-self._window_size:].to_numpy(dtype=np.float64):
+                    window.append(kline)
+                self._update_last_closed_time_open()
+
+    def _on_message(self, message: dict) -> None:
+        kline = message['data']['k']
+        if not kline['x']:
+            return
+        pair = kline['s']
+        with self._condition:
+            window = self._windows[pair]
+            last_time_open = window.last(KlineProps.TIME_OPEN) if len(window) > 0 else None
+            if last_time_open is not None and kline['t'] <= last_time_open:
+                return
+            if last_time_open is not None and kline['t'] > last_time_open + self._interval_ms:
+                gap = True
+            else:
+                gap = False
+                window.append([float(kline[field]) for field in ('t', 'o', 'h', 'l', 'c', 'v')])
+                self._update_last_closed_time_open()
+        if gap:
+            self._backfill([pair])
+
+    def _update_last_closed_time_open(self) -> None:
+        """Notify waiting threads if all pairs have the same newest closed candle. Requires the lock to be held."""
+        if any(len(window) == 0 for window in self._windows.values()):
+            return
+        last_time_opens = {window.last(KlineProps.TIME_OPEN) for window in self._windows.values()}
+        if len(last_time_opens) == 1:
+            self._last_closed_time_open = last_time_opens.pop()
+            self._condition.notify_all()
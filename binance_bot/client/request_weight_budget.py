@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+class RequestWeightBudget:
+    """
+    Thread-safe budget of request weight per minute, shared by all threads which send requests to the same API. The
+    budget refills continuously, acquire() blocks until enough weight is available.
+    """
+
+    def __init__(self, weight_per_minute: int = 1200):
+        self._capacity = weight_per_minute
+        self._available = float(weight_per_minute)
+        self._refill_per_second = weight_per_minute / 60
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._available = min(self._capacity, self._available + (now - self._last_refill) * self._refill_per_second)
+        self._last_refill = now
+
+    def acquire(self, weight: int) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._available >= weight:
+                    self._available -= weight
+                    return
+                wait = max(self._blocked_until - now, (weight - self._available) / self._refill_per_second)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Block all requests for the given time, e.g. after the API answered with 429 or 418."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._available = 0.0
+
+    def sync_used_weight(self, used_weight: int) -> None:
+        """Align the budget with the weight the API reports as used in the current minute."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._available = min(self._available, float(self._capacity - used_weight))
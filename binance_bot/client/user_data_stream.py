@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from typing import Callable, List
+
+import websocket
+
+from binance_bot.client.binance_client import BinanceClient
+
+
+class UserDataStream:
+    """
+    Receive the events of the account (execution reports, balance updates) via the Binance user data stream and pass
+    them to the listeners. The listen key is kept alive in the background and replaced if it expired. After every
+    reconnect, the on_reconnect callbacks are called, since events may have been missed while the connection was down.
+    https://binance-docs.github.io/apidocs/spot/en/#user-data-streams
+    """
+
+    KEEPALIVE_INTERVAL_SECONDS = 30 * 60
+    RECONNECT_DELAY_SECONDS = 1
+
+    def __init__(self, client: BinanceClient, base_url: str = 'wss://stream.binance.com:9443'):
+        self._client = client
+        self._base_url = base_url
+        self._listen_key = None
+        self._event_listeners: List[Callable[[dict], None]] = []
+        self._reconnect_listeners: List[Callable[[], None]] = []
+        self._websocket_app = None
+        self._thread = None
+        self._keepalive_thread = None
+        self._stopped = threading.Event()
+        self._connected_before = False
+
+    def add_listener(self, on_event: Callable[[dict], None], on_reconnect: Callable[[], None] = None) -> None:
+        """Register callbacks, which are called from the thread of the stream. Must be called before start()."""
+        self._event_listeners.append(on_event)
+        if on_reconnect is not None:
+            self._reconnect_listeners.append(on_reconnect)
+
+    def start(self) -> None:
+        self._listen_key = self._client.create_listen_key()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._keepalive_thread = threading.Thread(target=self._keepalive, daemon=True)
+        self._keepalive_thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._websocket_app is not None:
+            self._websocket_app.close()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._websocket_app = websocket.WebSocketApp(
+                f"{self._base_url}/ws/{self._listen_key}",
+                on_open=lambda _: self._on_open(),
+                on_message=lambda _, message: self._on_message(json.loads(message))
+            )
+            self._websocket_app.run_forever()
+            if not self._stopped.is_set():
+                time.sleep(self.RECONNECT_DELAY_SECONDS)
+
+    def _keepalive(self) -> None:
+        while not self._stopped.wait(self.KEEPALIVE_INTERVAL_SECONDS):
+            try:
+                self._client.keepalive_listen_key(self._listen_key)
+            except Exception as e:
+                # The listen key expired, the stream reconnects with a new one
+                print("Keepalive of the user data stream failed:", repr(e))
+                try:
+                    self._listen_key = self._client.create_listen_key()
+                except Exception as e:
+                    # The key is kept and replaced at the next keepalive, the thread must not die
+                    print("Creating a new listen key failed:", repr(e))
+                    continue
+                self._websocket_app.close()
+
+    def _on_open(self) -> None:
+        if self._connected_before:
+            for on_reconnect in self._reconnect_listeners:
+                on_reconnect()
+        self._connected_before = True
+
+    def _on_message(self, event: dict) -> None:
+        if event.get('e') == 'listenKeyExpired':
+            self._listen_key = self._client.create_listen_key()
+            self._websocket_app.close()
+            return
+        for on_event in self._event_listeners:
+            on_event(event)
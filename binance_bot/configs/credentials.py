@@ -3,7 +3,12 @@ import configparser
 
 class Credentials:
 
-    def __init__(self):
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        """Read the credentials from credentials/credentials.ini unless they are given (e.g. for a local exchange)."""
+        if api_key is not None and api_secret is not None:
+            self.API_KEY = api_key
+            self.API_SECRET = api_secret
+            return
         self._configParser = configparser.ConfigParser()
         self._configParser.read(r'credentials/credentials.ini')
         self.API_KEY = self._configParser.get('credentials', 'api_key')
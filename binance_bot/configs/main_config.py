@@ -1,4 +1,6 @@
 import configparser
+import copy
+from typing import List
 
 from binance_bot.configs.config_utils import getlist
 
@@ -19,6 +21,59 @@ class MainConfig:
             user=self._configParser.get('database', 'user'),
             password=self._configParser.get('database', 'password')
         )
+        self.MISSING_KLINE_POLICY = self._configParser.get('alignment', 'missing_kline_policy')
+        self.INSTRUMENTATION_ENABLED = self._configParser.get('instrumentation', 'enabled') == 'True'
+        self.INSTRUMENTATION_HTTP_PORT = int(self._configParser.get('instrumentation', 'http_port'))
+        self.INSTRUMENTATION_TRACE_FILE = self._configParser.get('instrumentation', 'trace_file') or None
+        self.KLINE_CACHE_DIR = self._configParser.get('cache', 'kline_cache_dir')
+        self.FEATURE_CACHE_DIR = self._configParser.get('cache', 'feature_cache_dir')
+        self.FEATURE_CACHE_MAX_MB = int(self._configParser.get('cache', 'feature_cache_max_mb'))
+        self.TEST_ORDERS = self._configParser.get('orders', 'test_orders') == 'True'
+        self.BALANCE_LEDGER_ENABLED = self._configParser.get('balances', 'ledger_enabled') == 'True'
+        self.BALANCE_RECONCILE_SECONDS = float(self._configParser.get('balances', 'reconcile_interval_seconds'))
+        self.SLOTS = self._read_slots()
+
+    def _read_slots(self) -> List['SlotConfig']:
+        """Read the [slot:<name>] sections. Without any, the target pair of [symbols] is traded by RandomStrategy."""
+        slots = []
+        for section in self._configParser.sections():
+            if section.startswith('slot:'):
+                slots.append(SlotConfig(
+                    name=section[len('slot:'):],
+                    target_symbol=self._configParser.get(section, 'target_symbol'),
+                    base_symbol=self._configParser.get(section, 'base_symbol'),
+                    strategy=self._configParser.get(section, 'strategy'),
+                    allocation=float(self._configParser.get(section, 'allocation', fallback='1.0'))
+                ))
+        if not slots:
+            slots.append(SlotConfig(
+                name=self.TARGET_PAIR,
+                target_symbol=self.TARGET_SYMBOL,
+                base_symbol=self.BASE_SYMBOL,
+                strategy='random'
+            ))
+        return slots
+
+    def for_slot(self, slot: 'SlotConfig') -> 'MainConfig':
+        """Return a copy of the configuration whose target pair is the one of the slot."""
+        slot_config = copy.copy(self)
+        slot_config.TARGET_SYMBOL = slot.target_symbol
+        slot_config.BASE_SYMBOL = slot.base_symbol
+        slot_config.TARGET_PAIR = slot.target_pair
+        return slot_config
+
+
+class SlotConfig:
+    """One target pair traded by one strategy in the live runner."""
+
+    def __init__(self, name: str, target_symbol: str, base_symbol: str, strategy: str, allocation: float = 1.0):
+        self.name = name
+        self.target_symbol = target_symbol
+        self.base_symbol = base_symbol
+        self.target_pair = target_symbol + base_symbol
+        self.strategy = strategy
+        # Share of the balances of the target and base symbol which is available to the slot
+        self.allocation = allocation
 
 
 class DatabaseConfig:
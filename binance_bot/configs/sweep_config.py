@@ -0,0 +1,51 @@
+import configparser
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+
+from binance_bot.configs.config_utils import getlist
+
+
+class SweepConfig:
+    """
+    Value ranges of the FeatureConfig parameters for a parameter sweep. Every option is either a comma separated list
+    of values or an inclusive range written as start:stop:step. Options without a value are not swept.
+    """
+
+    # Sweepable FeatureConfig fields and their types
+    PARAMETERS: Dict[str, Callable[[str], Union[int, float]]] = {
+        'EXP_SMOOTHING_ALPHA': float,
+        'BBANDS_PERIOD': int,
+        'BBANDS_UPPER': int,
+        'BBANDS_LOWER': int,
+        'EMA_PERIOD_SHORT': int,
+        'EMA_PERIOD_MID': int,
+        'EMA_PERIOD_LONG': int,
+        'MACD_FASTPERIOD': int,
+        'MACD_SLOWPERIOD': int,
+        'MACD_SIGNALPERIOD': int
+    }
+
+    def __init__(self):
+        self._configparser = configparser.ConfigParser()
+        self._configparser.read(r'config/sweep-config.ini')
+
+        self.RANGES: Dict[str, List[Union[int, float]]] = {}
+        for field, parameter_type in self.PARAMETERS.items():
+            option = self._configparser.get('parameters', field.lower(), fallback='').strip()
+            if option:
+                self.RANGES[field] = self._parse_values(option, parameter_type)
+
+        self.EPOCHS = int(self._configparser.get('evaluation', 'epochs'))
+        self.SEED = int(self._configparser.get('evaluation', 'seed'))
+        self.STRATEGY = self._configparser.get('evaluation', 'strategy', fallback='band_momentum')
+
+    @staticmethod
+    def _parse_values(option: str, parameter_type: Callable[[str], Union[int, float]]) -> List[Union[int, float]]:
+        if ':' not in option:
+            return [parameter_type(value) for value in getlist(option)]
+        start, stop, step = [parameter_type(value) for value in getlist(option, sep=':')]
+        if parameter_type is int:
+            return list(range(start, stop + 1, step))
+        # Round away the floating point error of the steps, so that the values are usable as cache keys
+        return [round(float(value), 10) for value in np.arange(start, stop + step / 2, step)]
@@ -0,0 +1,87 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.constants import KlineProps
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.strategy.abstract_strategy import AbstractStrategy
+from binance_bot.strategy.batch_actions import BatchActions
+
+
+class BatchSimulator:
+    """
+    Vectorized backtest of a strategy implementing apply_batch. The actions for the whole history are requested with a
+    single call and their trades are simulated without a Python loop over the steps. Trades are executed at the close
+    price of their step, like TrainingExecutor does.
+    """
+
+    def __init__(self, main_config: MainConfig):
+        self._config = main_config
+
+    def run(
+            self,
+            strategy: AbstractStrategy,
+            klines: pd.DataFrame,
+            features: pd.DataFrame,
+            assets: Portfolio
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Backtest the strategy on the klines, starting with the given portfolio, which holds the final balances
+        afterwards. Return the free target and base balances after each step as an array of shape (n_klines, 2) and
+        the total asset value after each step (in the same unit as TrainingState.get_total_asset_value).
+        """
+        actions = strategy.apply_batch(klines=klines, features=features, assets=assets)
+        closes = klines[KlineProps.CLOSE].to_numpy(dtype=np.float64)
+        if actions.relative:
+            balances = self._simulate_relative(actions, closes, assets)
+        else:
+            signed_qtys = actions.sides * actions.quantities
+            balances = assets.apply_trades(
+                target_symbol=self._config.TARGET_SYMBOL,
+                base_symbol=self._config.BASE_SYMBOL,
+                target_qtys=signed_qtys,
+                base_qtys=-signed_qtys / closes
+            )
+        return balances, balances[:, 1] + balances[:, 0] / closes
+
+    def _simulate_relative(self, actions: BatchActions, closes: np.ndarray, assets: Portfolio) -> np.ndarray:
+        """
+        Every step maps the balances (target, base) linearly to the balances after the step:
+        selling a fraction f of the target balance is [[1 - f, 0], [f / close, 1]] and buying a fraction g of the
+        maximum buyable amount is [[1, g * close], [0, 1 - g]]. The balances after each step are the prefix products of
+        these matrices applied to the initial balances, computed with a parallel prefix scan in log2(n) vector passes.
+        """
+        if np.any((actions.quantities < 0) | (actions.quantities > 1)):
+            raise ValueError("Relative quantities have to be between 0 and 1.")
+        sell = actions.sides == BatchActions.SELL
+        buy = actions.sides == BatchActions.BUY
+        fractions = actions.quantities
+        # Components of the matrix [[a, b], [c, d]] of each step
+        a = np.where(sell, 1. - fractions, 1.)
+        b = np.where(buy, fractions * closes, 0.)
+        c = np.where(sell, fractions / closes, 0.)
+        d = np.where(buy, 1. - fractions, 1.)
+        # Hillis-Steele scan: after the pass with offset k, each matrix is the product of the last 2k step matrices
+        offset = 1
+        while offset < len(a):
+            later = (a[offset:], b[offset:], c[offset:], d[offset:])
+            earlier = (a[:-offset], b[:-offset], c[:-offset], d[:-offset])
+            a_new = later[0] * earlier[0] + later[1] * earlier[2]
+            b_new = later[0] * earlier[1] + later[1] * earlier[3]
+            c_new = later[2] * earlier[0] + later[3] * earlier[2]
+            d_new = later[2] * earlier[1] + later[3] * earlier[3]
+            a[offset:], b[offset:], c[offset:], d[offset:] = a_new, b_new, c_new, d_new
+            offset *= 2
+        target = assets.get_free(self._config.TARGET_SYMBOL)
+        base = assets.get_free(self._config.BASE_SYMBOL)
+        balances = np.column_stack([a * target + b * base, c * target + d * base])
+        if balances.shape[0] > 0:
+            assets.trade(
+                target_symbol=self._config.TARGET_SYMBOL,
+                base_symbol=self._config.BASE_SYMBOL,
+                target_qty=balances[-1, 0] - target,
+                base_qty=balances[-1, 1] - base
+            )
+        return balances
@@ -0,0 +1,127 @@
+from typing import Dict, List, Optional, Tuple, Type
+
+from binance.helpers import interval_to_milliseconds
+
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.kline_stream import KlineStream
+from binance_bot.configs.main_config import MainConfig, SlotConfig
+from binance_bot.constants import KlineProps
+from binance_bot.executor.order_pipeline import OrderPipeline
+from binance_bot.instrumentation import instrumentation
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.state.balance_ledger import BalanceLedger
+from binance_bot.state.market_data import MarketData
+from binance_bot.state.single_asset_state import SingleAssetState
+from binance_bot.strategy.abstract_strategy import AbstractStrategy
+from binance_bot.strategy.band_momentum_strategy import BandMomentumStrategy
+from binance_bot.strategy.random_strategy import RandomStrategy
+
+# Strategies which can be referenced by the strategy option of a slot or of a sweep, created with (main_config). Sweeps
+# only accept strategies which declare the FEATURES they read.
+STRATEGIES: Dict[str, Type[AbstractStrategy]] = {
+    'random': RandomStrategy,
+    'band_momentum': BandMomentumStrategy
+}
+
+
+class _Slot:
+
+    def __init__(
+            self,
+            config: SlotConfig,
+            state: SingleAssetState,
+            strategy: AbstractStrategy,
+            executor: OrderPipeline
+    ):
+        self.config = config
+        self.state = state
+        self.strategy = strategy
+        self.executor = executor
+
+
+class LiveRunner:
+    """
+    Trade all slots of the configuration in one process. The slots share one MarketData, so the klines of every pair
+    and the balance of every symbol are fetched once per step and the features of every target pair are calculated
+    once, however many slots use them. Every slot has its own state (with its share of the balances), strategy and
+    order pipeline. Only the features declared by the strategies of the slots are calculated.
+    """
+
+    def __init__(
+            self,
+            client: BinanceClient,
+            main_config: MainConfig,
+            feature_calculator: FeatureCalculator,
+            kline_stream: KlineStream = None,
+            balance_ledger: BalanceLedger = None
+    ):
+        self._interval_ms = interval_to_milliseconds(main_config.TARGET_INTERVAL)
+        for slot in main_config.SLOTS:
+            if slot.strategy not in STRATEGIES:
+                raise ValueError(f"Unknown strategy {slot.strategy} of slot {slot.name}")
+        feature_calculator = feature_calculator.with_features(self.features(main_config))
+        self._market_data = MarketData(
+            client=client,
+            main_config=main_config,
+            feature_calculator=feature_calculator,
+            target_pairs=[slot.target_pair for slot in main_config.SLOTS],
+            symbols=[symbol for slot in main_config.SLOTS for symbol in (slot.target_symbol, slot.base_symbol)],
+            kline_stream=kline_stream,
+            balance_ledger=balance_ledger
+        )
+        self._slots: List[_Slot] = []
+        for slot in main_config.SLOTS:
+            slot_config = main_config.for_slot(slot)
+            self._slots.append(_Slot(
+                config=slot,
+                state=SingleAssetState(
+                    client=client,
+                    main_config=slot_config,
+                    feature_calculator=feature_calculator,
+                    market_data=self._market_data,
+                    allocation=slot.allocation
+                ),
+                strategy=STRATEGIES[slot.strategy](slot_config),
+                executor=OrderPipeline(client, slot=slot.name)
+            ))
+
+    @staticmethod
+    def pairs(main_config: MainConfig) -> List[str]:
+        """All pairs whose klines are needed by the slots of the configuration, e.g. for the kline stream."""
+        target_pairs = [slot.target_pair for slot in main_config.SLOTS]
+        return list(dict.fromkeys(target_pairs + (main_config.FEATURE_PAIRS or [])))
+
+    @staticmethod
+    def symbol_pairs(main_config: MainConfig) -> Dict[str, Tuple[str, str]]:
+        """The target pairs of the slots with their target and base symbol, e.g. for the balance ledger."""
+        return {slot.target_pair: (slot.target_symbol, slot.base_symbol) for slot in main_config.SLOTS}
+
+    @staticmethod
+    def features(main_config: MainConfig) -> Optional[List[str]]:
+        """All features needed by the strategies of the slots, None if any of them needs the default features."""
+        strategy_features = [STRATEGIES[slot.strategy].FEATURES for slot in main_config.SLOTS]
+        if any(features is None for features in strategy_features):
+            return None
+        return list(dict.fromkeys(feature for features in strategy_features for feature in features))
+
+    def start(self) -> None:
+        for slot in self._slots:
+            slot.executor.start()
+
+    def step(self) -> None:
+        """Update the shared market data once, then let every slot's strategy decide and queue its order."""
+        with instrumentation.span('market_data_step'):
+            self._market_data.next_step()
+        for slot in self._slots:
+            with instrumentation.span('state_step', slot=slot.config.name):
+                slot.state.next_step()
+            with instrumentation.span('strategy', slot=slot.config.name):
+                action = slot.strategy.apply(
+                    klines=slot.state.klines,
+                    features=slot.state.features,
+                    assets=slot.state.assets
+                )
+            # The order is submitted in the background by the slot's order pipeline, which also reports the latency
+            # from the candle close until the exchange accepted the order
+            candle_close_ms = slot.state.klines[KlineProps.TIME_OPEN].iloc[-1] + self._interval_ms
+            slot.executor.execute(action, candle_close_ms=candle_close_ms)
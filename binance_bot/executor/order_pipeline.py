@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+import uuid
+from decimal import Decimal, ROUND_DOWN
+from typing import Any, Dict
+
+import requests
+from binance.exceptions import BinanceAPIException
+
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.executor.abstract_executor import AbstractExecutor
+from binance_bot.instrumentation import instrumentation
+from binance_bot.strategy.strategy_action import StrategyAction
+
+
+class SymbolFilters:
+    """
+    Quantity rules of a pair (the lot size filter). Orders violating them are rejected by the exchange. The pipeline
+    only sends market orders, so the price filter does not apply.
+    https://binance-docs.github.io/apidocs/spot/en/#filters
+    """
+
+    def __init__(self, step_size: Decimal, min_qty: Decimal, max_qty: Decimal):
+        self.step_size = step_size
+        self.min_qty = min_qty
+        self.max_qty = max_qty
+
+    @classmethod
+    def from_filters(cls, filters: Dict[str, Dict[str, Any]]) -> 'SymbolFilters':
+        """Create the rules from the filters returned by BinanceClient.get_symbol_filters."""
+        lot_size = filters.get('LOT_SIZE', {})
+        return cls(
+            step_size=Decimal(lot_size.get('stepSize', '0')),
+            min_qty=Decimal(lot_size.get('minQty', '0')),
+            max_qty=Decimal(lot_size.get('maxQty', '0'))
+        )
+
+    def round_quantity(self, quantity: float) -> Decimal:
+        """Round the quantity down to the step size and cap it at the maximum. Return 0 if it is below the minimum."""
+        quantity = Decimal(repr(float(quantity)))
+        if self.step_size > 0:
+            quantity = (quantity / self.step_size).to_integral_value(rounding=ROUND_DOWN) * self.step_size
+        if self.max_qty > 0:
+            quantity = min(quantity, self.max_qty)
+        return quantity if quantity >= self.min_qty and quantity > 0 else Decimal(0)
+
+
+class _OrderRequest:
+
+    __slots__ = ('action', 'client_order_id', 'candle_close_ms', 'enqueued_at')
+
+    def __init__(self, action: StrategyAction, client_order_id: str, candle_close_ms: float = None):
+        self.action = action
+        self.client_order_id = client_order_id
+        self.candle_close_ms = candle_close_ms
+        self.enqueued_at = time.perf_counter()
+
+
+class OrderPipeline(AbstractExecutor):
+    """
+    Asynchronous counterpart of StrategyExecutor. execute() only puts the action into a bounded queue and returns, a
+    worker thread submits the orders in the background, so a slow order call does not delay the next market data step.
+    The worker rounds the quantities to the lot size filter of the pair (fetched once and cached), and retries orders
+    which failed with a transient error with exponential backoff. Every order gets a client order id when it is queued,
+    which is reused for all retries: before an order is sent again, the worker checks whether the exchange already
+    knows it, so an order whose response got lost is not placed twice. If that check fails too, the exchange rejects
+    the resent order as a duplicate of our own, which also counts as submitted. Only live orders are stored by the
+    exchange, test orders (see BinanceClient) have no such guarantee.
+    The worker thread sends its requests with its own python-binance client (see BinanceClient._client), so it does not
+    interfere with the requests of the main loop.
+    Queue depth and latencies are reported via the instrumentation (order_queue_depth, order_queue_wait,
+    order_submission and, for actions with the close time of their candle, candle_close_to_order until the exchange
+    accepted the order), the counters are available as attributes.
+    """
+
+    # Error codes of the API after which the request may succeed when it is sent again
+    # https://binance-docs.github.io/apidocs/spot/en/#error-codes
+    TRANSIENT_ERROR_CODES = (-1001, -1003, -1006, -1007, -1008, -1015)
+    # Error code of a rejected order, which is also returned for a duplicate client order id
+    REJECTED_ORDER_CODE = -2010
+    CLIENT_ORDER_ID_PREFIX = 'bb-'
+
+    def __init__(
+            self,
+            client: BinanceClient,
+            max_queue_size: int = 16,
+            max_retries: int = 5,
+            backoff_seconds: float = 0.5,
+            slot: str = None
+    ):
+        """slot is the name of the live runner slot the orders belong to, which labels candle_close_to_order."""
+        self._client = client
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._max_retries = max_retries
+        self._backoff_seconds = backoff_seconds
+        self._labels = {} if slot is None else {'slot': slot}
+        self._filters: Dict[str, SymbolFilters] = {}
+        self._thread = None
+        self.submitted = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        """Submit the orders which are still queued and stop the worker."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def join(self) -> None:
+        """Block until all queued orders have been processed."""
+        self._queue.join()
+
+    def execute(self, action: StrategyAction, candle_close_ms: float = None) -> None:
+        """Queue the action. candle_close_ms is the close time of the candle the action was decided on."""
+        if action is None:
+            return
+        request = _OrderRequest(
+            action,
+            client_order_id=self.CLIENT_ORDER_ID_PREFIX + uuid.uuid4().hex,
+            candle_close_ms=candle_close_ms
+        )
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.dropped += 1
+            print("Order queue is full, dropping", action.side, action.quantity, action.pair)
+        instrumentation.set_gauge('order_queue_depth', self._queue.qsize())
+
+    def get_filters(self, pair: str) -> SymbolFilters:
+        if pair not in self._filters:
+            self._filters[pair] = SymbolFilters.from_filters(self._client.get_symbol_filters(pair))
+        return self._filters[pair]
+
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            try:
+                if request is None:
+                    return
+                instrumentation.observe('order_queue_wait', time.perf_counter() - request.enqueued_at)
+                self._submit(request)
+            except Exception as e:
+                # The worker must survive anything a single order can cause
+                self.failed += 1
+                print("Order failed:", repr(e))
+            finally:
+                self._queue.task_done()
+                instrumentation.set_gauge('order_queue_depth', self._queue.qsize())
+
+    def _submit(self, request: _OrderRequest) -> None:
+        action = request.action
+        quantity = self.get_filters(action.pair).round_quantity(action.quantity)
+        if quantity == 0:
+            print("Order quantity", action.quantity, action.pair, "is below the lot size, skipping")
+            return
+        for attempt in range(self._max_retries + 1):
+            if attempt > 0:
+                self.retries += 1
+                time.sleep(self._backoff_seconds * 2 ** (attempt - 1))
+                if self._order_exists(action.pair, request.client_order_id):
+                    self._submitted(request)
+                    return
+            start = time.perf_counter()
+            try:
+                self._client.place_order_market(
+                    pair=action.pair,
+                    side=action.side,
+                    quantity=format(quantity, 'f'),
+                    client_order_id=request.client_order_id
+                )
+            except BinanceAPIException as e:
+                if attempt > 0 and e.code == self.REJECTED_ORDER_CODE and 'duplicate' in e.message.lower():
+                    # An earlier attempt was placed, only its response got lost
+                    self._submitted(request)
+                    return
+                if e.status_code < 500 and e.code not in self.TRANSIENT_ERROR_CODES:
+                    self.failed += 1
+                    print(e)
+                    return
+                continue
+            except requests.RequestException:
+                continue
+            instrumentation.observe('order_submission', time.perf_counter() - start, pair=action.pair)
+            self._submitted(request)
+            return
+        self.failed += 1
+        print("Order", request.client_order_id, "failed after", self._max_retries, "retries")
+
+    def _submitted(self, request: _OrderRequest) -> None:
+        self.submitted += 1
+        if request.candle_close_ms is not None:
+            instrumentation.observe(
+                'candle_close_to_order',
+                time.time() - request.candle_close_ms / 1000,
+                **self._labels
+            )
+
+    def _order_exists(self, pair: str, client_order_id: str) -> bool:
+        try:
+            return self._client.get_order_by_client_id(pair, client_order_id) is not None
+        except (BinanceAPIException, requests.RequestException):
+            return False
@@ -0,0 +1,114 @@
+import os
+import random
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.executor.training_executor import TrainingExecutor
+from binance_bot.instrumentation import Histogram, LabelKey, instrumentation
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.state.shared_table import SharedTable
+from binance_bot.state.training_state import TrainingState
+from binance_bot.strategy.random_strategy import RandomStrategy
+
+# Per-process objects of the worker processes, created once by _init_worker
+_worker_tables: List[SharedTable] = []
+_worker_state: TrainingState = None
+_worker_strategy: RandomStrategy = None
+_worker_executor: TrainingExecutor = None
+
+
+def derive_epoch_seeds(epochs: int, seed: int) -> List[int]:
+    """Derive an independent seed for every epoch from `seed`."""
+    return [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(epochs)]
+
+
+def _init_worker(
+        main_config: MainConfig,
+        feature_calculator: FeatureCalculator,
+        target_pair_table: SharedTable,
+        feature_table: SharedTable,
+        instrumented: bool
+) -> None:
+    global _worker_state, _worker_strategy, _worker_executor
+    if instrumented:
+        trace_path = main_config.INSTRUMENTATION_TRACE_FILE
+        instrumentation.enable(trace_path=f"{trace_path}.{os.getpid()}" if trace_path else None)
+    _worker_tables.extend([target_pair_table, feature_table])
+    _worker_state = TrainingState(
+        main_config=main_config,
+        feature_calculator=feature_calculator,
+        target_pair_table=target_pair_table.attach(),
+        feature_table=feature_table.attach()
+    )
+    _worker_strategy = RandomStrategy(main_config)
+    _worker_executor = TrainingExecutor(state=_worker_state, main_config=main_config)
+
+
+def run_epoch(
+        state: TrainingState,
+        strategy: RandomStrategy,
+        executor: TrainingExecutor,
+        seed: int
+) -> np.ndarray:
+    """Run one epoch. Return the total asset value before every step and at the end of the epoch."""
+    random.seed(seed)
+    state.next_batch()
+    asset_values = np.empty(state.BATCH_SIZE + 1)
+    for step in range(0, state.BATCH_SIZE):
+        with instrumentation.span('state_step'):
+            state.next_step()
+        asset_values[step] = state.get_total_asset_value()
+        with instrumentation.span('strategy'):
+            action = strategy.apply(klines=state.klines, features=state.features, assets=state.assets)
+        with instrumentation.span('order_submission'):
+            executor.execute(action)
+    asset_values[-1] = state.get_total_asset_value()
+    return asset_values
+
+
+def _run_epoch(seed: int) -> Tuple[np.ndarray, Dict[LabelKey, Histogram]]:
+    """Run one epoch in a worker process. Return its asset values and the spans collected during the epoch."""
+    asset_values = run_epoch(_worker_state, _worker_strategy, _worker_executor, seed)
+    return asset_values, instrumentation.snapshot(reset=True)
+
+
+class ParallelTrainingRunner:
+    """
+    Run independent training epochs on a pool of worker processes. The klines and their features are loaded and
+    calculated once by the parent process and shared with the workers via shared memory. The configuration and the
+    feature calculator are pickled to the workers.
+    """
+
+    def __init__(self, main_config: MainConfig, feature_calculator: FeatureCalculator, processes: int = None):
+        self._main_config = main_config
+        self._feature_calc = feature_calculator
+        self._processes = processes or os.cpu_count()
+
+    def run(self, epochs: int, seed: int = 0) -> np.ndarray:
+        """
+        Run the given number of epochs. Every epoch gets its own seed derived from `seed`, so the results do not depend
+        on the number of processes. Return the asset values of all epochs as an array of shape (epochs, BATCH_SIZE + 1).
+        """
+        state = TrainingState(main_config=self._main_config, feature_calculator=self._feature_calc)
+        target_pair_table = SharedTable.create(state.target_pair_table)
+        feature_table = SharedTable.create(state.feature_table)
+        del state
+        epoch_seeds = derive_epoch_seeds(epochs, seed)
+        try:
+            with Pool(
+                    processes=self._processes,
+                    initializer=_init_worker,
+                    initargs=(self._main_config, self._feature_calc, target_pair_table, feature_table,
+                              instrumentation.enabled)
+            ) as pool:
+                results = pool.map(_run_epoch, epoch_seeds)
+        finally:
+            target_pair_table.unlink()
+            feature_table.unlink()
+        # Collect the spans of the workers in the parent process
+        for _, histograms in results:
+            instrumentation.merge(histograms)
+        return np.vstack([asset_values for asset_values, _ in results])
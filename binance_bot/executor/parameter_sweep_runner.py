@@ -0,0 +1,173 @@
+import copy
+import itertools
+import os
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.configs.sweep_config import SweepConfig
+from binance_bot.executor.live_runner import STRATEGIES
+from binance_bot.executor.parallel_training_runner import derive_epoch_seeds, run_epoch
+from binance_bot.executor.training_executor import TrainingExecutor
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.processing.indicator_sweep import IndicatorSweep
+from binance_bot.state.shared_table import SharedTable
+from binance_bot.state.training_state import TrainingState
+
+# Per-process objects of the worker processes, created once by _init_worker
+_worker_main_config: MainConfig = None
+_worker_feature_calculator: FeatureCalculator = None
+_worker_strategy: str = None
+_worker_tables: List[SharedTable] = []
+_worker_klines: pd.DataFrame = None
+_worker_indicators: pd.DataFrame = None
+_worker_additional_features: pd.DataFrame = None
+_worker_epoch_seeds: List[int] = []
+
+
+def _init_worker(
+        main_config: MainConfig,
+        feature_config: FeatureConfig,
+        strategy: str,
+        klines: SharedTable,
+        indicators: SharedTable,
+        additional_features: SharedTable,
+        epoch_seeds: List[int]
+) -> None:
+    global _worker_main_config, _worker_feature_calculator, _worker_strategy
+    global _worker_klines, _worker_indicators, _worker_additional_features, _worker_epoch_seeds
+    _worker_main_config = main_config
+    _worker_feature_calculator = FeatureCalculator(feature_config)
+    _worker_strategy = strategy
+    _worker_tables.extend([klines, indicators, additional_features])
+    _worker_klines = klines.attach()
+    _worker_indicators = indicators.attach()
+    _worker_additional_features = additional_features.attach()
+    _worker_epoch_seeds = epoch_seeds
+
+
+def _evaluate(task: Tuple[int, Dict[str, str]]) -> Tuple[int, np.ndarray]:
+    """
+    Run all epochs for one combination in a worker process. Return the asset value at the end of every epoch. The
+    combinations are evaluated on the same epochs by a strategy which reads features, so they only differ in these.
+    """
+    index, mapping = task
+    feature_table = pd.concat([
+        pd.DataFrame({feature: _worker_indicators[column] for feature, column in mapping.items()}),
+        _worker_additional_features
+    ], axis=1)
+    state = TrainingState(
+        main_config=_worker_main_config,
+        feature_calculator=_worker_feature_calculator,
+        target_pair_table=_worker_klines,
+        feature_table=feature_table
+    )
+    strategy = STRATEGIES[_worker_strategy](_worker_main_config)
+    executor = TrainingExecutor(state=state, main_config=_worker_main_config)
+    final_values = np.array([run_epoch(state, strategy, executor, seed)[-1] for seed in _worker_epoch_seeds])
+    return index, final_values
+
+
+class ParameterSweepRunner:
+    """
+    Evaluate the strategy for every combination of the FeatureConfig parameter ranges of a SweepConfig. The features
+    of all combinations are calculated in one batched pass by IndicatorSweep, which calculates every distinct indicator
+    column only once. The combinations are then evaluated in parallel on a pool of worker processes, which share the
+    klines and indicator columns via shared memory. Every combination is evaluated on the same epochs.
+    """
+
+    def __init__(
+            self,
+            main_config: MainConfig,
+            feature_config: FeatureConfig,
+            sweep_config: SweepConfig,
+            processes: int = None
+    ):
+        self._main_config = main_config
+        self._feature_config = feature_config
+        self._sweep_config = sweep_config
+        self._processes = processes or os.cpu_count()
+
+    def combinations(self) -> List[Dict[str, object]]:
+        """Return all combinations of the parameter ranges, without MACD combinations whose fast period is too slow."""
+        fields = list(self._sweep_config.RANGES.keys())
+        combinations = []
+        for values in itertools.product(*self._sweep_config.RANGES.values()):
+            combination = dict(zip(fields, values))
+            fast = combination.get('MACD_FASTPERIOD', self._feature_config.MACD_FASTPERIOD)
+            slow = combination.get('MACD_SLOWPERIOD', self._feature_config.MACD_SLOWPERIOD)
+            if fast < slow:
+                combinations.append(combination)
+        return combinations
+
+    def run(self, epochs: int, seed: int = 0) -> pd.DataFrame:
+        """
+        Evaluate all combinations on the given number of epochs. Return a table with one row per combination, ranked by
+        the mean asset value at the end of the epochs.
+        """
+        combinations = self.combinations()
+        if not combinations:
+            raise ValueError("The sweep configuration does not contain any valid combination.")
+        if self._sweep_config.STRATEGY not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {self._sweep_config.STRATEGY}, known strategies are "
+                             f"{list(STRATEGIES.keys())}.")
+        if STRATEGIES[self._sweep_config.STRATEGY].FEATURES is None:
+            raise ValueError(f"The {self._sweep_config.STRATEGY} strategy does not declare the FEATURES it reads, so "
+                             "all combinations would get the same score. Sweep a strategy which reads features.")
+        # Load the klines and align the feature pairs once, the features are only calculated by the sweep
+        target_pair_table, feature_pair_tables = TrainingState.read_tables(self._main_config)
+        klines, additional_features = TrainingState.align_feature_pairs(
+            self._main_config,
+            target_pair_table,
+            feature_pair_tables
+        )
+        if additional_features is None:
+            additional_features = pd.DataFrame(index=klines.index)
+        sweep = IndicatorSweep(klines)
+        mappings = [sweep.add(self._feature_config_for(combination)) for combination in combinations]
+        indicators = sweep.table
+
+        # Start all combinations after the longest warm-up, so that they are evaluated on exactly the same batches
+        complete_rows = np.flatnonzero(
+            indicators.notna().all(axis=1).values & additional_features.notna().all(axis=1).values
+        )
+        if len(complete_rows) == 0:
+            raise ValueError("Not enough klines in the database to warm up the indicators of all combinations.")
+        warm_up_length = int(complete_rows[0])
+        shared_tables = [
+            SharedTable.create(table.iloc[warm_up_length:].reset_index(drop=True))
+            for table in (klines, indicators, additional_features)
+        ]
+        try:
+            with Pool(
+                    processes=self._processes,
+                    initializer=_init_worker,
+                    initargs=(self._main_config, self._feature_config, self._sweep_config.STRATEGY, *shared_tables,
+                              derive_epoch_seeds(epochs, seed))
+            ) as pool:
+                final_values = dict(pool.imap_unordered(_evaluate, enumerate(mappings)))
+        finally:
+            for table in shared_tables:
+                table.unlink()
+
+        results = pd.DataFrame([{
+            **combination,
+            'mean_final_value': final_values[index].mean(),
+            'std_final_value': final_values[index].std(),
+            'min_final_value': final_values[index].min(),
+            'max_final_value': final_values[index].max()
+        } for index, combination in enumerate(combinations)])
+        results = results.sort_values('mean_final_value', ascending=False, kind='stable').reset_index(drop=True)
+        results.index += 1
+        results.index.name = 'rank'
+        return results
+
+    def _feature_config_for(self, combination: Dict[str, object]) -> FeatureConfig:
+        feature_config = copy.copy(self._feature_config)
+        for field, value in combination.items():
+            setattr(feature_config, field, value)
+        return feature_config
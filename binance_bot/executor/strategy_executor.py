@@ -11,6 +11,8 @@ class StrategyExecutor(AbstractExecutor):
         self._client = client
 
     def execute(self, action: StrategyAction) -> None:
+        if action is None:
+            return
         try:
             if action.side == "SELL":
                 self._client.place_order_sell_market(pair=action.pair, quantity=action.quantity)
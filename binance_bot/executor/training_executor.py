@@ -1,10 +1,5 @@
-from typing import List
-
-from binance.exceptions import BinanceAPIException
-
-from binance_bot.client.binance_client import BinanceClient
 from binance_bot.configs.main_config import MainConfig
-from binance_bot.constants import AssetProps, KlineProps
+from binance_bot.constants import KlineProps
 from binance_bot.executor.abstract_executor import AbstractExecutor
 from binance_bot.state.abstract_state import AbstractState
 from binance_bot.strategy.strategy_action import StrategyAction
@@ -26,12 +21,18 @@ class TrainingExecutor(AbstractExecutor):
 
     def _place_sell_order(self, quantity: float) -> None:
         base_symbol_qty = quantity / self._state.klines[KlineProps.CLOSE].iloc[-1]
-        self._state.assets.loc[self._state.assets[AssetProps.ASSET] == self._main_config.TARGET_SYMBOL, AssetProps.FREE] -= quantity
-        self._state.assets.loc[self._state.assets[AssetProps.ASSET] == self._main_config.BASE_SYMBOL, AssetProps.FREE] += base_symbol_qty
+        self._state.assets.trade(
+            target_symbol=self._main_config.TARGET_SYMBOL,
+            base_symbol=self._main_config.BASE_SYMBOL,
+            target_qty=-quantity,
+            base_qty=base_symbol_qty
+        )
 
     def _place_buy_order(self, quantity: float) -> None:
         base_symbol_qty = quantity / self._state.klines[KlineProps.CLOSE].iloc[-1]
-        self._state.assets.loc[self._state.assets[AssetProps.ASSET] == self._main_config.TARGET_SYMBOL, AssetProps.FREE] += quantity
-        self._state.assets.loc[self._state.assets[AssetProps.ASSET] == self._main_config.BASE_SYMBOL, AssetProps.FREE] -= base_symbol_qty
-
-    # TODO fail if an asset becomes negative
+        self._state.assets.trade(
+            target_symbol=self._main_config.TARGET_SYMBOL,
+            base_symbol=self._main_config.BASE_SYMBOL,
+            target_qty=quantity,
+            base_qty=-base_symbol_qty
+        )
@@ -0,0 +1,173 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+"""
+Latency instrumentation of the live and training loops. Code is instrumented with named timing spans via the module
+level `instrumentation` object, which is disabled by default. While disabled, span() returns a shared no-op context
+manager, so instrumented code pays for a single method call only.
+"""
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str, labels: Dict[str, str]):
+        self._instrumentation = instrumentation
+        self._name = name
+        self._labels = labels
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self._instrumentation.observe(self._name, time.perf_counter() - self._start, **self._labels)
+        return False
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus sense, observations are in seconds."""
+
+    BUCKETS = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: 'Histogram') -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+
+class Instrumentation:
+
+    METRIC_NAME = 'binance_bot_span_seconds'
+
+    def __init__(self):
+        self.enabled = False
+        self._histograms: Dict[LabelKey, Histogram] = {}
+        self._gauges: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self._http_server = None
+
+    def enable(self, trace_path: str = None) -> None:
+        """Start collecting spans. If a trace_path is given, every span is also appended to it as a JSON line."""
+        self.enabled = True
+        if trace_path:
+            self._trace_file = open(trace_path, 'a', buffering=1)
+
+    def span(self, name: str, **labels: str):
+        """Return a context manager which measures the duration of its block as span `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Record a duration which was measured elsewhere, e.g. the latency from candle close to order submission."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(seconds)
+            if self._trace_file is not None:
+                trace = {'span': name, 'seconds': seconds, 'time': time.time(), **labels}
+                self._trace_file.write(json.dumps(trace) + '\n')
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        """Set the current value of a gauge, e.g. the depth of a queue. Gauges are exported as binance_bot_<name>."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def snapshot(self, reset: bool = False) -> Dict[LabelKey, Histogram]:
+        """Return the collected histograms, e.g. to send them from a worker process to its parent."""
+        with self._lock:
+            histograms = self._histograms
+            if reset:
+                self._histograms = {}
+            return dict(histograms)
+
+    def merge(self, histograms: Dict[LabelKey, Histogram]) -> None:
+        with self._lock:
+            for key, histogram in histograms.items():
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram()
+                self._histograms[key].merge(histogram)
+
+    def render_prometheus(self) -> str:
+        """Render all histograms in the Prometheus text exposition format."""
+        lines: List[str] = [f"# TYPE {self.METRIC_NAME} histogram"]
+        for (name, labels), histogram in sorted(self.snapshot().items()):
+            label_str = ','.join([f'span="{name}"'] + [f'{key}="{value}"' for key, value in labels])
+            cumulative = 0
+            for bucket, count in zip(Histogram.BUCKETS + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'{self.METRIC_NAME}_bucket{{{label_str},le="{bucket}"}} {cumulative}')
+            lines.append(f'{self.METRIC_NAME}_sum{{{label_str}}} {histogram.sum}')
+            lines.append(f'{self.METRIC_NAME}_count{{{label_str}}} {histogram.count}')
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+        previous_name = None
+        for (name, labels), value in gauges:
+            # The samples of a metric follow its TYPE line, which may only be written once
+            if name != previous_name:
+                lines.append(f"# TYPE binance_bot_{name} gauge")
+                previous_name = name
+            label_str = ','.join(f'{key}="{value}"' for key, value in labels)
+            lines.append(f'binance_bot_{name}{{{label_str}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port: int, host: str = '127.0.0.1') -> None:
+        """Serve the histograms in the Prometheus text format on http://host:port/metrics from a background thread."""
+        instrumentation = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = instrumentation.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_):
+                pass
+
+        self._http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+
+
+instrumentation = Instrumentation()
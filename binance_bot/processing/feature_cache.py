@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.constants import KlineProps
+from binance_bot.processing.indicator_registry import registry, resolve_features
+
+
+class FeatureCacheEntry(NamedTuple):
+    # Features of the first `rows` klines which were looked up
+    features: pd.DataFrame
+    rows: int
+    # FeatureStream.dump_state() after the last cached kline, None if the configuration is not supported by streams
+    stream_state: Optional[bytes]
+
+
+class FeatureCache:
+    """
+    Disk-backed store of calculated feature tables. An entry is keyed by a fingerprint of the requested features and the
+    FeatureConfig fields they depend on, the pair and the open time of the first kline. It is valid for every kline
+    table which starts with exactly the klines it was calculated from, which is verified with a digest of the cached
+    klines. Entries are stored column-wise as .npy files and memory-mapped on lookup; the least recently used entries
+    are evicted as soon as the cache exceeds its size limit.
+    """
+
+    FORMAT_VERSION = 2
+    # Longer tails are recalculated with the vectorized functions, which is faster than streaming them
+    MAX_TAIL_ROWS = 10000
+    META_FILE = 'meta.json'
+    STREAM_FILE = 'stream.pkl'
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+
+    @classmethod
+    def fingerprint(cls, feature_config: FeatureConfig, features: List[str] = None) -> str:
+        """Fingerprint of the given features (default: the default features of the indicator registry)."""
+        features = resolve_features(features)
+        fields: Dict[str, object] = {field: getattr(feature_config, field) for field in registry.parameters(features)}
+        fields['features'] = features
+        fields['format_version'] = cls.FORMAT_VERSION
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+    def lookup(
+            self,
+            feature_config: FeatureConfig,
+            pair: str,
+            klines: pd.DataFrame,
+            features: List[str] = None
+    ) -> Optional[FeatureCacheEntry]:
+        """Return the cached features for the longest cached prefix of the klines, or None if nothing is cached."""
+        if klines.shape[0] == 0:
+            return None
+        entry_dir = self._entry_dir(feature_config, features, pair, klines)
+        meta = self._read_meta(entry_dir)
+        if meta is None or meta['rows'] > klines.shape[0] or meta['digest'] != self._digest(klines, meta['rows']):
+            return None
+        features = pd.DataFrame({
+            column: np.load(os.path.join(entry_dir, column + '.npy'), mmap_mode='r') for column in meta['columns']
+        }, copy=False)
+        stream_state = None
+        if meta['has_stream_state']:
+            with open(os.path.join(entry_dir, self.STREAM_FILE), 'rb') as stream_file:
+                stream_state = stream_file.read()
+        # The modification time of the meta file is the last access time for the eviction
+        os.utime(os.path.join(entry_dir, self.META_FILE))
+        return FeatureCacheEntry(features=features, rows=meta['rows'], stream_state=stream_state)
+
+    def store(
+            self,
+            feature_config: FeatureConfig,
+            pair: str,
+            klines: pd.DataFrame,
+            features: pd.DataFrame,
+            stream_state: Optional[bytes] = None
+    ) -> None:
+        """
+        Store the features of the klines, replacing the entry with the same key, and evict old entries. The columns of
+        the features (except the open time) are the requested features the entry is stored for.
+        """
+        if klines.shape[0] == 0:
+            return
+        entry_dir = self._entry_dir(
+            feature_config,
+            [column for column in features.columns if column != KlineProps.TIME_OPEN],
+            pair,
+            klines
+        )
+        os.makedirs(entry_dir, exist_ok=True)
+        # Remove the meta file first, so that an interrupted write leaves the entry invalid
+        meta_path = os.path.join(entry_dir, self.META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        # Write to temporary files, since the old columns may still be memory-mapped by the features being stored
+        for column in features.columns:
+            column_path = os.path.join(entry_dir, column + '.npy')
+            with open(column_path + '.tmp', 'wb') as column_file:
+                np.save(column_file, np.asarray(features[column]))
+            os.replace(column_path + '.tmp', column_path)
+        if stream_state is not None:
+            with open(os.path.join(entry_dir, self.STREAM_FILE), 'wb') as stream_file:
+                stream_file.write(stream_state)
+        with open(meta_path + '.tmp', 'w') as meta_file:
+            json.dump({
+                'pair': pair,
+                'rows': klines.shape[0],
+                'columns': list(features.columns),
+                'digest': self._digest(klines, klines.shape[0]),
+                'has_stream_state': stream_state is not None
+            }, meta_file)
+        os.replace(meta_path + '.tmp', meta_path)
+        self._evict(keep=entry_dir)
+
+    def _entry_dir(self, feature_config: FeatureConfig, features: List[str], pair: str, klines: pd.DataFrame) -> str:
+        key = f"{self.fingerprint(feature_config, features)}-{pair}-{int(klines[KlineProps.TIME_OPEN].iloc[0])}"
+        return os.path.join(self._cache_dir, hashlib.sha256(key.encode()).hexdigest()[:32])
+
+    @staticmethod
+    def _digest(klines: pd.DataFrame, rows: int) -> str:
+        """Digest of the kline columns the features are calculated from, for the first `rows` klines."""
+        digest = hashlib.blake2b()
+        for column in (KlineProps.TIME_OPEN, KlineProps.OPEN, KlineProps.HIGH, KlineProps.LOW, KlineProps.CLOSE,
+                       KlineProps.VOLUME):
+            digest.update(np.ascontiguousarray(klines[column].to_numpy(dtype=np.float64)[:rows]).data)
+        return digest.hexdigest()
+
+    def _read_meta(self, entry_dir: str):
+        try:
+            with open(os.path.join(entry_dir, self.META_FILE)) as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _evict(self, keep: str) -> None:
+        """Remove the least recently used entries until the cache fits its size limit again."""
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            entry_dir = os.path.join(self._cache_dir, name)
+            meta_path = os.path.join(entry_dir, self.META_FILE)
+            last_used = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0.
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            entries.append((last_used, entry_dir, size))
+        total_size = sum(size for _, _, size in entries)
+        for _, entry_dir, size in sorted(entries):
+            if total_size <= self._max_bytes:
+                break
+            if entry_dir != keep:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total_size -= size
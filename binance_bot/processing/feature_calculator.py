@@ -1,60 +1,310 @@
-from typing import Dict, List, Union
+import pickle
+from typing import Any, Dict, List, Mapping, Optional, Union
 
+import numpy as np
 import pandas as pd
 
 from binance_bot.configs.feature_config import FeatureConfig
-from binance_bot.constants import KlineProps
+from binance_bot.constants import Indicators, KlineProps
+from binance_bot.instrumentation import instrumentation
+from binance_bot.processing.feature_cache import FeatureCache
+from binance_bot.processing.indicator_accumulators import *
 from binance_bot.processing.indicator_functions import *
+from binance_bot.processing.indicator_registry import registry, resolve_features
+from binance_bot.state.ring_buffer import RingBuffer
 
 
 class FeatureCalculator:
 
-    def __init__(self, feature_config: FeatureConfig):
+    def __init__(self, feature_config: FeatureConfig, feature_cache: FeatureCache = None, features: List[str] = None):
+        """
+        Calculate the given features (see IndicatorRegistry.columns), by default the ones of DEFAULT_FEATURES. Only the
+        indicators needed for them are calculated, intermediate columns like the smoothed prices are shared.
+        """
         self._config = feature_config
+        self._cache = feature_cache
+        self.features = resolve_features(features)
+        self._plan = registry.resolve(self.features)
+
+    def with_features(self, features: Optional[List[str]]) -> 'FeatureCalculator':
+        """Return a calculator with the same configuration and cache which calculates the given features."""
+        return FeatureCalculator(self._config, feature_cache=self._cache, features=features)
 
     def calculate_features(
             self,
             klines: pd.DataFrame,
             additional_features: pd.DataFrame = None
     ) -> pd.DataFrame:
-        opens = klines[KlineProps.OPEN]
-        highs = klines[KlineProps.HIGH]
-        lows = klines[KlineProps.LOW]
-        closes = klines[KlineProps.CLOSE]
-        volumes = klines[KlineProps.VOLUME]
-
-        if self._config.EXP_SMOOTHING_ENABLED:
-            highs = calc_exponential_smoothing(prices=highs, exp_smoothing_alpha=self._config.EXP_SMOOTHING_ALPHA)
-            lows = calc_exponential_smoothing(prices=lows, exp_smoothing_alpha=self._config.EXP_SMOOTHING_ALPHA)
-            opens = calc_exponential_smoothing(prices=opens, exp_smoothing_alpha=self._config.EXP_SMOOTHING_ALPHA)
-            closes = calc_exponential_smoothing(prices=closes, exp_smoothing_alpha=self._config.EXP_SMOOTHING_ALPHA)
-            volumes = calc_exponential_smoothing(prices=volumes, exp_smoothing_alpha=self._config.EXP_SMOOTHING_ALPHA)
-
+        columns: Dict[str, pd.Series] = {}
+        for indicator in self._plan:
+            with instrumentation.span('feature', indicator=indicator.name):
+                columns.update(indicator.calculate(self._config, klines, columns))
         features: List[Union[pd.DataFrame, pd.Series]] = [
             klines[KlineProps.TIME_OPEN],
-            calc_bollinger_bands(
-                prices=closes,
+            pd.DataFrame({column: columns[column] for column in self.features}, index=klines.index),
+            additional_features
+        ]
+        return pd.concat(features, axis=1)
+
+    def calculate_cached_features(
+            self,
+            pair: str,
+            klines: pd.DataFrame,
+            additional_features: pd.DataFrame = None
+    ) -> pd.DataFrame:
+        """
+        Like calculate_features, but look the features of the pair up in the feature cache first. If the klines extend
+        the cached ones, only the features of the new klines are calculated. The additional features are not cached.
+        """
+        if self._cache is None:
+            return self.calculate_features(klines, additional_features)
+        entry = self._cache.lookup(self._config, pair, klines, self.features)
+        if entry is not None and entry.rows == klines.shape[0]:
+            features = entry.features
+        else:
+            stream = None
+            if entry is not None and entry.stream_state is not None \
+                    and klines.shape[0] - entry.rows <= self._cache.MAX_TAIL_ROWS:
+                stream = self.create_stream()
+                stream.load_state(entry.stream_state)
+                features = pd.concat([entry.features, stream.extend(klines.iloc[entry.rows:])], ignore_index=True)
+            else:
+                features = self.calculate_features(klines)
+                if self.supports_streaming():
+                    stream = FeatureStream.from_history(self._config, klines, self.features)
+            self._cache.store(
+                feature_config=self._config,
+                pair=pair,
+                klines=klines,
+                features=features,
+                stream_state=stream.dump_state() if stream is not None else None
+            )
+        features.index = klines.index
+        return pd.concat([features, additional_features], axis=1)
+
+    def create_stream(self) -> 'FeatureStream':
+        """Return an empty FeatureStream using the same configuration as this calculator."""
+        return FeatureStream(self._config, self.features)
+
+    def supports_streaming(self) -> bool:
+        """Return whether create_stream supports the configuration and the features of this calculator."""
+        return FeatureStream.supports(self._config, self.features)
+
+
+class FeatureStream:
+    """
+    Stateful, incremental counterpart of FeatureCalculator.calculate_features. Every update consumes a single kline and
+    costs O(1), independent of the window size. Only the accumulators of the requested features are updated.
+    "The same numbers as the batch path" holds with two qualifications:
+    - The reference is calculate_features called on all klines the stream has consumed since it was seeded, not on a
+      moving window of the last klines. The EMAs (and the MACD) of a window restart at its first kline, the ones of the
+      stream do not; recalculating every window is exactly the work the stream avoids.
+    - The values match up to floating point rounding, with a relative deviation of at most RELATIVE_TOLERANCE. The
+      accumulators replay the talib arithmetic, but the running sums restored by from_history are added up in a
+      different order than talib does (see indicator_accumulators).
+    The stream is used by the live MarketData, which backs SingleAssetState. The backtest loop does not use it:
+    TrainingState calculates the features of the whole history once and slices them (see TrainingState), which is
+    cheaper per step than any update and is the batch path itself.
+    """
+
+    # Largest relative deviation of the features from the ones of calculate_features
+    RELATIVE_TOLERANCE = 1e-9
+
+    # Features produced by each accumulator, the streams support no other features
+    ACCUMULATOR_FEATURES = {
+        Indicators.BOLL_MID: [Indicators.BOLL_UP, Indicators.BOLL_MID, Indicators.BOLL_LOW],
+        Indicators.EMA_SHORT: [Indicators.EMA_SHORT],
+        Indicators.EMA_MID: [Indicators.EMA_MID],
+        Indicators.EMA_LONG: [Indicators.EMA_LONG],
+        Indicators.MACD: [Indicators.MACD, Indicators.MACD_SIGNAL, Indicators.MACD_HIST],
+        Indicators.OBV: [Indicators.OBV]
+    }
+
+    def __init__(self, feature_config: FeatureConfig, features: List[str] = None):
+        if not self.supports(feature_config, features):
+            raise ValueError("FeatureStream only supports bbands_matype = 0 (SMA) and the features "
+                             f"{[feature for features in self.ACCUMULATOR_FEATURES.values() for feature in features]}.")
+        self._config = feature_config
+        self.features = resolve_features(features)
+        self._accumulator_keys = [
+            key for key, accumulator_features in self.ACCUMULATOR_FEATURES.items()
+            if any(feature in self.features for feature in accumulator_features)
+        ]
+        self._accumulators = None
+        self._snapshots = None
+        self._features: Optional[RingBuffer] = None
+        self.last_time_open = None
+        self.reset()
+
+    @classmethod
+    def supports(cls, feature_config: FeatureConfig, features: List[str] = None) -> bool:
+        stream_features = {feature for features in cls.ACCUMULATOR_FEATURES.values() for feature in features}
+        return feature_config.BBANDS_MATYPE == 0 and set(resolve_features(features)) <= stream_features
+
+    @classmethod
+    def from_history(
+            cls,
+            feature_config: FeatureConfig,
+            klines: pd.DataFrame,
+            features: List[str] = None
+    ) -> 'FeatureStream':
+        """
+        Return a stream in the state it would have after consuming all given klines. The state is restored with
+        vectorized passes over the klines, so this is much faster than seeding the stream kline by kline, but the
+        running sums are added up in a different order and the following features differ in the last digits.
+        """
+        stream = cls(feature_config, features)
+        closes = klines[KlineProps.CLOSE].to_numpy(dtype=np.float64)
+        volumes = klines[KlineProps.VOLUME].to_numpy(dtype=np.float64)
+        if feature_config.EXP_SMOOTHING_ENABLED:
+            alpha = feature_config.EXP_SMOOTHING_ALPHA
+            stream._accumulators[KlineProps.CLOSE] = ExpSmoothingAccumulator.from_history(alpha, closes)
+            stream._accumulators[KlineProps.VOLUME] = ExpSmoothingAccumulator.from_history(alpha, volumes)
+            closes = calc_exponential_smoothing(pd.Series(closes), alpha).to_numpy()
+            volumes = calc_exponential_smoothing(pd.Series(volumes), alpha).to_numpy()
+        restore = {
+            Indicators.BOLL_MID: lambda: BollingerAccumulator.from_history(
+                bbands_period=feature_config.BBANDS_PERIOD,
+                bbands_lower=feature_config.BBANDS_LOWER,
+                bbands_upper=feature_config.BBANDS_UPPER,
+                values=closes
+            ),
+            Indicators.EMA_SHORT: lambda: EmaAccumulator.from_history(feature_config.EMA_PERIOD_SHORT, closes),
+            Indicators.EMA_MID: lambda: EmaAccumulator.from_history(feature_config.EMA_PERIOD_MID, closes),
+            Indicators.EMA_LONG: lambda: EmaAccumulator.from_history(feature_config.EMA_PERIOD_LONG, closes),
+            Indicators.MACD: lambda: MacdAccumulator.from_history(
+                macd_fastperiod=feature_config.MACD_FASTPERIOD,
+                macd_slowperiod=feature_config.MACD_SLOWPERIOD,
+                macd_signalperiod=feature_config.MACD_SIGNALPERIOD,
+                values=closes
+            ),
+            Indicators.OBV: lambda: ObvAccumulator.from_history(closes, volumes)
+        }
+        stream._accumulators.update({key: restore[key]() for key in stream._accumulator_keys})
+        if klines.shape[0] > 0:
+            stream.last_time_open = klines[KlineProps.TIME_OPEN].iloc[-1]
+        return stream
+
+    def dump_state(self) -> bytes:
+        """Serialize the state of the accumulators, e.g. to continue the stream in another process."""
+        return pickle.dumps((self._accumulators, self.last_time_open))
+
+    def load_state(self, state: bytes) -> None:
+        """Continue the stream from a state returned by dump_state. The stream has to use the same configuration."""
+        self.reset()
+        self._accumulators, self.last_time_open = pickle.loads(state)
+
+    def _create_accumulators(self) -> Dict[str, Any]:
+        create = {
+            Indicators.BOLL_MID: lambda: BollingerAccumulator(
                 bbands_period=self._config.BBANDS_PERIOD,
                 bbands_lower=self._config.BBANDS_LOWER,
-                bbands_upper=self._config.BBANDS_UPPER,
-                bbands_matype=self._config.BBANDS_MATYPE
-            ),
-            calc_ema(
-                prices=closes,
-                ema_period_short=self._config.EMA_PERIOD_SHORT,
-                ema_period_mid=self._config.EMA_PERIOD_MID,
-                ema_period_long=self._config.EMA_PERIOD_LONG
+                bbands_upper=self._config.BBANDS_UPPER
             ),
-            calc_macd(
-                prices=closes,
+            Indicators.EMA_SHORT: lambda: EmaAccumulator(self._config.EMA_PERIOD_SHORT),
+            Indicators.EMA_MID: lambda: EmaAccumulator(self._config.EMA_PERIOD_MID),
+            Indicators.EMA_LONG: lambda: EmaAccumulator(self._config.EMA_PERIOD_LONG),
+            Indicators.MACD: lambda: MacdAccumulator(
                 macd_fastperiod=self._config.MACD_FASTPERIOD,
                 macd_slowperiod=self._config.MACD_SLOWPERIOD,
                 macd_signalperiod=self._config.MACD_SIGNALPERIOD
             ),
-            calc_obv(
-                prices=closes,
-                volumes=volumes
-            ),
-            additional_features
-        ]
-        return pd.concat(features, axis=1)
+            Indicators.OBV: lambda: ObvAccumulator()
+        }
+        accumulators = {key: create[key]() for key in self._accumulator_keys}
+        if self._config.EXP_SMOOTHING_ENABLED:
+            accumulators[KlineProps.CLOSE] = ExpSmoothingAccumulator(self._config.EXP_SMOOTHING_ALPHA)
+            accumulators[KlineProps.VOLUME] = ExpSmoothingAccumulator(self._config.EXP_SMOOTHING_ALPHA)
+        return accumulators
+
+    def update(self, kline: Mapping[str, float], additional_features: Mapping[str, float] = None) -> Dict[str, float]:
+        """
+        Consume the next kline and return its features as a dict. If the kline has the same open time as the previous
+        one (e.g. an updated, still open candle), it replaces the previous kline instead of being appended.
+        """
+        time_open = kline[KlineProps.TIME_OPEN]
+        if time_open == self.last_time_open:
+            for key, snapshot in self._snapshots.items():
+                self._accumulators[key].restore(snapshot)
+        self._snapshots = {key: accumulator.snapshot() for key, accumulator in self._accumulators.items()}
+        self.last_time_open = time_open
+
+        close = float(kline[KlineProps.CLOSE])
+        volume = float(kline[KlineProps.VOLUME])
+        if self._config.EXP_SMOOTHING_ENABLED:
+            with instrumentation.span('feature', indicator='exp_smoothing'):
+                close = self._accumulators[KlineProps.CLOSE].update(close)
+                volume = self._accumulators[KlineProps.VOLUME].update(volume)
+
+        values = {}
+        for key in self._accumulator_keys:
+            with instrumentation.span('feature', indicator=key):
+                if key == Indicators.OBV:
+                    outputs = [self._accumulators[key].update(close, volume)]
+                elif key in (Indicators.BOLL_MID, Indicators.MACD):
+                    outputs = self._accumulators[key].update(close)
+                else:
+                    outputs = [self._accumulators[key].update(close)]
+            values.update(zip(self.ACCUMULATOR_FEATURES[key], outputs))
+        features = {KlineProps.TIME_OPEN: time_open}
+        features.update((feature, values[feature]) for feature in self.features)
+        if additional_features is not None:
+            features.update(additional_features)
+        return features
+
+    def calculate_features(
+            self,
+            klines: pd.DataFrame,
+            additional_features: pd.DataFrame = None
+    ) -> pd.DataFrame:
+        """
+        Drop-in replacement for FeatureCalculator.calculate_features for a window that moves forward over time. Only
+        klines which are newer than the last consumed one are processed. If the window does not overlap with the
+        consumed klines anymore or grew, the stream is reset and seeded with the whole window. The returned dataframe
+        is backed by the stream's buffer and only valid until the next call.
+        """
+        time_opens = klines[KlineProps.TIME_OPEN]
+        if self._features is None or klines.shape[0] > self._features.capacity \
+                or time_opens.iloc[0] > self.last_time_open or time_opens.iloc[-1] < self.last_time_open:
+            self._seed(klines, additional_features)
+        else:
+            self._append(klines, additional_features)
+        features = self._features.to_dataframe().iloc[-klines.shape[0]:]
+        features.index = klines.index
+        return features
+
+    def extend(self, klines: pd.DataFrame) -> pd.DataFrame:
+        """Consume klines which are all newer than the last consumed one and return their features."""
+        rows = [self.update(kline=klines.iloc[position]) for position in range(klines.shape[0])]
+        return pd.DataFrame(rows, index=klines.index)
+
+    def reset(self) -> None:
+        self._accumulators = self._create_accumulators()
+        self._snapshots = None
+        self._features = None
+        self.last_time_open = None
+
+    def _seed(self, klines: pd.DataFrame, additional_features: pd.DataFrame = None) -> None:
+        self.reset()
+        columns = [KlineProps.TIME_OPEN] + self.features
+        if additional_features is not None:
+            columns += list(additional_features.columns)
+        self._features = RingBuffer(columns, capacity=klines.shape[0])
+        self._append(klines, additional_features)
+
+    def _append(self, klines: pd.DataFrame, additional_features: pd.DataFrame = None) -> None:
+        """Write the features of the klines newer than the last consumed one into the buffer."""
+        time_opens = klines[KlineProps.TIME_OPEN].values
+        positions = np.flatnonzero(time_opens >= self.last_time_open) if self.last_time_open is not None \
+            else range(klines.shape[0])
+        for position in positions:
+            replace = time_opens[position] == self.last_time_open
+            features = self.update(
+                kline=klines.iloc[position],
+                additional_features=additional_features.iloc[position] if additional_features is not None else None
+            )
+            row = [features[column] for column in self._features.columns]
+            if replace:
+                self._features.replace_last(row)
+            else:
+                self._features.append(row)
@@ -0,0 +1,252 @@
+from collections import deque
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import talib
+
+"""
+Streaming counterparts of the functions in indicator_functions.py. Each accumulator consumes one value per kline and
+replays the arithmetic of the corresponding talib/pandas routine in the same order, so that feeding a series value by
+value yields the same numbers as the batch function applied to the whole series. from_history() restores the state an
+accumulator has after consuming a whole series with vectorized passes instead of replaying it value by value. Its
+running sums are added up in a different order, so values continued from it match the batch function only up to floating
+point rounding. snapshot() returns the few scalars needed to undo the following update with restore().
+"""
+
+
+class ExpSmoothingAccumulator:
+    """Running version of calc_exponential_smoothing (pandas ewm(alpha=...).mean() with adjust=True)."""
+
+    def __init__(self, exp_smoothing_alpha: float):
+        self._old_wt_factor = 1. - exp_smoothing_alpha
+        self._old_wt = 1.
+        self._weighted = np.nan
+
+    @classmethod
+    def from_history(cls, exp_smoothing_alpha: float, values: np.ndarray) -> 'ExpSmoothingAccumulator':
+        accumulator = cls(exp_smoothing_alpha)
+        if len(values) > 0:
+            accumulator._weighted = pd.Series(values).ewm(alpha=exp_smoothing_alpha).mean().iloc[-1]
+            # Closed form of old_wt = old_wt * (1 - alpha) + 1, iterated for every value after the first one
+            accumulator._old_wt = (1. - accumulator._old_wt_factor ** len(values)) / exp_smoothing_alpha
+        return accumulator
+
+    def update(self, value: float) -> float:
+        if self._weighted != self._weighted:
+            self._weighted = value
+            return self._weighted
+        self._old_wt *= self._old_wt_factor
+        if self._weighted != value:
+            self._weighted = (self._old_wt * self._weighted + value) / (self._old_wt + 1.)
+        self._old_wt += 1.
+        return self._weighted
+
+    def snapshot(self) -> tuple:
+        return self._old_wt, self._weighted
+
+    def restore(self, snapshot: tuple) -> None:
+        self._old_wt, self._weighted = snapshot
+
+
+class EmaAccumulator:
+    """Running version of talib.EMA. The first value is the SMA of the first `period` inputs."""
+
+    def __init__(self, period: int):
+        self._period = period
+        self._k = 2.0 / (period + 1)
+        self._count = 0
+        self._total = 0.0
+        self.value = np.nan
+
+    @classmethod
+    def from_history(cls, period: int, values: np.ndarray) -> 'EmaAccumulator':
+        accumulator = cls(period)
+        accumulator._count = min(len(values), period)
+        accumulator._total = float(np.sum(values[:period]))
+        if len(values) >= period:
+            accumulator.value = talib.EMA(values, timeperiod=period)[-1]
+        return accumulator
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self._period
+
+    def update(self, value: float) -> float:
+        if self._count < self._period:
+            self._total += value
+            self._count += 1
+            if self._count == self._period:
+                self.value = self._total / self._period
+            return self.value
+        self.value = ((value - self.value) * self._k) + self.value
+        return self.value
+
+    def snapshot(self) -> tuple:
+        return self._count, self._total, self.value
+
+    def restore(self, snapshot: tuple) -> None:
+        self._count, self._total, self.value = snapshot
+
+
+class BollingerAccumulator:
+    """
+    Running version of calc_bollinger_bands for matype 0 (SMA). Keeps the running sum and sum of squares of the last
+    `period` values, which is how talib computes the middle band and the standard deviation.
+    """
+
+    _SCALE = 10000
+
+    def __init__(self, bbands_period: int, bbands_lower: int, bbands_upper: int):
+        self._period = bbands_period
+        self._nbdev_lower = bbands_lower
+        self._nbdev_upper = bbands_upper
+        self._window = deque()
+        self._total = 0.0
+        self._total_sq = 0.0
+
+    @classmethod
+    def from_history(
+            cls,
+            bbands_period: int,
+            bbands_lower: int,
+            bbands_upper: int,
+            values: np.ndarray
+    ) -> 'BollingerAccumulator':
+        accumulator = cls(bbands_period=bbands_period, bbands_lower=bbands_lower, bbands_upper=bbands_upper)
+        # After every complete window, its oldest value has already been removed again
+        window = values[len(values) - min(len(values), bbands_period - 1):] * cls._SCALE
+        accumulator._window.extend(window)
+        accumulator._total = float(np.sum(window))
+        accumulator._total_sq = float(np.sum(window * window))
+        return accumulator
+
+    def update(self, value: float) -> Tuple[float, float, float]:
+        value = value * self._SCALE
+        self._window.append(value)
+        self._total += value
+        self._total_sq += value * value
+        if len(self._window) < self._period:
+            return np.nan, np.nan, np.nan
+        trailing = self._window.popleft()
+        mid = self._total / self._period
+        self._total -= trailing
+        variance = self._total_sq / self._period
+        self._total_sq -= trailing * trailing
+        variance -= mid * mid
+        std = np.sqrt(variance) if variance >= 0.00000001 else 0.0
+        return (
+            (mid + std * self._nbdev_upper) / self._SCALE,
+            mid / self._SCALE,
+            (mid - std * self._nbdev_lower) / self._SCALE
+        )
+
+    def snapshot(self) -> tuple:
+        # An update appends one value and, once the window is complete, removes the oldest one again
+        return self._total, self._total_sq, len(self._window), self._window[0] if self._window else None
+
+    def restore(self, snapshot: tuple) -> None:
+        self._total, self._total_sq, length, oldest = snapshot
+        if length > 0 or length + 1 < self._period:
+            self._window.pop()
+        if length > 0 and length + 1 >= self._period:
+            self._window.appendleft(oldest)
+
+
+class MacdAccumulator:
+    """
+    Running version of calc_macd. Like talib, the fast EMA is seeded on the `fastperiod` values preceding the first
+    slow EMA value so that both lines start at the same kline.
+    """
+
+    _SCALE = 10000
+
+    def __init__(self, macd_fastperiod: int, macd_slowperiod: int, macd_signalperiod: int):
+        if macd_slowperiod < macd_fastperiod:
+            macd_fastperiod, macd_slowperiod = macd_slowperiod, macd_fastperiod
+        self._fast_start = macd_slowperiod - macd_fastperiod
+        self._fast = EmaAccumulator(macd_fastperiod)
+        self._slow = EmaAccumulator(macd_slowperiod)
+        self._signal = EmaAccumulator(macd_signalperiod)
+        self._count = 0
+
+    @classmethod
+    def from_history(
+            cls,
+            macd_fastperiod: int,
+            macd_slowperiod: int,
+            macd_signalperiod: int,
+            values: np.ndarray
+    ) -> 'MacdAccumulator':
+        accumulator = cls(
+            macd_fastperiod=macd_fastperiod,
+            macd_slowperiod=macd_slowperiod,
+            macd_signalperiod=macd_signalperiod
+        )
+        values = values * cls._SCALE
+        fast_period, slow_period = accumulator._fast._period, accumulator._slow._period
+        fast_values = values[accumulator._fast_start:]
+        accumulator._fast = EmaAccumulator.from_history(fast_period, fast_values)
+        accumulator._slow = EmaAccumulator.from_history(slow_period, values)
+        accumulator._count = len(values)
+        if len(values) >= slow_period:
+            # The MACD line starts with the first value of the slow EMA
+            macd = talib.EMA(fast_values, timeperiod=fast_period)[fast_period - 1:] \
+                - talib.EMA(values, timeperiod=slow_period)[slow_period - 1:]
+            accumulator._signal = EmaAccumulator.from_history(macd_signalperiod, macd)
+        return accumulator
+
+    def update(self, value: float) -> Tuple[float, float, float]:
+        value = value * self._SCALE
+        if self._count >= self._fast_start:
+            self._fast.update(value)
+        self._slow.update(value)
+        self._count += 1
+        if not self._slow.ready:
+            return np.nan, np.nan, np.nan
+        macd = self._fast.value - self._slow.value
+        signal = self._signal.update(macd)
+        if not self._signal.ready:
+            return np.nan, np.nan, np.nan
+        return macd, signal, macd - signal
+
+    def snapshot(self) -> tuple:
+        return self._fast.snapshot(), self._slow.snapshot(), self._signal.snapshot(), self._count
+
+    def restore(self, snapshot: tuple) -> None:
+        fast, slow, signal, self._count = snapshot
+        self._fast.restore(fast)
+        self._slow.restore(slow)
+        self._signal.restore(signal)
+
+
+class ObvAccumulator:
+    """Running version of calc_obv."""
+
+    def __init__(self):
+        self._obv = np.nan
+        self._prev_price = np.nan
+
+    @classmethod
+    def from_history(cls, prices: np.ndarray, volumes: np.ndarray) -> 'ObvAccumulator':
+        accumulator = cls()
+        if len(prices) > 0:
+            accumulator._obv = talib.OBV(prices, volumes)[-1]
+            accumulator._prev_price = prices[-1]
+        return accumulator
+
+    def update(self, price: float, volume: float) -> float:
+        if self._obv != self._obv:
+            self._obv = volume
+        elif price > self._prev_price:
+            self._obv += volume
+        elif price < self._prev_price:
+            self._obv -= volume
+        self._prev_price = price
+        return self._obv
+
+    def snapshot(self) -> tuple:
+        return self._obv, self._prev_price
+
+    def restore(self, snapshot: tuple) -> None:
+        self._obv, self._prev_price = snapshot
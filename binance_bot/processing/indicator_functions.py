@@ -69,9 +69,25 @@ def calc_adx(hights: np.ndarray, lows: np.ndarray, closes: np.ndarray, adx_perio
     return pd.Series(talib.ADX(high=hights, low=lows, close=closes, timeperiod=adx_period), name=Indicators.ADX)
 
 
-def calc_cci(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, cci_period: int) -> pd.Series:
-    """Calculate the CCI. Return a 1d numpy array containing the CCI-values."""
-    return pd.Series(talib.CCI(high=highs, low=lows, close=closes, timeperiod=cci_period), name=Indicators.CCI)
+def calc_cci(typical_prices: pd.Series, cci_period: int) -> pd.Series:
+    """
+    Calculate the CCI from the typical prices (see calc_typical_price) like talib.CCI does from the high, low and close
+    prices: (typical price - SMA) / (0.015 * mean absolute deviation from the SMA), 0 if there is no deviation.
+    Return a series containing the CCI-values.
+    """
+    prices = typical_prices.to_numpy(dtype=np.float64)
+    cci = np.full(len(prices), np.nan)
+    if len(prices) >= cci_period:
+        sma = talib.SMA(prices, timeperiod=cci_period)[cci_period - 1:]
+        # Sum the deviations lag by lag, so no array of all windows is created
+        mean_deviation = np.zeros(len(sma))
+        for lag in range(cci_period):
+            mean_deviation += np.abs(prices[cci_period - 1 - lag:len(prices) - lag] - sma)
+        mean_deviation /= cci_period
+        deviation = prices[cci_period - 1:] - sma
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cci[cci_period - 1:] = np.where(mean_deviation != 0, deviation / (0.015 * mean_deviation), 0.)
+    return pd.Series(cci, index=typical_prices.index, name=Indicators.CCI)
 
 
 def calc_macd(prices: np.ndarray, macd_fastperiod: int, macd_slowperiod: int, macd_signalperiod: int) -> pd.DataFrame:
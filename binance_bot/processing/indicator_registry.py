@@ -0,0 +1,285 @@
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas as pd
+import talib
+
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.constants import Indicators, KlineProps
+from binance_bot.processing.indicator_functions import *
+
+
+class Inputs:
+    """
+    Intermediate columns of the price series every indicator is calculated from. They are the exponentially smoothed
+    kline columns if smoothing is enabled and the kline columns otherwise, and are calculated once for all indicators.
+    """
+    OPEN = "input_open"
+    HIGH = "input_high"
+    LOW = "input_low"
+    CLOSE = "input_close"
+    VOLUME = "input_volume"
+
+
+class Indicator:
+    """
+    Node of the feature graph. function(feature_config, klines, *inputs) calculates the output columns from the columns
+    listed in inputs, in that order, and returns them as a dataframe with these columns or, for a single output, as a
+    series. parameters are the fields of FeatureConfig the outputs depend on. The outputs of intermediate indicators
+    are only calculated as inputs of other indicators and can not be requested as features.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            inputs: List[str],
+            outputs: List[str],
+            parameters: List[str],
+            function: Callable[..., Union[pd.DataFrame, pd.Series]],
+            intermediate: bool = False
+    ):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.parameters = parameters
+        self.function = function
+        self.intermediate = intermediate
+
+    def calculate(
+            self,
+            feature_config: FeatureConfig,
+            klines: pd.DataFrame,
+            columns: Dict[str, pd.Series]
+    ) -> Dict[str, pd.Series]:
+        result = self.function(feature_config, klines, *[columns[column] for column in self.inputs])
+        if isinstance(result, pd.Series):
+            return {self.outputs[0]: result}
+        return {column: result[column] for column in self.outputs}
+
+
+class IndicatorRegistry:
+    """
+    All indicators the feature calculator knows, by the columns they produce. Requested feature columns are resolved
+    to the indicators they need, including the ones producing their inputs, so that every indicator and intermediate
+    column is calculated at most once and indicators whose columns nobody requested are skipped.
+    """
+
+    def __init__(self):
+        self._indicators: Dict[str, Indicator] = {}
+        self._producers: Dict[str, Indicator] = {}
+
+    def register(self, indicator: Indicator) -> None:
+        for column in indicator.outputs:
+            if column in self._producers:
+                raise ValueError(f"Column {column} is already produced by {self._producers[column].name}.")
+        self._indicators[indicator.name] = indicator
+        self._producers.update({column: indicator for column in indicator.outputs})
+
+    @property
+    def columns(self) -> List[str]:
+        """All feature columns which can be requested."""
+        return [column for column, indicator in self._producers.items() if not indicator.intermediate]
+
+    def resolve(self, columns: List[str]) -> List[Indicator]:
+        """Return the indicators needed for the given columns, each one after the indicators producing its inputs."""
+        plan: List[Indicator] = []
+        visiting = set()
+
+        def visit(column: str) -> None:
+            if column not in self._producers:
+                raise ValueError(f"Unknown feature {column}, known features are {self.columns}.")
+            indicator = self._producers[column]
+            if indicator in plan:
+                return
+            if indicator.name in visiting:
+                raise ValueError(f"Cyclic dependency of indicator {indicator.name}.")
+            visiting.add(indicator.name)
+            for input_column in indicator.inputs:
+                visit(input_column)
+            visiting.remove(indicator.name)
+            plan.append(indicator)
+
+        for column in columns:
+            visit(column)
+        return plan
+
+    def parameters(self, columns: List[str]) -> List[str]:
+        """Return the fields of FeatureConfig the given columns depend on."""
+        return sorted({parameter for indicator in self.resolve(columns) for parameter in indicator.parameters})
+
+
+def _input(column: str) -> Callable[[FeatureConfig, pd.DataFrame], pd.Series]:
+    def calculate(feature_config: FeatureConfig, klines: pd.DataFrame) -> pd.Series:
+        if feature_config.EXP_SMOOTHING_ENABLED:
+            return calc_exponential_smoothing(
+                prices=klines[column],
+                exp_smoothing_alpha=feature_config.EXP_SMOOTHING_ALPHA
+            )
+        return klines[column]
+    return calculate
+
+
+registry = IndicatorRegistry()
+
+for _column, _input_column in [(KlineProps.OPEN, Inputs.OPEN), (KlineProps.HIGH, Inputs.HIGH),
+                               (KlineProps.LOW, Inputs.LOW), (KlineProps.CLOSE, Inputs.CLOSE),
+                               (KlineProps.VOLUME, Inputs.VOLUME)]:
+    registry.register(Indicator(
+        name=_input_column,
+        inputs=[],
+        outputs=[_input_column],
+        parameters=['EXP_SMOOTHING_ENABLED', 'EXP_SMOOTHING_ALPHA'],
+        function=_input(_column),
+        intermediate=True
+    ))
+
+# TREND INDICATORS
+
+registry.register(Indicator(
+    name='bbands',
+    inputs=[Inputs.CLOSE],
+    outputs=[Indicators.BOLL_UP, Indicators.BOLL_MID, Indicators.BOLL_LOW],
+    parameters=['BBANDS_PERIOD', 'BBANDS_UPPER', 'BBANDS_LOWER', 'BBANDS_MATYPE'],
+    function=lambda config, klines, closes: calc_bollinger_bands(
+        prices=closes,
+        bbands_period=config.BBANDS_PERIOD,
+        bbands_lower=config.BBANDS_LOWER,
+        bbands_upper=config.BBANDS_UPPER,
+        bbands_matype=config.BBANDS_MATYPE
+    )
+))
+
+for _column, _period in [(Indicators.EMA_SHORT, 'EMA_PERIOD_SHORT'), (Indicators.EMA_MID, 'EMA_PERIOD_MID'),
+                         (Indicators.EMA_LONG, 'EMA_PERIOD_LONG')]:
+    registry.register(Indicator(
+        name=_column,
+        inputs=[Inputs.CLOSE],
+        outputs=[_column],
+        parameters=[_period],
+        function=lambda config, klines, closes, column=_column, period=_period: pd.Series(
+            talib.EMA(closes, timeperiod=getattr(config, period)), index=closes.index, name=column
+        )
+    ))
+
+for _column, _period in [(Indicators.SMA_SHORT, 'SMA_PERIOD_SHORT'), (Indicators.SMA_MID, 'SMA_PERIOD_MID'),
+                         (Indicators.SMA_LONG, 'SMA_PERIOD_LONG')]:
+    registry.register(Indicator(
+        name=_column,
+        inputs=[Inputs.CLOSE],
+        outputs=[_column],
+        parameters=[_period],
+        function=lambda config, klines, closes, column=_column, period=_period: pd.Series(
+            talib.SMA(closes, timeperiod=getattr(config, period)), index=closes.index, name=column
+        )
+    ))
+
+registry.register(Indicator(
+    name=Indicators.TYPICAL_PRICE,
+    inputs=[Inputs.HIGH, Inputs.LOW, Inputs.CLOSE],
+    outputs=[Indicators.TYPICAL_PRICE],
+    parameters=[],
+    function=lambda config, klines, highs, lows, closes: calc_typical_price(highs=highs, lows=lows, closes=closes)
+))
+
+# MOMENTUM INDICATORS
+
+registry.register(Indicator(
+    name=Indicators.ADX,
+    inputs=[Inputs.HIGH, Inputs.LOW, Inputs.CLOSE],
+    outputs=[Indicators.ADX],
+    parameters=['ADX_PERIOD'],
+    function=lambda config, klines, highs, lows, closes: calc_adx(
+        hights=highs, lows=lows, closes=closes, adx_period=config.ADX_PERIOD
+    )
+))
+
+registry.register(Indicator(
+    name=Indicators.CCI,
+    inputs=[Indicators.TYPICAL_PRICE],
+    outputs=[Indicators.CCI],
+    parameters=['CCI_PERIOD'],
+    function=lambda config, klines, typical_prices: calc_cci(
+        typical_prices=typical_prices, cci_period=config.CCI_PERIOD
+    )
+))
+
+registry.register(Indicator(
+    name='macd',
+    inputs=[Inputs.CLOSE],
+    outputs=[Indicators.MACD, Indicators.MACD_SIGNAL, Indicators.MACD_HIST],
+    parameters=['MACD_FASTPERIOD', 'MACD_SLOWPERIOD', 'MACD_SIGNALPERIOD'],
+    function=lambda config, klines, closes: calc_macd(
+        prices=closes,
+        macd_fastperiod=config.MACD_FASTPERIOD,
+        macd_slowperiod=config.MACD_SLOWPERIOD,
+        macd_signalperiod=config.MACD_SIGNALPERIOD
+    )
+))
+
+registry.register(Indicator(
+    name=Indicators.RSI,
+    inputs=[Inputs.CLOSE],
+    outputs=[Indicators.RSI],
+    parameters=['RSI_PERIOD'],
+    function=lambda config, klines, closes: calc_rsi(closes=closes, rsi_period=config.RSI_PERIOD)
+))
+
+registry.register(Indicator(
+    name=Indicators.ROC,
+    inputs=[Inputs.CLOSE],
+    outputs=[Indicators.ROC],
+    parameters=['ROC_PERIOD'],
+    function=lambda config, klines, closes: calc_roc(closes=closes, roc_period=config.ROC_PERIOD)
+))
+
+registry.register(Indicator(
+    name='stoch_rsi',
+    inputs=[Inputs.CLOSE],
+    outputs=[Indicators.STOCH_RSI_FASTK, Indicators.STOCH_RSI_FASTD],
+    parameters=['STOCH_RSI_PERIOD', 'FASTK_PERIOD', 'FASTD_PERIOD', 'FASTD_MATYPE'],
+    function=lambda config, klines, closes: calc_stoch_rsi(
+        closes=closes,
+        stoch_rsi_period=config.STOCH_RSI_PERIOD,
+        fastk_period=config.FASTK_PERIOD,
+        fastd_period=config.FASTD_PERIOD,
+        fastd_matype=config.FASTD_MATYPE
+    )
+))
+
+registry.register(Indicator(
+    name=Indicators.WILL_R,
+    inputs=[Inputs.HIGH, Inputs.LOW, Inputs.CLOSE],
+    outputs=[Indicators.WILL_R],
+    parameters=['WILL_R_PERIOD'],
+    function=lambda config, klines, highs, lows, closes: calc_will_r(
+        highs=highs, lows=lows, closes=closes, will_r_period=config.WILL_R_PERIOD
+    )
+))
+
+# VOLUME INDICATORS
+
+registry.register(Indicator(
+    name=Indicators.OBV,
+    inputs=[Inputs.CLOSE, Inputs.VOLUME],
+    outputs=[Indicators.OBV],
+    parameters=[],
+    function=lambda config, klines, closes, volumes: calc_obv(prices=closes, volumes=volumes)
+))
+
+# Features calculated if no features are requested explicitly, in the order of their columns
+DEFAULT_FEATURES = [
+    Indicators.BOLL_UP,
+    Indicators.BOLL_MID,
+    Indicators.BOLL_LOW,
+    Indicators.EMA_SHORT,
+    Indicators.EMA_MID,
+    Indicators.EMA_LONG,
+    Indicators.MACD,
+    Indicators.MACD_SIGNAL,
+    Indicators.MACD_HIST,
+    Indicators.OBV
+]
+
+
+def resolve_features(features: Optional[List[str]]) -> List[str]:
+    """Return the requested features, or the default features for None."""
+    return list(DEFAULT_FEATURES) if features is None else list(dict.fromkeys(features))
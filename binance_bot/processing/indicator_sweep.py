@@ -0,0 +1,140 @@
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+import talib
+
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.constants import Indicators, KlineProps
+from binance_bot.processing.indicator_functions import calc_exponential_smoothing, calc_obv
+
+
+class IndicatorSweep:
+    """
+    Calculate the features of many FeatureConfig variants on the same klines in one batched pass. Every distinct
+    indicator column is calculated only once and shared by all variants using it. The same goes for the intermediate
+    results of the indicators: the smoothed prices per alpha, the middle band and standard deviation of the Bollinger
+    Bands per period (the bands of all deviations are derived from them) and the fast and slow EMAs of the MACD (the
+    signal lines of all signal periods are derived from them).
+    The resulting columns are the same as the ones of FeatureCalculator.calculate_features.
+    """
+
+    _SCALE = 10000
+
+    def __init__(self, klines: pd.DataFrame):
+        self._klines = klines
+        self._columns: Dict[str, np.ndarray] = {KlineProps.TIME_OPEN: klines[KlineProps.TIME_OPEN].to_numpy()}
+        self._intermediates: Dict[str, object] = {}
+
+    @property
+    def table(self) -> pd.DataFrame:
+        """All distinct feature columns calculated so far, named by their keys."""
+        return pd.DataFrame(self._columns, copy=False)
+
+    def add(self, feature_config: FeatureConfig) -> Dict[str, str]:
+        """
+        Calculate the feature columns of the configuration which are not calculated yet. Return a mapping from the
+        feature names to the keys of their columns in the table.
+        """
+        config = feature_config
+        prefix, closes, volumes = self._prices(config)
+
+        bbands_key = f"{prefix}|{config.BBANDS_PERIOD}|{config.BBANDS_MATYPE}"
+        mid, std = self._intermediate(
+            'bbands|' + bbands_key,
+            lambda: self._bbands_base(closes, config.BBANDS_PERIOD, config.BBANDS_MATYPE)
+        )
+        macd, macd_signal, macd_hist = self._macd(
+            prefix,
+            closes,
+            config.MACD_FASTPERIOD,
+            config.MACD_SLOWPERIOD,
+            config.MACD_SIGNALPERIOD
+        )
+        return {
+            KlineProps.TIME_OPEN: KlineProps.TIME_OPEN,
+            Indicators.BOLL_UP: self._column(
+                f"{Indicators.BOLL_UP}|{bbands_key}|{config.BBANDS_UPPER}",
+                lambda: (mid + std * config.BBANDS_UPPER) / self._SCALE
+            ),
+            Indicators.BOLL_MID: self._column(f"{Indicators.BOLL_MID}|{bbands_key}", lambda: mid / self._SCALE),
+            Indicators.BOLL_LOW: self._column(
+                f"{Indicators.BOLL_LOW}|{bbands_key}|{config.BBANDS_LOWER}",
+                lambda: (mid - std * config.BBANDS_LOWER) / self._SCALE
+            ),
+            Indicators.EMA_SHORT: self._ema(prefix, closes, config.EMA_PERIOD_SHORT),
+            Indicators.EMA_MID: self._ema(prefix, closes, config.EMA_PERIOD_MID),
+            Indicators.EMA_LONG: self._ema(prefix, closes, config.EMA_PERIOD_LONG),
+            Indicators.MACD: macd,
+            Indicators.MACD_SIGNAL: macd_signal,
+            Indicators.MACD_HIST: macd_hist,
+            Indicators.OBV: self._column(
+                f"{Indicators.OBV}|{prefix}",
+                lambda: calc_obv(prices=closes, volumes=volumes).to_numpy()
+            )
+        }
+
+    def _column(self, key: str, calculate: Callable[[], np.ndarray]) -> str:
+        if key not in self._columns:
+            self._columns[key] = calculate()
+        return key
+
+    def _intermediate(self, key: str, calculate: Callable[[], object]):
+        if key not in self._intermediates:
+            self._intermediates[key] = calculate()
+        return self._intermediates[key]
+
+    def _prices(self, config: FeatureConfig) -> Tuple[str, np.ndarray, np.ndarray]:
+        """Return the (smoothed) closes and volumes of the configuration and a key prefix identifying them."""
+        if not config.EXP_SMOOTHING_ENABLED:
+            prefix = 'raw'
+        else:
+            prefix = f"exp{config.EXP_SMOOTHING_ALPHA}"
+
+        def calculate() -> Tuple[np.ndarray, np.ndarray]:
+            closes = self._klines[KlineProps.CLOSE]
+            volumes = self._klines[KlineProps.VOLUME]
+            if config.EXP_SMOOTHING_ENABLED:
+                closes = calc_exponential_smoothing(prices=closes, exp_smoothing_alpha=config.EXP_SMOOTHING_ALPHA)
+                volumes = calc_exponential_smoothing(prices=volumes, exp_smoothing_alpha=config.EXP_SMOOTHING_ALPHA)
+            return closes.to_numpy(dtype=np.float64), volumes.to_numpy(dtype=np.float64)
+
+        closes, volumes = self._intermediate('prices|' + prefix, calculate)
+        return prefix, closes, volumes
+
+    def _bbands_base(self, closes: np.ndarray, period: int, matype: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the scaled middle band and standard deviation, the bands are mid +/- deviation * std."""
+        upper, mid, _ = talib.BBANDS(closes * self._SCALE, timeperiod=period, nbdevup=1, nbdevdn=1, matype=matype)
+        return mid, upper - mid
+
+    def _ema(self, prefix: str, closes: np.ndarray, period: int) -> str:
+        return self._column(f"ema|{prefix}|{period}", lambda: talib.EMA(closes, timeperiod=period))
+
+    def _macd(self, prefix: str, closes: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[str, str, str]:
+        """
+        Calculate the MACD like talib.MACD (see calc_macd): the fast EMA is seeded on the `fast` values preceding the
+        first value of the slow EMA, the signal line is the EMA of the MACD line and all three outputs start with the
+        first value of the signal line.
+        """
+        if slow < fast:
+            fast, slow = slow, fast
+        key = f"{prefix}|{fast}|{slow}|{signal}"
+        if f"{Indicators.MACD}|{key}" in self._columns:
+            return f"{Indicators.MACD}|{key}", f"{Indicators.MACD_SIGNAL}|{key}", f"{Indicators.MACD_HIST}|{key}"
+        scaled = self._intermediate('scaled|' + prefix, lambda: closes * self._SCALE)
+        fast_ema = self._intermediate(
+            f"macd_ema|{prefix}|{fast}|{slow - fast}",
+            lambda: talib.EMA(scaled[slow - fast:], timeperiod=fast)
+        )
+        slow_ema = self._intermediate(f"macd_ema|{prefix}|{slow}|0", lambda: talib.EMA(scaled, timeperiod=slow))
+        macd = np.full(len(scaled), np.nan)
+        macd_signal = np.full(len(scaled), np.nan)
+        start = slow - 1 + signal - 1
+        if len(scaled) > start:
+            line = fast_ema[fast - 1:] - slow_ema[slow - 1:]
+            macd[start:] = line[signal - 1:]
+            macd_signal[start:] = talib.EMA(line, timeperiod=signal)[signal - 1:]
+        self._columns[f"{Indicators.MACD}|{key}"] = macd
+        self._columns[f"{Indicators.MACD_SIGNAL}|{key}"] = macd_signal
+        self._columns[f"{Indicators.MACD_HIST}|{key}"] = macd - macd_signal
+        return f"{Indicators.MACD}|{key}", f"{Indicators.MACD_SIGNAL}|{key}", f"{Indicators.MACD_HIST}|{key}"
@@ -0,0 +1,84 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.constants import KlineProps
+
+
+class MissingKlinePolicy:
+    # Use the values of the previous kline of the pair
+    FORWARD_FILL = "ffill"
+    # Drop the timestamps at which any pair has no kline
+    DROP = "drop"
+    # Like FORWARD_FILL, but report pairs whose newest kline is behind the timeline so that they can be refetched
+    WAIT = "wait"
+
+
+class TimestampAligner:
+    """
+    Align the klines of any number of pairs to a timeline of open times (usually the one of the target pair). Each pair
+    is merged against the sorted timeline in one vectorized pass, missing klines are handled according to the policy.
+    """
+
+    def __init__(self, policy: str = MissingKlinePolicy.FORWARD_FILL):
+        if policy not in (MissingKlinePolicy.FORWARD_FILL, MissingKlinePolicy.DROP, MissingKlinePolicy.WAIT):
+            raise ValueError(f"Unknown missing kline policy: {policy}")
+        self.policy = policy
+
+    @staticmethod
+    def pairs_behind(timeline_end: float, last_time_opens: Dict[str, float]) -> List[str]:
+        """Return the pairs whose newest kline is older than the end of the timeline."""
+        return [pair for pair, last_time_open in last_time_opens.items() if last_time_open < timeline_end]
+
+    def align(
+            self,
+            timeline: np.ndarray,
+            pair_time_opens: Dict[str, np.ndarray],
+            pair_values: Dict[str, np.ndarray]
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Align the values of each pair (shape (n_klines, n_columns), sorted by time_open) to the timeline. Return a mask
+        of the timeline entries which are kept and the aligned values of each pair for the kept entries. Entries for
+        which a pair has no kline at or before the timestamp are NaN.
+        """
+        keep = np.ones(len(timeline), dtype=bool)
+        aligned = {}
+        for pair, time_opens in pair_time_opens.items():
+            values = pair_values[pair]
+            if len(time_opens) == 0:
+                keep &= self.policy != MissingKlinePolicy.DROP
+                aligned[pair] = np.full((len(timeline), values.shape[1]), np.nan)
+                continue
+            # Position of the last kline which was opened at or before each timestamp
+            positions = np.searchsorted(time_opens, timeline, side='right') - 1
+            available = positions >= 0
+            exact = available & (time_opens[np.maximum(positions, 0)] == timeline)
+            if self.policy == MissingKlinePolicy.DROP:
+                keep &= exact
+            pair_aligned = np.full((len(timeline), values.shape[1]), np.nan)
+            pair_aligned[available] = values[positions[available]]
+            aligned[pair] = pair_aligned
+        return keep, {pair: values[keep] for pair, values in aligned.items()}
+
+    def align_dataframes(
+            self,
+            target: pd.DataFrame,
+            pairs: Dict[str, pd.DataFrame]
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Align the klines of the given pairs to the klines of the target pair. Return the (possibly filtered) target
+        klines and one dataframe containing the aligned klines of all pairs, with columns prefixed by the pair. Both
+        dataframes get a new RangeIndex.
+        """
+        timeline = target[KlineProps.TIME_OPEN].to_numpy(dtype=np.float64)
+        keep, aligned = self.align(
+            timeline=timeline,
+            pair_time_opens={pair: df[KlineProps.TIME_OPEN].to_numpy(dtype=np.float64) for pair, df in pairs.items()},
+            pair_values={pair: df.to_numpy(dtype=np.float64) for pair, df in pairs.items()}
+        )
+        target = target[keep].reset_index(drop=True)
+        aligned_df = pd.DataFrame({
+            pair + '_' + column: aligned[pair][:, i] for pair, df in pairs.items() for i, column in enumerate(df.columns)
+        })
+        return target, aligned_df
@@ -2,12 +2,14 @@ from abc import ABC, abstractmethod
 
 import pandas as pd
 
+from binance_bot.state.portfolio import Portfolio
+
 
 class AbstractState(ABC):
 
     klines: pd.DataFrame = None
     features: pd.DataFrame = None
-    assets: pd.DataFrame = None
+    assets: Portfolio = None
 
     @abstractmethod
     def next_step(self) -> None:
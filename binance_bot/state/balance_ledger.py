@@ -0,0 +1,134 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import numpy as np
+
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.user_data_stream import UserDataStream
+from binance_bot.instrumentation import instrumentation
+from binance_bot.state.portfolio import Portfolio
+
+
+class BalanceLedger:
+    """
+    Local copy of the balances of the account, so that reading them needs no request. The ledger is seeded with one
+    account snapshot and kept current from the events of the user data stream: fills of execution reports and balance
+    updates change the free balances, account positions replace the balances of their assets. Since events may get
+    lost, the ledger is reconciled with a new snapshot every reconcile_interval_seconds and after every reconnect of
+    the stream. Every balance remembers the time it was last replaced at, so events which are already included in a
+    snapshot or an account position are not applied twice, and events which are newer than a snapshot are applied again
+    on top of it.
+    https://binance-docs.github.io/apidocs/spot/en/#payload-account-update
+    """
+
+    # Drift between the ledger and a snapshot below this amount is not reported
+    TOLERANCE = 1e-8
+    # Number of recent events which are applied again on top of a new snapshot
+    MAX_RECENT_EVENTS = 1000
+
+    def __init__(
+            self,
+            client: BinanceClient,
+            stream: UserDataStream,
+            pairs: Dict[str, Tuple[str, str]],
+            reconcile_interval_seconds: float = 300
+    ):
+        """pairs maps the pairs whose fills are applied to their target and base symbol."""
+        self._client = client
+        self._stream = stream
+        self._pairs = pairs
+        self._reconcile_interval_seconds = reconcile_interval_seconds
+        # Free and locked balance and the time they were last replaced at, by symbol
+        self._balances: Dict[str, List[float]] = {}
+        self._replaced_at: Dict[str, int] = {}
+        self._recent_events: Deque[dict] = deque(maxlen=self.MAX_RECENT_EVENTS)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.events = 0
+        self.reconciliations = 0
+        self.corrections = 0
+
+    def start(self) -> None:
+        """Start the stream before taking the first snapshot, so that no event between the two gets lost."""
+        self._stream.add_listener(on_event=self.on_event, on_reconnect=self.reconcile)
+        self._stream.start()
+        self.reconcile()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._stream.stop()
+
+    def get_portfolio(self, symbols: List[str], allocation: float = 1.0) -> Portfolio:
+        """Return the balances of the given symbols, scaled by the share of them which is allocated to the caller."""
+        with self._lock:
+            balances = np.array([self._balances.get(symbol, [0., 0.]) for symbol in symbols], dtype=np.float64)
+        return Portfolio(symbols, free=balances[:, 0] * allocation, locked=balances[:, 1] * allocation)
+
+    def reconcile(self) -> None:
+        """Replace the balances with a new account snapshot and apply the events which are newer than it again."""
+        snapshot, update_time = self._client.get_account_balances()
+        with self._lock:
+            drifted = [
+                symbol for symbol, balance in snapshot.items()
+                if symbol in self._balances and (
+                    abs(self._balances[symbol][0] - float(balance['free'])) > self.TOLERANCE
+                    or abs(self._balances[symbol][1] - float(balance['locked'])) > self.TOLERANCE
+                )
+            ]
+            if self.reconciliations > 0 and len(drifted) > 0:
+                print("Balances drifted from the account snapshot:", ', '.join(
+                    f"{symbol} {self._balances[symbol][0]} != {snapshot[symbol]['free']}" for symbol in drifted
+                ))
+                self.corrections += len(drifted)
+            self._balances = {
+                symbol: [float(balance['free']), float(balance['locked'])] for symbol, balance in snapshot.items()
+            }
+            self._replaced_at = {symbol: update_time for symbol in snapshot.keys()}
+            for event in self._recent_events:
+                self._apply(event)
+            self.reconciliations += 1
+        instrumentation.set_gauge('balance_ledger_corrections', self.corrections)
+
+    def on_event(self, event: dict) -> None:
+        with self._lock:
+            self.events += 1
+            self._recent_events.append(event)
+            self._apply(event)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._reconcile_interval_seconds):
+            try:
+                self.reconcile()
+            except Exception as e:
+                print("Reconciliation of the balances failed:", repr(e))
+
+    def _apply(self, event: dict) -> None:
+        """Apply an event of the user data stream. Requires the lock to be held."""
+        event_type = event.get('e')
+        if event_type == 'outboundAccountPosition':
+            for balance in event['B']:
+                # Several fills can happen in the same millisecond, the later position includes all of them
+                if event['u'] >= self._replaced_at.get(balance['a'], -1):
+                    self._balances[balance['a']] = [float(balance['f']), float(balance['l'])]
+                    self._replaced_at[balance['a']] = event['u']
+        elif event_type == 'balanceUpdate':
+            self._add(balance_time=event['T'], symbol=event['a'], quantity=float(event['d']))
+        elif event_type == 'executionReport' and event['x'] == 'TRADE' and event['s'] in self._pairs:
+            target_symbol, base_symbol = self._pairs[event['s']]
+            quantity = float(event['l'])
+            quote_quantity = float(event['Y']) if 'Y' in event else quantity * float(event['L'])
+            sign = 1 if event['S'] == 'BUY' else -1
+            self._add(balance_time=event['T'], symbol=target_symbol, quantity=sign * quantity)
+            self._add(balance_time=event['T'], symbol=base_symbol, quantity=-sign * quote_quantity)
+            if event.get('N') is not None:
+                self._add(balance_time=event['T'], symbol=event['N'], quantity=-float(event['n']))
+
+    def _add(self, balance_time: int, symbol: str, quantity: float) -> None:
+        # Changes which happened before the balance was last replaced are already included in it
+        if balance_time > self._replaced_at.get(symbol, -1):
+            self._balances.setdefault(symbol, [0., 0.])[0] += quantity
@@ -0,0 +1,259 @@
+import time
+from functools import partial
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.kline_stream import KlineStream
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.constants import KlineProps
+from binance_bot.instrumentation import instrumentation
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.processing.timestamp_aligner import MissingKlinePolicy, TimestampAligner
+from binance_bot.state.balance_ledger import BalanceLedger
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.state.ring_buffer import RingBuffer
+
+
+class DataFrameMissmatchError(Exception):
+    pass
+
+
+class MarketData:
+    """
+    Live klines, features and balances for any number of target pairs, shared by all states which trade them. Every
+    step fetches the klines of each target and feature pair and the balances of the account once, concurrently, and
+    calculates the features of each target pair once, no matter how many states use them. The features of the new
+    klines are calculated by a FeatureStream; if the stream does not support the configured features, the features of
+    the whole window are recalculated with calculate_features instead.
+    The klines of all pairs and the features are kept in preallocated ring buffers, the dataframes returned by
+    get_klines and get_features are views of these buffers which are only valid until the next step. Without a kline
+    stream (main.py always starts one), the klines are requested via REST as a fallback: the window of a pair is
+    requested once, afterwards only the klines since the last buffered one are requested, so the request weight, the
+    response size and the work per step do not depend on the window size.
+    """
+
+    WINDOW_SIZE = 500
+    # Limit of the requests for the klines since the last buffered one. If a response is full, the pair fell behind
+    # by more klines than that (e.g. after a pause) and its whole window is requested again.
+    DELTA_LIMIT = 5
+    KLINE_COLUMNS = [KlineProps.TIME_OPEN, KlineProps.OPEN, KlineProps.HIGH, KlineProps.LOW, KlineProps.CLOSE,
+                     KlineProps.VOLUME]
+    # With the wait policy, pairs which are behind the newest target pair are refetched up to this many times
+    MAX_REFETCHES = 5
+    REFETCH_DELAY_SECONDS = 0.5
+
+    def __init__(
+            self,
+            client: BinanceClient,
+            main_config: MainConfig,
+            feature_calculator: FeatureCalculator,
+            target_pairs: List[str],
+            symbols: List[str],
+            kline_stream: KlineStream = None,
+            balance_ledger: BalanceLedger = None
+    ):
+        """
+        If a started kline_stream is given, the klines are taken from it instead of being requested via REST. If a
+        started balance_ledger is given, the balances are read from it instead of being requested in every step.
+        """
+        self._client = client
+        self._kline_stream = kline_stream
+        self._balance_ledger = balance_ledger
+        self._config = main_config
+        self._target_pairs = list(dict.fromkeys(target_pairs))
+        self._feature_pairs = [pair for pair in (main_config.FEATURE_PAIRS or []) if pair not in self._target_pairs]
+        self._pairs = self._target_pairs + self._feature_pairs
+        self._symbols = list(dict.fromkeys(symbols))
+        self._kline_buffers = {pair: RingBuffer(self.KLINE_COLUMNS, self.WINDOW_SIZE) for pair in self._pairs}
+        self._feature_calculator = feature_calculator
+        self._feature_streams = {
+            pair: feature_calculator.create_stream() for pair in self._target_pairs
+        } if feature_calculator.supports_streaming() else {}
+        self._feature_buffers: Dict[str, RingBuffer] = {}
+        # Features of the target pairs which are recalculated for the whole window in every step
+        self._window_features: Dict[str, pd.DataFrame] = {}
+        self._aligner = TimestampAligner(main_config.MISSING_KLINE_POLICY)
+        # A target kline can not be dropped in live trading, so single klines are always aligned with forward filling
+        self._kline_aligner = TimestampAligner(MissingKlinePolicy.FORWARD_FILL)
+        self._balances: Dict[str, Dict[str, str]] = {}
+        # Duration in seconds of each request of the last step
+        self.request_timings: Dict[str, float] = {}
+
+    def get_klines(self, pair: str) -> pd.DataFrame:
+        return self._kline_buffers[pair].to_dataframe()
+
+    def get_features(self, pair: str) -> pd.DataFrame:
+        if pair in self._window_features:
+            return self._window_features[pair]
+        return self._feature_buffers[pair].to_dataframe()
+
+    def get_portfolio(self, symbols: List[str], allocation: float = 1.0) -> Portfolio:
+        """Return the balances of the given symbols, scaled by the share of them which is allocated to the caller."""
+        if self._balance_ledger is not None:
+            return self._balance_ledger.get_portfolio(symbols, allocation)
+        portfolio = Portfolio.from_dataframe(
+            self._client.asset_balances_to_dataframe([self._balances[symbol] for symbol in symbols])
+        )
+        portfolio.free *= allocation
+        portfolio.locked *= allocation
+        return portfolio
+
+    def next_step(self) -> None:
+        # get the balances of all symbols with one request and the klines of all pairs concurrently
+        fetch_balances = self._balance_ledger is None and len(self._symbols) > 0
+        responses = self._client.run_concurrently({
+            **({'account': self._client.get_account_balances} if fetch_balances else {}),
+            **{f"klines:{pair}": partial(self._get_klines, pair) for pair in self._pairs}
+        })
+        self.request_timings = {name: self._client.request_timings[name] for name in responses.keys()}
+        if fetch_balances:
+            instrumentation.observe('fetch_assets', self.request_timings['account'])
+            self._balances, _ = responses['account']
+        for pair in self._pairs:
+            instrumentation.observe('fetch_klines', self.request_timings[f"klines:{pair}"], pair=pair)
+        # Update the kline buffers with the klines which are new since the last step
+        new_target_klines: Dict[str, np.ndarray] = {}
+        restarted: Dict[str, bool] = {}
+        for pair in self._pairs:
+            self._write_klines(pair, responses[f"klines:{pair}"], new_target_klines, restarted)
+        if self._aligner.policy == MissingKlinePolicy.WAIT:
+            self._refetch_pairs_behind(new_target_klines, restarted)
+        for pair in self._target_pairs:
+            if pair not in self._feature_streams:
+                klines = self.get_klines(pair)
+                additional_features = self._align_feature_pairs(klines[KlineProps.TIME_OPEN].to_numpy())
+                self._window_features[pair] = self._feature_calculator.calculate_features(
+                    klines, pd.DataFrame(additional_features) if additional_features else None
+                )
+                continue
+            # Calculate the features of the new klines only
+            if restarted[pair] or pair not in self._feature_buffers:
+                self._feature_streams[pair].reset()
+                if pair in self._feature_buffers:
+                    self._feature_buffers[pair].clear()
+            for kline in new_target_klines[pair]:
+                self._update_feature_buffer(pair, dict(zip(self.KLINE_COLUMNS, kline)))
+            if not self.do_timestamps_match([self.get_klines(pair), self.get_features(pair)]):
+                raise DataFrameMissmatchError(f"Timestamps of dataframes of {pair} do not match.")
+
+    def _write_klines(
+            self,
+            pair: str,
+            klines: pd.DataFrame,
+            new_target_klines: Dict[str, np.ndarray],
+            restarted: Dict[str, bool]
+    ) -> None:
+        """
+        Write the klines into the buffer of the pair. For target pairs, collect the klines which were written in
+        new_target_klines and whether the buffer was cleared in restarted, across all writes of the step.
+        """
+        pair_klines = klines[self.KLINE_COLUMNS].to_numpy(dtype=np.float64)
+        new_klines, cleared = self._update_kline_buffer(self._kline_buffers[pair], pair_klines)
+        if pair not in self._target_pairs:
+            return
+        if cleared or pair not in new_target_klines:
+            new_target_klines[pair] = new_klines
+        else:
+            new_target_klines[pair] = np.concatenate([new_target_klines[pair], new_klines])
+        restarted[pair] = restarted.get(pair, False) or cleared
+
+    def _refetch_pairs_behind(self, new_target_klines: Dict[str, np.ndarray], restarted: Dict[str, bool]) -> None:
+        """
+        Refetch only the pairs whose newest kline is older than the newest kline of all target pairs. The klines of
+        refetched target pairs are added to new_target_klines, so that their features are calculated in this step.
+        """
+        target_end = max(self._kline_buffers[pair].last(KlineProps.TIME_OPEN) for pair in self._target_pairs)
+        for _ in range(self.MAX_REFETCHES):
+            pairs_behind = self._aligner.pairs_behind(target_end, {
+                pair: self._kline_buffers[pair].last(KlineProps.TIME_OPEN) for pair in self._pairs
+            })
+            if not pairs_behind:
+                return
+            time.sleep(self.REFETCH_DELAY_SECONDS)
+            responses = self._client.run_concurrently({
+                f"klines:{pair}": partial(self._get_klines, pair) for pair in pairs_behind
+            })
+            for pair in pairs_behind:
+                self._write_klines(pair, responses[f"klines:{pair}"], new_target_klines, restarted)
+        raise DataFrameMissmatchError("Klines of some pairs are behind the newest target pair.")
+
+    def _get_klines(self, pair: str) -> pd.DataFrame:
+        if self._kline_stream is not None:
+            return self._kline_stream.get_klines(pair)
+        buffer = self._kline_buffers[pair]
+        if len(buffer) > 0:
+            # The last buffered kline is requested again, it may have been updated since (e.g. if it was still open)
+            klines = self._client.get_klines(
+                pair,
+                self._config.TARGET_INTERVAL,
+                start_ms=int(buffer.last(KlineProps.TIME_OPEN)),
+                limit=self.DELTA_LIMIT
+            )
+            if klines.shape[0] < self.DELTA_LIMIT:
+                return klines
+        return self._client.get_klines(pair, self._config.TARGET_INTERVAL, limit=self.WINDOW_SIZE)
+
+    @staticmethod
+    def _update_kline_buffer(buffer: RingBuffer, klines: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """
+        Append the klines which are newer than the last buffered one and replace the last buffered one if it is
+        included again (e.g. because it was still open). Clear the buffer first if the klines do not overlap with it.
+        Return the klines which were written and whether the buffer was cleared.
+        """
+        time_opens = klines[:, 0]
+        cleared = len(buffer) == 0 or time_opens[0] > buffer.last(KlineProps.TIME_OPEN)
+        if cleared:
+            buffer.clear()
+            new_klines = klines
+        else:
+            new_klines = klines[time_opens >= buffer.last(KlineProps.TIME_OPEN)]
+        for kline in new_klines:
+            if len(buffer) > 0 and kline[0] == buffer.last(KlineProps.TIME_OPEN):
+                buffer.replace_last(kline)
+            else:
+                buffer.append(kline)
+        return new_klines, cleared
+
+    def _align_feature_pairs(self, time_opens: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Align the klines of the feature pairs to the given target open times and return them by additional feature
+        column. With the drop policy, missing klines are left NaN instead of being filled.
+        """
+        feature_pairs = self._config.FEATURE_PAIRS or []
+        _, aligned = self._kline_aligner.align(
+            timeline=time_opens,
+            pair_time_opens={pair: self._kline_buffers[pair].column(KlineProps.TIME_OPEN) for pair in feature_pairs},
+            pair_values={pair: self._kline_buffers[pair].values.T for pair in feature_pairs}
+        )
+        additional_features = {}
+        for pair in feature_pairs:
+            if self._aligner.policy == MissingKlinePolicy.DROP:
+                aligned[pair][aligned[pair][:, 0] != time_opens] = np.nan
+            additional_features.update(zip([pair + '_' + column for column in self.KLINE_COLUMNS], aligned[pair].T))
+        return additional_features
+
+    def _update_feature_buffer(self, target_pair: str, kline: Dict[str, float]) -> None:
+        # The klines of the feature pairs are aligned to the target kline and added to the features
+        time_open = kline[KlineProps.TIME_OPEN]
+        additional_features = {
+            column: values[0] for column, values in self._align_feature_pairs(np.array([time_open])).items()
+        }
+        feature_stream = self._feature_streams[target_pair]
+        replaces_last = feature_stream.last_time_open == time_open
+        features = feature_stream.update(kline, additional_features)
+        if target_pair not in self._feature_buffers:
+            self._feature_buffers[target_pair] = RingBuffer(list(features.keys()), self.WINDOW_SIZE)
+        if replaces_last:
+            self._feature_buffers[target_pair].replace_last(list(features.values()))
+        else:
+            self._feature_buffers[target_pair].append(list(features.values()))
+
+    @staticmethod
+    def do_timestamps_match(dfs: List[pd.DataFrame]) -> bool:
+        first_timestamps = [df[KlineProps.TIME_OPEN].iloc[0] for df in dfs]
+        last_timestamps = [df[KlineProps.TIME_OPEN].iloc[-1] for df in dfs]
+        n_rows = [df.shape[0] for df in dfs]
+        return len(set(first_timestamps)) == 1 and len(set(last_timestamps)) == 1 and len(set(n_rows)) == 1
@@ -0,0 +1,87 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from binance_bot.constants import AssetProps
+
+
+class NegativeBalanceError(Exception):
+    pass
+
+
+class Portfolio:
+    """
+    Compact ledger of asset balances. Every asset occupies a fixed slot in the free and locked arrays, so reading and
+    updating a balance is a single array access instead of a boolean mask lookup on a dataframe.
+    """
+
+    __slots__ = ('symbols', 'free', 'locked', '_slots', '_dataframe')
+
+    # Rounding errors below this amount do not count as a negative balance
+    TOLERANCE = 1e-9
+
+    def __init__(self, symbols: List[str], free: np.ndarray = None, locked: np.ndarray = None):
+        self.symbols = list(symbols)
+        self.free = np.zeros(len(self.symbols)) if free is None else np.array(free, dtype=np.float64)
+        self.locked = np.zeros(len(self.symbols)) if locked is None else np.array(locked, dtype=np.float64)
+        self._slots = {symbol: slot for slot, symbol in enumerate(self.symbols)}
+        self._dataframe = None
+
+    @classmethod
+    def from_dataframe(cls, assets: pd.DataFrame) -> 'Portfolio':
+        return cls(
+            symbols=assets[AssetProps.ASSET].tolist(),
+            free=assets[AssetProps.FREE].values,
+            locked=assets[AssetProps.LOCKED].values
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the balances in the format of BinanceClient.get_assets. The dataframe is cached until the next trade."""
+        if self._dataframe is None:
+            self._dataframe = pd.DataFrame({
+                AssetProps.ASSET: self.symbols,
+                AssetProps.FREE: self.free,
+                AssetProps.LOCKED: self.locked
+            })
+        return self._dataframe
+
+    def get_free(self, symbol: str) -> float:
+        return self.free[self._slots[symbol]]
+
+    def trade(self, target_symbol: str, base_symbol: str, target_qty: float, base_qty: float) -> None:
+        """Add target_qty to the target and base_qty to the base asset. Negative quantities are subtracted."""
+        target_slot = self._slots[target_symbol]
+        base_slot = self._slots[base_symbol]
+        target_free = self.free[target_slot] + target_qty
+        base_free = self.free[base_slot] + base_qty
+        if target_free < -self.TOLERANCE or base_free < -self.TOLERANCE:
+            raise NegativeBalanceError(
+                f"Trade of {target_qty} {target_symbol} / {base_qty} {base_symbol} results in a negative balance."
+            )
+        self.free[target_slot] = target_free
+        self.free[base_slot] = base_free
+        self._dataframe = None
+
+    def apply_trades(
+            self,
+            target_symbol: str,
+            base_symbol: str,
+            target_qtys: np.ndarray,
+            base_qtys: np.ndarray
+    ) -> np.ndarray:
+        """
+        Apply a sequence of trades at once. Return the free balances of the target and base asset after each trade as
+        an array of shape (n_trades, 2). No trade is applied if any of them would result in a negative balance.
+        """
+        target_slot = self._slots[target_symbol]
+        base_slot = self._slots[base_symbol]
+        balances = np.cumsum(np.column_stack([target_qtys, base_qtys]), axis=0)
+        balances += self.free[[target_slot, base_slot]]
+        negative = np.flatnonzero((balances < -self.TOLERANCE).any(axis=1))
+        if len(negative) > 0:
+            raise NegativeBalanceError(f"Trade number {negative[0]} results in a negative balance.")
+        if balances.shape[0] > 0:
+            self.free[target_slot], self.free[base_slot] = balances[-1]
+            self._dataframe = None
+        return balances
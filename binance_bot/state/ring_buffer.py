@@ -0,0 +1,63 @@
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class RingBuffer:
+    """
+    Fixed-capacity window of rows with named float64 columns, stored in one preallocated array. Every row is written
+    twice (at slot and slot + capacity), so the current window is always a contiguous slice of the array and can be
+    returned as a view without copying. Appending a row does not allocate memory.
+    """
+
+    def __init__(self, columns: List[str], capacity: int):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._indices = {column: i for i, column in enumerate(self.columns)}
+        # One row per column, so that every column of the window is contiguous
+        self._data = np.full((len(self.columns), 2 * capacity), np.nan)
+        self._n_appended = 0
+        self._dataframe = None
+
+    def __len__(self) -> int:
+        return min(self._n_appended, self.capacity)
+
+    def append(self, row: Sequence[float]) -> None:
+        slot = self._n_appended % self.capacity
+        self._data[:, slot] = row
+        self._data[:, slot + self.capacity] = row
+        self._n_appended += 1
+        self._dataframe = None
+
+    def replace_last(self, row: Sequence[float]) -> None:
+        slot = (self._n_appended - 1) % self.capacity
+        self._data[:, slot] = row
+        self._data[:, slot + self.capacity] = row
+        self._dataframe = None
+
+    def clear(self) -> None:
+        self._n_appended = 0
+        self._dataframe = None
+
+    @property
+    def values(self) -> np.ndarray:
+        """View of the window with shape (n_columns, n_rows), the oldest row first."""
+        length = len(self)
+        start = (self._n_appended - length) % self.capacity
+        return self._data[:, start: start + length]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[self._indices[name]]
+
+    def last(self, name: str) -> float:
+        return self._data[self._indices[name], (self._n_appended - 1) % self.capacity]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Return the window as a dataframe backed by the buffer. It is created lazily and only valid until the next change
+        of the buffer, since appending overwrites the memory of the oldest row.
+        """
+        if self._dataframe is None:
+            self._dataframe = pd.DataFrame(self.values.T, columns=self.columns, copy=False)
+        return self._dataframe
@@ -0,0 +1,51 @@
+from multiprocessing import shared_memory
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class SharedTable:
+    """
+    Picklable handle to a dataframe whose values are stored as float64 in a shared memory block. The block is created
+    once by the parent process, worker processes attach to it without copying the data.
+    """
+
+    def __init__(self, name: str, columns: List[str], shape: Tuple[int, int]):
+        self.name = name
+        self.columns = columns
+        self.shape = shape
+        self._shm = None
+
+    @classmethod
+    def create(cls, df: pd.DataFrame) -> 'SharedTable':
+        """Copy the dataframe into a new shared memory block. All columns are converted to float64."""
+        values = df.to_numpy(dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        # Fortran order keeps every column contiguous
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf, order='F')[:] = values
+        table = cls(name=shm.name, columns=list(df.columns), shape=values.shape)
+        table._shm = shm
+        return table
+
+    def attach(self) -> pd.DataFrame:
+        """Return a dataframe backed by the shared memory block. The handle has to be kept alive while it is used."""
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.name)
+        values = np.ndarray(self.shape, dtype=np.float64, buffer=self._shm.buf, order='F')
+        return pd.DataFrame(values, columns=self.columns, copy=False)
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self) -> None:
+        """Free the shared memory block. Only the process which created the table should call this."""
+        shm = self._shm if self._shm is not None else shared_memory.SharedMemory(name=self.name)
+        shm.close()
+        shm.unlink()
+        self._shm = None
+
+    def __getstate__(self):
+        return {'name': self.name, 'columns': self.columns, 'shape': self.shape, '_shm': None}
@@ -1,50 +1,65 @@
-from typing import List, Union
+from typing import Dict, List
 
 import pandas as pd
 
 from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.kline_stream import KlineStream
 from binance_bot.configs.main_config import MainConfig
-from binance_bot.constants import KlineProps
 from binance_bot.processing.feature_calculator import FeatureCalculator
 from binance_bot.state.abstract_state import AbstractState
-
-
-class DataFrameMissmatchError(Exception):
-    pass
+from binance_bot.state.market_data import DataFrameMissmatchError, MarketData
 
 
 class SingleAssetState(AbstractState):
 
+    # Duration in seconds of each request of the last step
+    request_timings: Dict[str, float] = {}
+
     def __init__(
             self,
             client: BinanceClient,
             main_config: MainConfig,
-            feature_calculator: FeatureCalculator
+            feature_calculator: FeatureCalculator,
+            kline_stream: KlineStream = None,
+            market_data: MarketData = None,
+            allocation: float = 1.0
     ):
-        self._client = client
+        """
+        State of one target pair. The klines, features and balances are taken from market_data, which may be shared
+        with the states of other pairs; its next_step() is then called once per step by its owner, before the
+        next_step() of the states. Without market_data, the state creates and steps its own. If a started kline_stream
+        is given, the klines are taken from it instead of being requested via REST. allocation is the share of the
+        balances which is available to this state.
+        """
         self._client_config = main_config
-        self._feature_calc = feature_calculator
+        self._symbols = [main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL]
+        self._owns_market_data = market_data is None
+        self._market_data = market_data or MarketData(
+            client=client,
+            main_config=main_config,
+            feature_calculator=feature_calculator,
+            target_pairs=[main_config.TARGET_PAIR],
+            symbols=self._symbols,
+            kline_stream=kline_stream
+        )
+        self._allocation = allocation
+
+    @property
+    def klines(self) -> pd.DataFrame:
+        return self._market_data.get_klines(self._client_config.TARGET_PAIR)
+
+    @property
+    def features(self) -> pd.DataFrame:
+        return self._market_data.get_features(self._client_config.TARGET_PAIR)
 
     def next_step(self) -> None:
-        # get assets
-        self.assets = self._client.get_assets([self._client_config.TARGET_SYMBOL, self._client_config.BASE_SYMBOL])
-        # get klines of target pair
-        self.klines = self._client.get_klines(self._client_config.TARGET_PAIR, self._client_config.TARGET_INTERVAL)
-        # get klines of feature pairs
-        feature_pairs: Union[pd.DataFrame, None] = None
-        if self._client_config.FEATURE_PAIRS and len(self._client_config.FEATURE_PAIRS) > 0:
-            for pair in self._client_config.FEATURE_PAIRS:
-                pair_klines = self._client.get_klines(pair, self._client_config.TARGET_INTERVAL)
-                pair_klines = pair_klines.add_prefix(pair + '_')
-                feature_pairs = pd.concat([feature_pairs, pair_klines], axis=1)
-        # Calculate all features
-        self.features = self._feature_calc.calculate_features(self.klines, feature_pairs)
+        if self._owns_market_data:
+            self._market_data.next_step()
+        self.request_timings = self._market_data.request_timings
+        self.assets = self._market_data.get_portfolio(self._symbols, self._allocation)
         if not self.do_timestamps_match([self.klines, self.features]):
             raise DataFrameMissmatchError("Timestamps of dataframes do not match.")
 
     @staticmethod
     def do_timestamps_match(dfs: List[pd.DataFrame]) -> bool:
-        first_timestamps = [df[KlineProps.TIME_OPEN].iloc[0] for df in dfs]
-        last_timestamps = [df[KlineProps.TIME_OPEN].iloc[-1] for df in dfs]
-        n_rows = [df.shape[0] for df in dfs]
-        return len(set(first_timestamps)) == 1 and len(set(last_timestamps)) == 1 and len(set(n_rows)) == 1
+        return MarketData.do_timestamps_match(dfs)
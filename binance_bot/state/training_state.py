@@ -1,75 +1,142 @@
 import random
-from typing import List, Union
+from typing import Dict, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from binance_bot.client.binance_client import BinanceClient
 from binance_bot.client.database_client import DatabaseClient
+from binance_bot.client.kline_cache import KlineCache
 from binance_bot.configs.main_config import MainConfig
-from binance_bot.constants import AssetProps, KlineProps
+from binance_bot.constants import KlineProps
 from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.processing.timestamp_aligner import TimestampAligner
 from binance_bot.state.abstract_state import AbstractState
+from binance_bot.state.portfolio import Portfolio
 
 
 class TrainingState(AbstractState):
 
     BATCH_SIZE = 500
+    _warm_up_length = None
     _start_index = None
     _end_index = None
 
     def __init__(
             self,
             main_config: MainConfig,
-            feature_calculator: FeatureCalculator
+            feature_calculator: FeatureCalculator,
+            target_pair_table: pd.DataFrame = None,
+            feature_table: pd.DataFrame = None,
+            feature_pair_tables: Dict[str, pd.DataFrame] = None
     ):
+        """
+        Load the klines from the database and calculate their features. Alternatively, the klines of the target pair
+        and their precalculated features can be passed directly (e.g. from shared memory in a worker process). Without
+        precalculated features, the klines of the feature pairs passed in feature_pair_tables are added to them.
+        """
         self._main_config = main_config
         self._feature_calc = feature_calculator
-        # Get tables from database
+        self._feature_pair_tables = {}
+        if target_pair_table is None:
+            self._target_pair_table, self._feature_pair_tables = self.read_tables(main_config)
+        else:
+            self._target_pair_table = target_pair_table
+            self._feature_pair_tables = dict(feature_pair_tables or {})
+        # Calculate the features once for the whole history
+        self._feature_table = self._calculate_feature_table() if feature_table is None else feature_table
+        self._warm_up_length = self._calculate_warm_up_length()
+
+    @property
+    def target_pair_table(self) -> pd.DataFrame:
+        return self._target_pair_table
+
+    @property
+    def feature_table(self) -> pd.DataFrame:
+        return self._feature_table
+
+    @property
+    def warm_up_length(self) -> int:
+        """Number of rows at the beginning of the tables which are excluded from batches (indicator warm-up)."""
+        return self._warm_up_length
+
+    @staticmethod
+    def read_tables(main_config: MainConfig) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """
+        Return the klines of the target pair and of the feature pairs by pair. They are read from the kline cache, which
+        is only refilled from the database if the tables have changed.
+        """
         client = DatabaseClient(database_config=main_config.DATABASE_CONFIG)
         client.open_database_connection()
-        self._target_pair_table = client.read_table(self._main_config.TARGET_PAIR)
-        self._feature_pair_tables = {}
-        for pair in self._main_config.FEATURE_PAIRS:
-            self._feature_pair_tables[pair] = client.read_table(pair)
+        cache = KlineCache(database_client=client, cache_dir=main_config.KLINE_CACHE_DIR)
+        target_pair_table = cache.read_table(main_config.TARGET_PAIR)
+        feature_pair_tables = {pair: cache.read_table(pair) for pair in main_config.FEATURE_PAIRS}
         client.close_database_connection()
+        return target_pair_table, feature_pair_tables
+
+    @staticmethod
+    def align_feature_pairs(
+            main_config: MainConfig,
+            target_pair_table: pd.DataFrame,
+            feature_pair_tables: Dict[str, pd.DataFrame]
+    ) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+        """
+        Align the klines of the feature pairs to the target pair by time_open. Return the klines of the target pair,
+        without the ones the drop policy removed, and the columns of the feature pairs (None without feature pairs).
+        """
+        if not feature_pair_tables:
+            return target_pair_table, None
+        aligner = TimestampAligner(main_config.MISSING_KLINE_POLICY)
+        return aligner.align_dataframes(target_pair_table, feature_pair_tables)
 
     def next_batch(self) -> None:
         self.assets = self._generate_random_assets()
         last_possible_start_index = self._target_pair_table.shape[0] - self.BATCH_SIZE
-        self._start_index = random.randint(0, last_possible_start_index)
+        self._start_index = random.randint(self._warm_up_length, last_possible_start_index)
         self._end_index = self._start_index + self.BATCH_SIZE
 
     def next_step(self) -> None:
-        # get klines of target pair
+        # get klines of target pair and the precalculated features as views of the full tables
         self.klines = self._target_pair_table.iloc[self._start_index: self._end_index]
-        # get klines of feature pairs
-        feature_pairs: Union[pd.DataFrame, None] = None
-        for pair, data in self._feature_pair_tables.items():
-            pair_klines = data.iloc[self._start_index: self._end_index]
-            pair_klines = pair_klines.add_prefix(pair + '_')
-            feature_pairs = pd.concat([feature_pairs, pair_klines], axis=1)
-        # Calculate all features
-        self.features = self._feature_calc.calculate_features(self.klines, feature_pairs)
+        self.features = self._feature_table.iloc[self._start_index: self._end_index]
         # Increase indices by 1
         self._start_index += 1
         self._end_index += 1
 
-    def _generate_random_assets(self) -> pd.DataFrame:
-        assets = [
-            {
-                AssetProps.ASSET: self._main_config.TARGET_SYMBOL,
-                AssetProps.LOCKED: 0,
-                AssetProps.FREE: 0
-            },
-            {
-                AssetProps.ASSET: self._main_config.BASE_SYMBOL,
-                AssetProps.LOCKED: 0,
-                AssetProps.FREE: random.randint(1, 10000)
-            }
-        ]
-        return pd.DataFrame(data=assets)
+    def _calculate_feature_table(self) -> pd.DataFrame:
+        """
+        Calculate the features for the whole history of the target pair, or look them up in the feature cache. The
+        klines of the feature pairs are aligned to the target pair by time_open; with the drop policy, klines of the
+        target pair without a match are removed.
+        """
+        self._target_pair_table, feature_pairs = self.align_feature_pairs(
+            self._main_config,
+            self._target_pair_table,
+            self._feature_pair_tables
+        )
+        return self._feature_calc.calculate_cached_features(
+            self._main_config.TARGET_PAIR,
+            self._target_pair_table,
+            feature_pairs
+        )
+
+    def _calculate_warm_up_length(self) -> int:
+        """
+        Return the number of rows at the beginning of the feature table for which the indicators are still warming up
+        (i.e. contain NaN values). These rows are excluded from batches.
+        """
+        complete_rows = np.flatnonzero(self._feature_table.notna().all(axis=1).values)
+        if len(complete_rows) == 0 or complete_rows[0] > self._target_pair_table.shape[0] - self.BATCH_SIZE:
+            raise ValueError("Not enough klines in the database to fill a batch after the indicator warm-up.")
+        return int(complete_rows[0])
+
+    def _generate_random_assets(self) -> Portfolio:
+        return Portfolio(
+            symbols=[self._main_config.TARGET_SYMBOL, self._main_config.BASE_SYMBOL],
+            free=[0, random.randint(1, 10000)]
+        )
 
     def get_total_asset_value(self) -> float:
-        target_symbol_amount = self.assets.loc[self.assets[AssetProps.ASSET] == self._main_config.TARGET_SYMBOL][AssetProps.FREE].iloc[0]
-        base_symbol_amount = self.assets.loc[self.assets[AssetProps.ASSET] == self._main_config.BASE_SYMBOL][AssetProps.FREE].iloc[0]
+        target_symbol_amount = self.assets.get_free(self._main_config.TARGET_SYMBOL)
+        base_symbol_amount = self.assets.get_free(self._main_config.BASE_SYMBOL)
         return base_symbol_amount + (target_symbol_amount / self.klines[KlineProps.CLOSE].iloc[-1])
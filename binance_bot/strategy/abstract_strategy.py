@@ -1,18 +1,38 @@
 from abc import abstractmethod, ABC
-from typing import List
+from typing import List, Optional
 
 import pandas as pd
 
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.strategy.batch_actions import BatchActions
 from binance_bot.strategy.strategy_action import StrategyAction
 
 
 class AbstractStrategy(ABC):
 
+    # Feature columns the strategy reads (see IndicatorRegistry.columns), None for the default features. Only these are
+    # calculated for the strategy.
+    FEATURES: Optional[List[str]] = None
+
     @abstractmethod
     def apply(
             self,
             klines: pd.DataFrame,
             features: pd.DataFrame,
-            assets: pd.DataFrame
+            assets: Portfolio
     ) -> List[StrategyAction]:
         pass
+
+    def apply_batch(
+            self,
+            klines: pd.DataFrame,
+            features: pd.DataFrame,
+            assets: Portfolio
+    ) -> BatchActions:
+        """
+        Optional vectorized counterpart of apply for backtests (see BatchSimulator). Receives the complete, aligned
+        klines and features and the portfolio before the first step, and returns the actions for all steps at once. The
+        action of a step may only depend on the klines and features up to that step. Strategies which depend on the
+        balances at each step return relative quantities.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support batch backtests.")
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.constants import Indicators, KlineProps
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.strategy.abstract_strategy import AbstractStrategy
+from binance_bot.strategy.batch_actions import BatchActions
+from binance_bot.strategy.strategy_action import StrategyAction
+
+
+class BandMomentumStrategy(AbstractStrategy):
+    """
+    Trade on the Bollinger Bands and the momentum of the EMAs and the MACD: buy if the close price is at or below the
+    lower band or the short EMA is above the mid EMA with a positive MACD histogram, sell if the close price is at or
+    above the upper band or the short EMA is below the mid EMA with a negative MACD histogram. A band signal takes
+    precedence over a momentum signal. Every order trades ORDER_FRACTION of the maximum amount which can be sold or
+    bought. The strategy is deterministic, so its results only differ by the features it is given.
+    """
+
+    FEATURES = [Indicators.BOLL_UP, Indicators.BOLL_LOW, Indicators.EMA_SHORT, Indicators.EMA_MID,
+                Indicators.MACD_HIST]
+
+    ORDER_FRACTION = 0.5
+
+    def __init__(self, main_config: MainConfig):
+        self._config = main_config
+
+    def apply(
+            self,
+            klines: pd.DataFrame,
+            features: pd.DataFrame,
+            assets: Portfolio
+    ) -> StrategyAction:
+        side = self._sides(klines.iloc[[-1]], features.iloc[[-1]])[0]
+        if side == BatchActions.SELL:
+            return StrategyAction(
+                side="SELL",
+                pair=self._config.TARGET_PAIR,
+                quantity=self.ORDER_FRACTION * assets.get_free(self._config.TARGET_SYMBOL)
+            )
+        if side == BatchActions.BUY:
+            max_buyable_qty = klines[KlineProps.CLOSE].iloc[-1] * assets.get_free(self._config.BASE_SYMBOL)
+            return StrategyAction(
+                side="BUY",
+                pair=self._config.TARGET_PAIR,
+                quantity=self.ORDER_FRACTION * max_buyable_qty
+            )
+
+    def apply_batch(
+            self,
+            klines: pd.DataFrame,
+            features: pd.DataFrame,
+            assets: Portfolio
+    ) -> BatchActions:
+        sides = self._sides(klines, features)
+        return BatchActions(sides=sides, quantities=np.full(len(sides), self.ORDER_FRACTION), relative=True)
+
+    @staticmethod
+    def _sides(klines: pd.DataFrame, features: pd.DataFrame) -> np.ndarray:
+        """Return the side of every row. Rows whose features are still warming up (NaN) hold."""
+        closes = klines[KlineProps.CLOSE].to_numpy(dtype=np.float64)
+        upper = features[Indicators.BOLL_UP].to_numpy(dtype=np.float64)
+        lower = features[Indicators.BOLL_LOW].to_numpy(dtype=np.float64)
+        trend = (features[Indicators.EMA_SHORT].to_numpy(dtype=np.float64)
+                 - features[Indicators.EMA_MID].to_numpy(dtype=np.float64))
+        macd_hist = features[Indicators.MACD_HIST].to_numpy(dtype=np.float64)
+        buy = (closes <= lower) | ((trend > 0) & (macd_hist > 0))
+        sell = (closes >= upper) | ((trend < 0) & (macd_hist < 0))
+        # The band signals take precedence over the momentum signals
+        buy &= ~(closes >= upper)
+        sell &= ~(closes <= lower)
+        return np.where(buy, BatchActions.BUY, np.where(sell, BatchActions.SELL, BatchActions.HOLD)).astype(np.int8)
@@ -0,0 +1,21 @@
+import numpy as np
+
+
+class BatchActions:
+    """
+    Actions of a strategy for a whole sequence of steps, as returned by AbstractStrategy.apply_batch. `sides` contains
+    one of SELL, BUY or HOLD per step. If `relative` is False, `quantities` are amounts of the target asset like in
+    StrategyAction. If it is True, they are fractions between 0 and 1 of the maximum amount which can be sold or bought
+    with the balances at that step, which lets strategies depend on the portfolio state without a Python call per step.
+    """
+
+    HOLD = 0
+    SELL = -1
+    BUY = 1
+
+    def __init__(self, sides: np.ndarray, quantities: np.ndarray, relative: bool = False):
+        self.sides = np.asarray(sides, dtype=np.int8)
+        self.quantities = np.asarray(quantities, dtype=np.float64)
+        self.relative = relative
+        if self.sides.shape != self.quantities.shape:
+            raise ValueError("sides and quantities must have the same shape.")
@@ -1,29 +1,31 @@
 import random
-from typing import List
 
+import numpy as np
 import pandas as pd
 
 from binance_bot.configs.main_config import MainConfig
-from binance_bot.constants import AssetProps, KlineProps
+from binance_bot.constants import KlineProps
+from binance_bot.state.portfolio import Portfolio
 from binance_bot.strategy.abstract_strategy import AbstractStrategy
+from binance_bot.strategy.batch_actions import BatchActions
 from binance_bot.strategy.strategy_action import StrategyAction
 
 
 class RandomStrategy(AbstractStrategy):
 
-    def __init__(self, main_config: MainConfig):
+    def __init__(self, main_config: MainConfig, seed: int = None):
         self._config = main_config
+        # Only used by apply_batch, apply draws from the global random module
+        self._rng = np.random.default_rng(seed)
 
     def apply(
             self,
             klines: pd.DataFrame,
             features: pd.DataFrame,
-            assets: pd.DataFrame
+            assets: Portfolio
     ) -> StrategyAction:
-        target_symbol_asset = assets.loc[assets[AssetProps.ASSET] == self._config.TARGET_SYMBOL]
-        base_symbol_asset = assets.loc[assets[AssetProps.ASSET] == self._config.BASE_SYMBOL]
-        max_sellable_qty = target_symbol_asset[AssetProps.FREE].iloc[0]
-        max_buyable_qty = klines[KlineProps.CLOSE].iloc[-1] * base_symbol_asset[AssetProps.FREE].iloc[0]
+        max_sellable_qty = assets.get_free(self._config.TARGET_SYMBOL)
+        max_buyable_qty = klines[KlineProps.CLOSE].iloc[-1] * assets.get_free(self._config.BASE_SYMBOL)
         if random.choice([True, False, False]):
             return StrategyAction(
                 side="SELL",
@@ -36,3 +38,19 @@ class RandomStrategy(AbstractStrategy):
                 pair=self._config.TARGET_PAIR,
                 quantity=random.uniform(0, max_buyable_qty)
             )
+
+    def apply_batch(
+            self,
+            klines: pd.DataFrame,
+            features: pd.DataFrame,
+            assets: Portfolio
+    ) -> BatchActions:
+        """
+        Same decisions as apply, drawn for all steps at once: sell a uniform fraction of the target balance with a
+        probability of 1/3, otherwise buy a uniform fraction of the maximum buyable amount with a probability of 1/2.
+        """
+        steps = klines.shape[0]
+        sell = self._rng.random(steps) < 1 / 3
+        buy = ~sell & (self._rng.random(steps) < 1 / 2)
+        sides = np.where(sell, BatchActions.SELL, np.where(buy, BatchActions.BUY, BatchActions.HOLD))
+        return BatchActions(sides=sides, quantities=self._rng.random(steps), relative=True)
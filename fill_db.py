@@ -1,44 +1,66 @@
-from typing import Dict
+import argparse
+import time
+from typing import Dict, List
+
+from binance.helpers import interval_to_milliseconds
 
-from binance_bot.client.binance_client import BinanceClient
 from binance_bot.client.database_client import *
-from binance_bot.configs.credentials import Credentials
+from binance_bot.client.kline_downloader import KlineDownloader
 from binance_bot.configs.main_config import MainConfig
 
 
-def trim_dfs_to_same_length(dfs: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
-    # set timestamp as index
-    [value.set_index(KlineProps.TIME_OPEN, inplace=True) for _, value in dfs.items()]
-    # perform an inner join on all dataframes
-    joined_df = list(dfs.values())[0]
-    for key, value in dfs.items():
-        joined_df = joined_df.join(value, how="inner", rsuffix=key)
-    # use the length of the joined dataframe to determine the min and max index
-    min_timestamp = joined_df.index.min()
-    max_timestamp = joined_df.index.max()
-    for key, value in dfs.items():
-        dfs[key] = value.loc[min_timestamp: max_timestamp]
-    # set timestamp as column again
-    [value.reset_index(inplace=True) for _, value in dfs.items()]
-    return dfs
+def drop_open_kline(data: pd.DataFrame, interval_ms: int) -> pd.DataFrame:
+    """Drop the kline which has not been closed yet, so that it is not stored with incomplete values."""
+    return data[data[KlineProps.TIME_OPEN] + interval_ms <= time.time() * 1000]
+
+
+def sync_database(pairs: List[str], recreate_db: bool = False) -> None:
+    """
+    Download only the klines which are newer than the last stored kline of each pair and append them. The pages of a
+    pair are written in chronological order and each one in a single transaction, so an interrupted sync can simply be
+    run again.
+    """
+    database_client.open_database_connection(recreate_db=recreate_db, create_db=True)
+    start_ms: Dict[str, int] = {}
+    for pair in pairs:
+        if database_client.table_exists(pair):
+            database_client.migrate_klines_table(pair=pair)
+        else:
+            database_client.create_klines_table(pair=pair)
+        _, max_time_open = database_client.get_time_open_range(pair)
+        start_ms[pair] = 0 if max_time_open is None else int(max_time_open) + 1
+    # Download all pairs concurrently and write each page as soon as it arrives
+    copied_rows = {pair: 0 for pair in pairs}
+    copy_seconds = {pair: 0. for pair in pairs}
+    for pair, data in kline_downloader.download(start_ms=start_ms, interval=main_config.TARGET_INTERVAL):
+        data = drop_open_kline(data, interval_ms=interval_to_milliseconds(main_config.TARGET_INTERVAL))
+        if data.shape[0] > 0:
+            rows, seconds = database_client.copy_klines_into_table(pair=pair, data=data)
+            copied_rows[pair] += rows
+            copy_seconds[pair] += seconds
+    for pair in pairs:
+        if copied_rows[pair] > 0:
+            print(f"Copied {copied_rows[pair]} rows into {pair} in {copy_seconds[pair]:.1f}s "
+                  f"({copied_rows[pair] / copy_seconds[pair]:.0f} rows/s)")
+        else:
+            print(f"{pair} is up to date")
+    # Trim tables to the same range
+    time_open_ranges = [database_client.get_time_open_range(pair) for pair in pairs]
+    if all(first is not None for first, _ in time_open_ranges):
+        min_time_open = max(first for first, _ in time_open_ranges)
+        max_time_open = min(last for _, last in time_open_ranges)
+        for pair in pairs:
+            database_client.trim_klines_table(pair=pair, min_time_open=min_time_open, max_time_open=max_time_open)
+    database_client.close_database_connection()
+
 
+parser = argparse.ArgumentParser(description="Download the klines of all configured pairs into the database.")
+parser.add_argument('--recreate', action='store_true',
+                    help="drop the database and download the complete history instead of syncing new klines only")
+args = parser.parse_args()
 
 main_config = MainConfig()
-binance_client = BinanceClient(Credentials())
 database_client = DatabaseClient(database_config=main_config.DATABASE_CONFIG)
+kline_downloader = KlineDownloader()
 
-# Set up an empty database
-database_client.open_database_connection(recreate_db=True)
-# For each pair, download the data, create a table, and insert the values into it
-pairs = [main_config.TARGET_PAIR] + main_config.FEATURE_PAIRS
-# Download all data
-pair_data: Dict[str, pd.DataFrame] = {}
-for pair in pairs:
-    pair_data[pair] = binance_client.get_historical_data(pair=pair, interval=main_config.TARGET_INTERVAL)
-# Trim dataframes to same length
-pair_data = trim_dfs_to_same_length(pair_data)
-# Write to DB
-for pair, data in pair_data.items():
-    database_client.create_klines_table(pair=pair)
-    database_client.insert_klines_into_table(pair=pair, data=data)
-database_client.close_database_connection()
+sync_database([main_config.TARGET_PAIR] + main_config.FEATURE_PAIRS, recreate_db=args.recreate)
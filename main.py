@@ -1,37 +1,52 @@
 import time
 
-from binance.helpers import interval_to_milliseconds
-
 from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.candle_scheduler import CandleScheduler
+from binance_bot.client.kline_stream import KlineStream
+from binance_bot.client.user_data_stream import UserDataStream
 from binance_bot.configs.credentials import Credentials
 from binance_bot.configs.feature_config import FeatureConfig
 from binance_bot.configs.main_config import MainConfig
-from binance_bot.constants import KlineProps
-from binance_bot.executor.strategy_executor import StrategyExecutor
+from binance_bot.executor.live_runner import LiveRunner
+from binance_bot.instrumentation import instrumentation
 from binance_bot.processing.feature_calculator import FeatureCalculator
-from binance_bot.state.single_asset_state import SingleAssetState, DataFrameMissmatchError
-from binance_bot.strategy.random_strategy import RandomStrategy
+from binance_bot.state.balance_ledger import BalanceLedger
+from binance_bot.state.market_data import DataFrameMissmatchError
 
 main_config = MainConfig()
-INTERVAL_MS = interval_to_milliseconds(main_config.TARGET_INTERVAL)
 
-client = BinanceClient(Credentials())
+if main_config.INSTRUMENTATION_ENABLED:
+    instrumentation.enable(trace_path=main_config.INSTRUMENTATION_TRACE_FILE)
+    instrumentation.start_http_server(port=main_config.INSTRUMENTATION_HTTP_PORT)
+
+client = BinanceClient(Credentials(), test_orders=main_config.TEST_ORDERS)
+kline_stream = KlineStream(client, LiveRunner.pairs(main_config), main_config.TARGET_INTERVAL)
 feature_calc = FeatureCalculator(FeatureConfig())
-state = SingleAssetState(client, main_config, feature_calc)
-strategy = RandomStrategy(main_config)
-executor = StrategyExecutor(client)
+scheduler = CandleScheduler(client, main_config.TARGET_INTERVAL)
+balance_ledger = None
+if main_config.BALANCE_LEDGER_ENABLED:
+    balance_ledger = BalanceLedger(
+        client,
+        UserDataStream(client),
+        pairs=LiveRunner.symbol_pairs(main_config),
+        reconcile_interval_seconds=main_config.BALANCE_RECONCILE_SECONDS
+    )
+# All slots of the configuration are traded by one runner
+runner = LiveRunner(client, main_config, feature_calc, kline_stream=kline_stream, balance_ledger=balance_ledger)
 
-last_kline_timestamp = 0
+kline_stream.start()
+if balance_ledger is not None:
+    balance_ledger.start()
+runner.start()
+retry = False
 while True:
-    if time.time() * 1000 < last_kline_timestamp:
-        print("waiting 5s")
+    # Wake up right after the candle close on the exchange clock and wait until the stream delivered it for all pairs
+    if not retry:
+        scheduler.wait_for_close(is_closed=kline_stream.has_closed)
+    try:
+        runner.step()
+        retry = False
+    except DataFrameMissmatchError as e:
+        print(str(e), "Retrying...")
         time.sleep(5)
-    else:
-        try:
-            state.next_step()
-            action = strategy.apply(klines=state.klines, features=state.features, assets=state.assets)
-            executor.execute(action)
-            last_kline_timestamp = state.klines[KlineProps.TIME_OPEN].iloc[-1] + INTERVAL_MS
-        except DataFrameMissmatchError as e:
-            print(str(e), "Retrying...")
-            time.sleep(5)
+        retry = True
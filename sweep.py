@@ -0,0 +1,30 @@
+"""
+Evaluate the strategy for every combination of the feature parameter ranges in config/sweep-config.ini and print the
+combinations ranked by the mean asset value at the end of the epochs.
+
+Usage: python sweep.py [--output results.csv]
+"""
+import argparse
+
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.configs.sweep_config import SweepConfig
+from binance_bot.executor.parameter_sweep_runner import ParameterSweepRunner
+
+main_config = MainConfig()
+feature_config = FeatureConfig()
+sweep_config = SweepConfig()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help="Write the ranked results to this CSV file")
+    args = parser.parse_args()
+
+    runner = ParameterSweepRunner(main_config=main_config, feature_config=feature_config, sweep_config=sweep_config)
+    print(f"Evaluating {len(runner.combinations())} combinations on {sweep_config.EPOCHS} epochs each with the "
+          f"{sweep_config.STRATEGY} strategy")
+    results = runner.run(epochs=sweep_config.EPOCHS, seed=sweep_config.SEED)
+    print(results.to_string())
+    if args.output:
+        results.to_csv(args.output)
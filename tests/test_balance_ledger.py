@@ -0,0 +1,64 @@
+import time
+from typing import Callable
+
+import pytest
+
+from benchmarks.fake_exchange import FakeExchange, LocalUserDataStream
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.configs.credentials import Credentials
+from binance_bot.state.balance_ledger import BalanceLedger
+
+PAIR = 'VETUSDT'
+SYMBOLS = ['VET', 'USDT']
+ORDERS = 30
+
+
+class PositionFirstUserDataStream(LocalUserDataStream):
+    """Deliver the account position of every fill before its execution report."""
+
+    def add_listener(self, on_event: Callable[[dict], None], on_reconnect: Callable[[], None] = None) -> None:
+        held = []
+
+        def deliver(event: dict) -> None:
+            if event['e'] == 'executionReport':
+                held.append(event)
+                return
+            on_event(event)
+            while held:
+                on_event(held.pop(0))
+
+        super().add_listener(deliver, on_reconnect)
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange(pairs=[PAIR], price=0.05, balance=1000.0)
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+def drift(ledger: BalanceLedger, exchange: FakeExchange) -> float:
+    portfolio = ledger.get_portfolio(SYMBOLS)
+    return max(abs(portfolio.get_free(symbol) - exchange.balances[symbol][0]) for symbol in SYMBOLS)
+
+
+@pytest.mark.parametrize('stream_class', [LocalUserDataStream, PositionFirstUserDataStream])
+def test_fills_are_counted_once_in_either_event_order(exchange, stream_class):
+    client = BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url,
+                           test_orders=False)
+    stream = stream_class(exchange)
+    ledger = BalanceLedger(client, stream, pairs={PAIR: tuple(SYMBOLS)}, reconcile_interval_seconds=3600)
+    ledger.start()
+    # Fills in the millisecond of the snapshot would be taken as included in it
+    time.sleep(0.01)
+    for order in range(ORDERS):
+        client.place_order_market(pair=PAIR, side='BUY' if order % 3 else 'SELL', quantity='1.5')
+    stream.join()
+    # An execution report and an account position per fill
+    assert ledger.events == 2 * ORDERS
+    assert drift(ledger, exchange) < BalanceLedger.TOLERANCE
+    ledger.reconcile()
+    assert drift(ledger, exchange) < BalanceLedger.TOLERANCE
+    assert ledger.corrections == 0
+    ledger.stop()
@@ -0,0 +1,74 @@
+import numpy as np
+
+from benchmarks.synthetic_klines import generate_klines
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.constants import KlineProps
+from binance_bot.executor.batch_simulator import BatchSimulator
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.strategy.batch_actions import BatchActions
+from binance_bot.strategy.random_strategy import RandomStrategy
+
+N_ROWS = 2000
+
+
+def initial_assets(main_config: MainConfig) -> Portfolio:
+    return Portfolio(symbols=[main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL], free=[1000, 10000])
+
+
+def replay(main_config: MainConfig, actions: BatchActions, closes: np.ndarray, assets: Portfolio) -> np.ndarray:
+    """Execute the actions step by step like TrainingExecutor and return the balances after each step."""
+    balances = np.empty((len(closes), 2))
+    for step, (side, quantity, close) in enumerate(zip(actions.sides, actions.quantities, closes)):
+        if actions.relative:
+            if side == BatchActions.SELL:
+                quantity *= assets.get_free(main_config.TARGET_SYMBOL)
+            elif side == BatchActions.BUY:
+                quantity *= close * assets.get_free(main_config.BASE_SYMBOL)
+        if side != BatchActions.HOLD:
+            assets.trade(
+                target_symbol=main_config.TARGET_SYMBOL,
+                base_symbol=main_config.BASE_SYMBOL,
+                target_qty=side * quantity,
+                base_qty=-side * quantity / close
+            )
+        balances[step] = assets.get_free(main_config.TARGET_SYMBOL), assets.get_free(main_config.BASE_SYMBOL)
+    return balances
+
+
+def test_prefix_scan_matches_step_by_step_replay_of_relative_actions():
+    main_config = MainConfig()
+    klines = generate_klines(N_ROWS)
+    closes = klines[KlineProps.CLOSE].to_numpy()
+    actions = RandomStrategy(main_config, seed=1).apply_batch(klines, klines, initial_assets(main_config))
+    assert actions.relative
+
+    assets = initial_assets(main_config)
+    balances, asset_values = BatchSimulator(main_config).run(
+        RandomStrategy(main_config, seed=1), klines=klines, features=klines, assets=assets
+    )
+    expected_assets = initial_assets(main_config)
+    expected = replay(main_config, actions, closes, expected_assets)
+
+    np.testing.assert_allclose(balances, expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(asset_values, expected[:, 1] + expected[:, 0] / closes, rtol=1e-9)
+    np.testing.assert_allclose(assets.free, expected_assets.free, rtol=1e-9, atol=1e-9)
+
+
+def test_absolute_actions_match_step_by_step_replay():
+    main_config = MainConfig()
+    klines = generate_klines(N_ROWS)
+    closes = klines[KlineProps.CLOSE].to_numpy()
+    rng = np.random.default_rng(2)
+    # Alternate buying and selling small amounts, so that no balance becomes negative
+    sides = np.where(np.arange(N_ROWS) % 2 == 0, BatchActions.BUY, BatchActions.SELL)
+    actions = BatchActions(sides=sides, quantities=rng.uniform(0, 1, N_ROWS))
+
+    class FixedStrategy(RandomStrategy):
+        def apply_batch(self, klines, features, assets):
+            return actions
+
+    assets = initial_assets(main_config)
+    balances, _ = BatchSimulator(main_config).run(FixedStrategy(main_config), klines=klines, features=klines,
+                                                  assets=assets)
+    np.testing.assert_allclose(balances, replay(main_config, actions, closes, initial_assets(main_config)),
+                               rtol=1e-9, atol=1e-9)
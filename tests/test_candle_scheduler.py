@@ -0,0 +1,63 @@
+import time
+
+from binance_bot.client.candle_scheduler import CandleScheduler
+
+INTERVAL_MS = 60000
+
+
+class ServerClock:
+    """The server time request of BinanceClient, on a clock which is offset from the local one."""
+
+    def __init__(self, offset_ms: float):
+        self.offset_ms = offset_ms
+
+    def get_server_time_ms(self) -> int:
+        return int(time.time() * 1000 + self.offset_ms)
+
+
+def clock_before_boundary(ms_before: float) -> ServerClock:
+    """Return a server clock which reaches the next interval boundary ms_before milliseconds from now."""
+    now_ms = time.time() * 1000
+    boundary_ms = (now_ms // INTERVAL_MS + 10) * INTERVAL_MS
+    return ServerClock(offset_ms=boundary_ms - ms_before - now_ms)
+
+
+def test_wakes_up_after_the_boundary_of_the_server_clock():
+    clock = clock_before_boundary(50)
+    scheduler = CandleScheduler(clock, '1m')
+    polls = []
+    started = time.monotonic()
+    time_open = scheduler.wait_for_close(is_closed=lambda polled: polls.append(polled) or True)
+    assert time.monotonic() - started >= 0.05 - 0.01
+    assert time_open % INTERVAL_MS == 0
+    assert scheduler.server_time_ms() >= time_open + INTERVAL_MS
+    assert polls == [time_open]
+    assert abs(scheduler.offset_ms - clock.offset_ms) < 50
+
+
+def test_polls_until_the_candle_is_closed():
+    scheduler = CandleScheduler(clock_before_boundary(10), '1m')
+    polls = []
+    time_open = scheduler.wait_for_close(is_closed=lambda polled: polls.append(polled) or len(polls) >= 3)
+    assert polls == [time_open] * 3
+
+
+def test_returns_after_the_poll_timeout():
+    scheduler = CandleScheduler(clock_before_boundary(10), '1m', poll_timeout_seconds=0.05)
+    started = time.monotonic()
+    time_open = scheduler.wait_for_close(is_closed=lambda polled: False)
+    assert time.monotonic() - started < 1
+    assert time_open % INTERVAL_MS == 0
+
+
+def test_missed_candles_are_skipped():
+    clock = clock_before_boundary(10)
+    scheduler = CandleScheduler(clock, '1m')
+    first = scheduler.wait_for_close(is_closed=lambda polled: True)
+    # The caller was busy for three intervals, the latest closed candle is returned without waiting
+    clock.offset_ms += 3 * INTERVAL_MS
+    scheduler.sync_clock()
+    started = time.monotonic()
+    latest = scheduler.wait_for_close(is_closed=lambda polled: True)
+    assert time.monotonic() - started < 0.5
+    assert latest == first + 3 * INTERVAL_MS
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_klines import generate_klines
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.constants import Indicators, KlineProps
+from binance_bot.processing.feature_calculator import FeatureCalculator, FeatureStream
+
+N_ROWS = 400
+
+
+def assert_features_equal(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    assert list(actual.columns) == list(expected.columns)
+    np.testing.assert_allclose(
+        actual.to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64), rtol=FeatureStream.RELATIVE_TOLERANCE, equal_nan=True
+    )
+
+
+def test_update_matches_batch_calculation():
+    klines = generate_klines(N_ROWS)
+    calculator = FeatureCalculator(FeatureConfig())
+    stream = calculator.create_stream()
+    features = pd.DataFrame([stream.update(klines.iloc[position]) for position in range(N_ROWS)])
+    assert_features_equal(features, calculator.calculate_features(klines))
+
+
+def test_update_with_same_open_time_replaces_last_kline():
+    klines = generate_klines(N_ROWS)
+    calculator = FeatureCalculator(FeatureConfig())
+    stream = calculator.create_stream()
+    for position in range(N_ROWS - 1):
+        stream.update(klines.iloc[position])
+    open_candle = klines.iloc[-1].copy()
+    open_candle[KlineProps.CLOSE] *= 1.01
+    stream.update(open_candle)
+    features = pd.DataFrame([stream.update(klines.iloc[-1])])
+    assert_features_equal(features, calculator.calculate_features(klines).iloc[[-1]].reset_index(drop=True))
+
+
+def test_from_history_continues_like_batch_calculation():
+    klines = generate_klines(N_ROWS)
+    calculator = FeatureCalculator(FeatureConfig())
+    stream = FeatureStream.from_history(FeatureConfig(), klines.iloc[:300], calculator.features)
+    features = stream.extend(klines.iloc[300:])
+    assert_features_equal(features, calculator.calculate_features(klines).iloc[300:])
+
+
+def test_moving_window_matches_batch_calculation_of_consumed_klines():
+    klines = generate_klines(N_ROWS)
+    calculator = FeatureCalculator(FeatureConfig())
+    stream = calculator.create_stream()
+    window_size = 200
+    for end in range(window_size, N_ROWS + 1, 7):
+        features = stream.calculate_features(klines.iloc[end - window_size:end])
+        assert features.shape[0] == window_size
+        assert features.index.equals(klines.index[end - window_size:end])
+    expected = calculator.calculate_features(klines.iloc[:end])
+    assert_features_equal(features.iloc[[-1]], expected.iloc[[-1]])
+
+
+def test_unsupported_configuration_is_reported():
+    feature_config = FeatureConfig()
+    feature_config.BBANDS_MATYPE = 1
+    assert not FeatureCalculator(feature_config).supports_streaming()
+    assert not FeatureCalculator(FeatureConfig(), features=[Indicators.RSI]).supports_streaming()
+    assert FeatureCalculator(FeatureConfig()).supports_streaming()
+
+
+def test_moving_averages_keep_the_index_of_the_klines():
+    klines = generate_klines(N_ROWS)
+    shifted_klines = klines.set_axis(klines.index + 1000)
+    features = [Indicators.EMA_SHORT, Indicators.SMA_SHORT]
+    calculator = FeatureCalculator(FeatureConfig(), features=features)
+    shifted_features = calculator.calculate_features(shifted_klines)
+    assert (shifted_features.index == shifted_klines.index).all()
+    assert shifted_features[features].iloc[-1].notna().all()
+    assert_features_equal(shifted_features, calculator.calculate_features(klines))
+
+
+def test_accepted_tolerance_is_floating_point_rounding():
+    klines = generate_klines(N_ROWS)
+    feature_config = FeatureConfig()
+    feature_config.EXP_SMOOTHING_ENABLED = True
+    calculator = FeatureCalculator(feature_config)
+    expected = calculator.calculate_features(klines).iloc[300:].drop(columns=KlineProps.TIME_OPEN)
+    stream = FeatureStream.from_history(feature_config, klines.iloc[:300], calculator.features)
+    actual = stream.extend(klines.iloc[300:]).drop(columns=KlineProps.TIME_OPEN)
+    expected_values = expected.to_numpy(dtype=np.float64)
+    relative_deviation = np.abs(actual.to_numpy(dtype=np.float64) - expected_values) / np.abs(expected_values)
+    assert FeatureStream.RELATIVE_TOLERANCE == 1e-9
+    assert np.nanmax(relative_deviation) <= FeatureStream.RELATIVE_TOLERANCE
@@ -0,0 +1,24 @@
+import numpy as np
+import talib
+
+from benchmarks.synthetic_klines import generate_klines
+from binance_bot.constants import Indicators, KlineProps
+from binance_bot.processing.indicator_functions import calc_cci, calc_typical_price
+from binance_bot.processing.indicator_registry import registry
+
+N_ROWS = 1000
+
+
+def test_cci_from_typical_prices_matches_talib():
+    klines = generate_klines(N_ROWS)
+    highs, lows, closes = klines[KlineProps.HIGH], klines[KlineProps.LOW], klines[KlineProps.CLOSE]
+    cci = calc_cci(calc_typical_price(highs=highs, lows=lows, closes=closes), cci_period=20)
+    expected = talib.CCI(highs.to_numpy(), lows.to_numpy(), closes.to_numpy(), timeperiod=20)
+    np.testing.assert_allclose(cci.to_numpy(), expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_typical_price_is_calculated_once_for_all_consumers():
+    plan = registry.resolve([Indicators.CCI, Indicators.TYPICAL_PRICE])
+    names = [indicator.name for indicator in plan]
+    assert names.count(Indicators.TYPICAL_PRICE) == 1
+    assert names.index(Indicators.TYPICAL_PRICE) < names.index(Indicators.CCI)
@@ -0,0 +1,18 @@
+from binance_bot.instrumentation import Instrumentation
+
+
+def test_every_gauge_has_one_type_line_before_its_samples():
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    instrumentation.set_gauge('order_queue_depth', 3, slot='a')
+    instrumentation.set_gauge('order_queue_depth', 1, slot='b')
+    instrumentation.set_gauge('balance_drift', 0.5)
+    lines = instrumentation.render_prometheus().splitlines()
+
+    assert lines.count("# TYPE binance_bot_order_queue_depth gauge") == 1
+    assert lines.count("# TYPE binance_bot_balance_drift gauge") == 1
+    type_line = lines.index("# TYPE binance_bot_order_queue_depth gauge")
+    assert lines[type_line + 1:type_line + 3] == [
+        'binance_bot_order_queue_depth{slot="a"} 3',
+        'binance_bot_order_queue_depth{slot="b"} 1'
+    ]
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_klines import generate_klines
+from binance_bot.client.kline_cache import KlineCache
+from binance_bot.constants import KlineProps
+
+PAIR = 'VETUSDT'
+
+
+class TableDatabase:
+    """The two reads of DatabaseClient the cache uses, on an in-memory table."""
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self.table_reads = 0
+
+    def get_time_open_range(self, pair: str):
+        time_opens = self.table[KlineProps.TIME_OPEN]
+        return int(time_opens.min()), int(time_opens.max())
+
+    def read_table(self, pair: str) -> pd.DataFrame:
+        self.table_reads += 1
+        return self.table
+
+
+def test_unchanged_table_is_read_from_the_cache(tmp_path):
+    database = TableDatabase(generate_klines(100))
+    cache = KlineCache(database_client=database, cache_dir=str(tmp_path))
+    cache.read_table(PAIR)
+    klines = KlineCache(database_client=database, cache_dir=str(tmp_path)).read_table(PAIR)
+    assert database.table_reads == 1
+    assert klines[KlineProps.TIME_OPEN].dtype == np.int64
+    np.testing.assert_array_equal(klines[KlineProps.CLOSE], database.table[KlineProps.CLOSE])
+
+
+def test_cache_is_rebuilt_when_the_newest_kline_changes(tmp_path):
+    database = TableDatabase(generate_klines(100))
+    cache = KlineCache(database_client=database, cache_dir=str(tmp_path))
+    cache.read_table(PAIR)
+    database.table = generate_klines(120)
+    klines = cache.read_table(PAIR)
+    assert database.table_reads == 2
+    assert klines.shape[0] == 120
+
+
+def test_cache_is_rebuilt_when_the_oldest_kline_changes(tmp_path):
+    database = TableDatabase(generate_klines(100))
+    cache = KlineCache(database_client=database, cache_dir=str(tmp_path))
+    cache.read_table(PAIR)
+    # Trimming the start of the table keeps the newest kline
+    database.table = database.table.iloc[10:].reset_index(drop=True)
+    klines = cache.read_table(PAIR)
+    assert database.table_reads == 2
+    assert klines.shape[0] == 90
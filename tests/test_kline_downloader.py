@@ -0,0 +1,79 @@
+import time
+
+import pandas as pd
+import pytest
+from binance.exceptions import BinanceAPIException
+
+from benchmarks.fake_exchange import FakeExchange
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.kline_downloader import DownloadError, KlineDownloader, RequestWeightBudget
+from binance_bot.configs.credentials import Credentials
+from binance_bot.constants import KlineProps
+
+START_MS = 1500000000000
+INTERVAL_MS = 60000
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange(pairs=['VETUSDT', 'BTCUSDT'], kline_start_ms=START_MS, kline_interval_ms=INTERVAL_MS)
+    exchange.kline_end_ms = START_MS + 2500 * INTERVAL_MS - 1
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+def download(downloader: KlineDownloader, exchange: FakeExchange) -> dict:
+    pages = {}
+    for pair, klines in downloader.download({pair: START_MS for pair in exchange.pairs}, '1m',
+                                            end_ms=exchange.kline_end_ms + 1):
+        pages.setdefault(pair, []).append(klines)
+    return {pair: pd.concat(pair_pages, ignore_index=True) for pair, pair_pages in pages.items()}
+
+
+def test_pages_of_each_pair_are_complete_and_in_order(exchange):
+    klines = download(KlineDownloader(base_url=exchange.base_url, max_workers=3), exchange)
+    for pair in exchange.pairs:
+        time_opens = klines[pair][KlineProps.TIME_OPEN].to_numpy()
+        assert len(time_opens) == 2500
+        assert (time_opens == START_MS + INTERVAL_MS * pd.RangeIndex(2500).to_numpy()).all()
+
+
+@pytest.mark.parametrize('status', [429, 418])
+def test_rate_limited_requests_are_retried_after_retry_after(exchange, status):
+    exchange.throttle(status, retry_after_seconds=0.5, requests=2)
+    downloader = KlineDownloader(budget=RequestWeightBudget(), base_url=exchange.base_url, max_workers=2)
+    started = time.monotonic()
+    klines = download(downloader, exchange)
+    assert time.monotonic() - started >= 0.5
+    assert all(pair_klines.shape[0] == 2500 for pair_klines in klines.values())
+    # One request for the first kline and three pages per pair, plus the two throttled requests
+    assert exchange.kline_requests == 2 * 4 + 2
+
+
+def test_download_fails_after_max_retries(exchange):
+    exchange.throttle(429, retry_after_seconds=0.01, requests=100)
+    downloader = KlineDownloader(base_url=exchange.base_url, max_workers=1, max_retries=2)
+    with pytest.raises(DownloadError):
+        download(downloader, exchange)
+
+
+@pytest.mark.parametrize('status', [429, 418])
+def test_historical_data_is_retried_within_the_budget(exchange, status):
+    client = BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url,
+                           budget=RequestWeightBudget())
+    exchange.throttle(status, retry_after_seconds=0.5, requests=2)
+    started = time.monotonic()
+    klines = client.get_historical_data('VETUSDT', '1m', start_ms=START_MS)
+    assert time.monotonic() - started >= 0.5
+    assert klines.shape[0] == 2500
+    # Three pages plus the two throttled requests
+    assert exchange.kline_requests == 3 + 2
+
+
+def test_historical_data_fails_after_max_retries(exchange):
+    client = BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url)
+    exchange.throttle(429, retry_after_seconds=0.01, requests=100)
+    with pytest.raises(BinanceAPIException):
+        client.get_historical_data('VETUSDT', '1m', start_ms=START_MS)
+    assert exchange.kline_requests == BinanceClient.MAX_RETRIES + 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_klines import generate_klines_response
+from binance_bot.client.kline_parser import KlineParser
+from binance_bot.constants import KlineProps
+
+KLINES = generate_klines_response(250)
+
+
+def response(first: int, n_klines: int) -> list:
+    return KLINES[first:first + n_klines]
+
+
+def old_klines_to_dataframe(klines: list) -> pd.DataFrame:
+    """The conversion BinanceClient._klines_to_dataframe did before KlineParser."""
+    klines = np.array(klines)
+    return pd.DataFrame({
+        KlineProps.TIME_OPEN: klines[:, 0],
+        KlineProps.OPEN: klines[:, 1],
+        KlineProps.HIGH: klines[:, 2],
+        KlineProps.LOW: klines[:, 3],
+        KlineProps.CLOSE: klines[:, 4],
+        KlineProps.VOLUME: klines[:, 5]
+    }).astype(float)
+
+
+def test_output_matches_the_old_conversion():
+    klines = response(0, 100)
+    parser = KlineParser(len(klines))
+    parser.add_page(klines)
+    parsed = parser.to_dataframe()
+    expected = old_klines_to_dataframe(klines)
+    assert list(parsed.columns) == list(expected.columns)
+    # The open time is int64 now, like in KlineCache and DatabaseClient, all other columns stay float64
+    assert parsed[KlineProps.TIME_OPEN].dtype == np.int64
+    assert (parsed.drop(columns=KlineProps.TIME_OPEN).dtypes == np.float64).all()
+    pd.testing.assert_frame_equal(parsed.astype(float), expected)
+
+
+def test_pages_beyond_the_capacity_grow_the_buffers():
+    parser = KlineParser(10)
+    for first in range(0, 250, 50):
+        parser.add_page(response(first, 50))
+    assert len(parser) == 250
+    assert parser.capacity >= 250
+    assert parser.last_time_open() == KLINES[-1][0]
+    pd.testing.assert_frame_equal(parser.to_dataframe().astype(float), old_klines_to_dataframe(response(0, 250)))
+
+
+def test_empty_response_gives_the_same_columns():
+    parser = KlineParser()
+    parser.add_page([])
+    parsed = parser.to_dataframe()
+    assert parsed.shape == (0, 6)
+    assert list(parsed.columns) == list(old_klines_to_dataframe(response(0, 1)).columns)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from benchmarks.fake_exchange import FakeExchange
+from benchmarks.local_kline_websocket import LocalKlineWebSocket
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.client.kline_stream import KlineStream
+from binance_bot.configs.credentials import Credentials
+from binance_bot.constants import KlineProps
+
+START_MS = 1500000000000
+INTERVAL_MS = 60000
+WINDOW_SIZE = 50
+
+
+def time_open(index: int) -> int:
+    return START_MS + index * INTERVAL_MS
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange(pairs=['VETUSDT', 'BTCUSDT'], kline_start_ms=START_MS, kline_interval_ms=INTERVAL_MS)
+    exchange.kline_end_ms = time_open(100) - 1
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+@pytest.fixture
+def websocket_server(exchange):
+    websocket_server = LocalKlineWebSocket(exchange)
+    websocket_server.start()
+    yield websocket_server
+    websocket_server.stop()
+
+
+@pytest.fixture
+def stream(exchange, websocket_server):
+    client = BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url)
+    stream = KlineStream(client, exchange.pairs, '1m', window_size=WINDOW_SIZE, base_url=websocket_server.base_url)
+    stream.start()
+    assert websocket_server.wait_for_connections(1)
+    # The candle of the klines filled in at the start counts as closed
+    assert stream.wait_for_close(timeout=0)
+    yield stream
+    stream.stop()
+
+
+def assert_window_ends_at(stream: KlineStream, exchange: FakeExchange, last_index: int) -> None:
+    for pair in exchange.pairs:
+        klines = stream.get_klines(pair)
+        expected_time_opens = [time_open(index) for index in range(last_index - WINDOW_SIZE + 1, last_index + 1)]
+        assert klines[KlineProps.TIME_OPEN].tolist() == expected_time_opens
+        np.testing.assert_allclose(
+            klines[KlineProps.CLOSE].to_numpy(),
+            [float(exchange.kline(pair, time_open_)[4]) for time_open_ in expected_time_opens]
+        )
+
+
+def test_candle_counts_as_closed_once_closed_for_all_pairs(exchange, websocket_server, stream):
+    websocket_server.close_candle(time_open(100), pairs=['VETUSDT'])
+    assert not stream.wait_for_close(timeout=0.2)
+    assert not stream.has_closed(time_open(100))
+    websocket_server.close_candle(time_open(100), pairs=['BTCUSDT'])
+    assert stream.wait_for_close(timeout=5)
+    assert stream.has_closed(time_open(100))
+    assert_window_ends_at(stream, exchange, 100)
+
+
+def test_gap_is_backfilled_via_rest(exchange, websocket_server, stream):
+    exchange.kline_end_ms = time_open(104) - 1
+    websocket_server.close_candle(time_open(103))
+    assert stream.wait_for_close(timeout=5)
+    assert_window_ends_at(stream, exchange, 103)
+
+
+def test_candles_missed_while_disconnected_are_backfilled_after_reconnect(exchange, websocket_server, stream):
+    exchange.kline_end_ms = time_open(106) - 1
+    websocket_server.disconnect()
+    assert websocket_server.wait_for_connections(2, timeout=10)
+    assert stream.wait_for_close(timeout=5)
+    assert_window_ends_at(stream, exchange, 105)
+    websocket_server.close_candle(time_open(106))
+    assert stream.wait_for_close(timeout=5)
+    assert_window_ends_at(stream, exchange, 106)
@@ -0,0 +1,60 @@
+from typing import List
+
+import pandas as pd
+import pytest
+
+from benchmarks.fake_exchange import FakeExchange
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.configs.credentials import Credentials
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.configs.main_config import MainConfig, SlotConfig
+from binance_bot.executor import live_runner
+from binance_bot.executor.live_runner import LiveRunner
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.strategy.abstract_strategy import AbstractStrategy
+
+START_MS = 1500000000000
+INTERVAL_MS = 60000
+BALANCE = 1000.0
+
+
+class RecordingStrategy(AbstractStrategy):
+    """Never trades, records the portfolios it is given."""
+
+    portfolios: List[Portfolio] = []
+
+    def __init__(self, main_config: MainConfig):
+        self._config = main_config
+
+    def apply(self, klines: pd.DataFrame, features: pd.DataFrame, assets: Portfolio):
+        RecordingStrategy.portfolios.append(assets)
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange(pairs=['VETUSDT'], balance=BALANCE, kline_start_ms=START_MS, kline_interval_ms=INTERVAL_MS)
+    exchange.kline_end_ms = START_MS + 600 * INTERVAL_MS - 1
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+def test_slots_with_half_allocations_see_half_the_balances(exchange, monkeypatch):
+    monkeypatch.setitem(live_runner.STRATEGIES, 'recording', RecordingStrategy)
+    RecordingStrategy.portfolios = []
+    main_config = MainConfig()
+    main_config.FEATURE_PAIRS = []
+    main_config.SLOTS = [
+        SlotConfig(name=name, target_symbol='VET', base_symbol='USDT', strategy='recording', allocation=0.5)
+        for name in ('first', 'second')
+    ]
+    client = BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url)
+    runner = LiveRunner(client, main_config, FeatureCalculator(FeatureConfig()))
+    runner.step()
+    # The klines of the pair both slots trade are requested once
+    assert exchange.kline_requests == 1
+    assert len(RecordingStrategy.portfolios) == 2
+    for portfolio in RecordingStrategy.portfolios:
+        assert portfolio.get_free('VET') == pytest.approx(BALANCE / 2)
+        assert portfolio.get_free('USDT') == pytest.approx(BALANCE / 2)
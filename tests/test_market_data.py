@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from benchmarks.fake_exchange import FakeExchange
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.configs.credentials import Credentials
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.constants import KlineProps
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.state.market_data import MarketData
+
+START_MS = 1500000000000
+INTERVAL_MS = 60000
+PAIR = 'VETUSDT'
+
+
+def time_open(index: int) -> int:
+    return START_MS + index * INTERVAL_MS
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange(pairs=[PAIR], kline_start_ms=START_MS, kline_interval_ms=INTERVAL_MS)
+    exchange.kline_end_ms = time_open(600) - 1
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+@pytest.fixture
+def market_data(exchange):
+    main_config = MainConfig()
+    main_config.FEATURE_PAIRS = []
+    client = BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url)
+    market_data = MarketData(client, main_config, FeatureCalculator(FeatureConfig()), target_pairs=[PAIR], symbols=[])
+    market_data.next_step()
+    return market_data
+
+
+def assert_window_ends_at(market_data: MarketData, last_index: int) -> None:
+    time_opens = market_data.get_klines(PAIR)[KlineProps.TIME_OPEN].to_numpy()
+    expected = [time_open(index) for index in range(last_index - MarketData.WINDOW_SIZE + 1, last_index + 1)]
+    np.testing.assert_array_equal(time_opens, expected)
+    np.testing.assert_array_equal(market_data.get_features(PAIR)[KlineProps.TIME_OPEN].to_numpy(), expected)
+
+
+def test_delta_is_merged_into_the_window(exchange, market_data):
+    assert_window_ends_at(market_data, 599)
+    exchange.kline_end_ms = time_open(602) - 1
+    requests = exchange.kline_requests
+    market_data.next_step()
+    # One delta request for the last buffered kline and the two new ones
+    assert exchange.kline_requests == requests + 1
+    assert_window_ends_at(market_data, 601)
+
+
+def test_gap_larger_than_delta_limit_fetches_the_whole_window(exchange, market_data):
+    exchange.kline_end_ms = time_open(600 + MarketData.DELTA_LIMIT * 2) - 1
+    requests = exchange.kline_requests
+    market_data.next_step()
+    # The delta response is full, so the window is requested again
+    assert exchange.kline_requests == requests + 2
+    assert_window_ends_at(market_data, 599 + MarketData.DELTA_LIMIT * 2)
+
+
+def test_updated_last_kline_is_replaced_not_appended(exchange, market_data):
+    close = market_data.get_klines(PAIR)[KlineProps.CLOSE].iloc[-1]
+    # The last kline is served again with other prices, like a kline which was still open
+    exchange.price *= 1.1
+    market_data.next_step()
+    assert_window_ends_at(market_data, 599)
+    assert market_data.get_klines(PAIR)[KlineProps.CLOSE].iloc[-1] == pytest.approx(close * 1.1)
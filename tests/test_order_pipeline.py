@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from benchmarks.fake_exchange import FakeExchange
+from binance_bot.client.binance_client import BinanceClient
+from binance_bot.configs.credentials import Credentials
+from binance_bot.executor.order_pipeline import OrderPipeline
+from binance_bot.instrumentation import instrumentation
+from binance_bot.strategy.strategy_action import StrategyAction
+
+PAIR = 'VETUSDT'
+ORDERS = 100
+
+
+@pytest.fixture
+def exchange():
+    # A share of the order requests fails, half of them after the order was placed (lost response)
+    exchange = FakeExchange(pairs=[PAIR], failure_rate=0.3, seed=1)
+    exchange.start()
+    yield exchange
+    exchange.stop()
+
+
+def submit_orders(client: BinanceClient) -> OrderPipeline:
+    pipeline = OrderPipeline(client, max_queue_size=ORDERS, max_retries=10, backoff_seconds=0.001)
+    pipeline.start()
+    for _ in range(ORDERS):
+        pipeline.execute(StrategyAction(side="BUY", pair=PAIR, quantity=1.23456))
+    pipeline.join()
+    pipeline.stop()
+    return pipeline
+
+
+def live_client(exchange: FakeExchange) -> BinanceClient:
+    return BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url, test_orders=False)
+
+
+def test_orders_with_lost_responses_are_placed_exactly_once(exchange):
+    pipeline = submit_orders(live_client(exchange))
+    assert pipeline.retries > 0
+    assert pipeline.failed == 0
+    assert pipeline.submitted == ORDERS
+    assert len(exchange.orders) == pipeline.submitted
+
+
+def test_duplicate_of_own_order_counts_as_submitted(exchange):
+    # Without a working lookup, every resent order whose response got lost is rejected as a duplicate
+    exchange.lookup_failure_rate = 1.0
+    pipeline = submit_orders(live_client(exchange))
+    assert pipeline.failed == 0
+    assert pipeline.submitted == ORDERS
+    assert len(exchange.orders) == pipeline.submitted
+
+
+def test_test_orders_are_not_stored(exchange):
+    exchange.failure_rate = 0.0
+    client = BinanceClient(Credentials(api_key='key', api_secret='secret'), api_url=exchange.api_url)
+    pipeline = submit_orders(client)
+    assert pipeline.submitted == ORDERS
+    assert exchange.test_order_requests == ORDERS
+    assert len(exchange.orders) == 0
+    assert client.get_order_by_client_id(PAIR, OrderPipeline.CLIENT_ORDER_ID_PREFIX + 'unknown') is None
+
+
+def test_candle_close_to_order_includes_the_round_trip(exchange):
+    exchange.failure_rate = 0.0
+    exchange.latency_seconds = 0.1
+    pipeline = OrderPipeline(live_client(exchange), slot='main')
+    pipeline.start()
+    instrumentation.enable()
+    try:
+        pipeline.execute(StrategyAction(side="BUY", pair=PAIR, quantity=1.0), candle_close_ms=time.time() * 1000)
+        pipeline.join()
+        histogram = instrumentation.snapshot(reset=True)[('candle_close_to_order', (('slot', 'main'),))]
+    finally:
+        instrumentation.enabled = False
+        pipeline.stop()
+    assert histogram.count == 1
+    assert histogram.sum >= exchange.latency_seconds
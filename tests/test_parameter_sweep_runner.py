@@ -0,0 +1,57 @@
+import copy
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_klines import generate_klines
+from binance_bot.configs.feature_config import FeatureConfig
+from binance_bot.configs.main_config import MainConfig
+from binance_bot.configs.sweep_config import SweepConfig
+from binance_bot.executor.parameter_sweep_runner import ParameterSweepRunner
+from binance_bot.processing.feature_calculator import FeatureCalculator
+from binance_bot.state.portfolio import Portfolio
+from binance_bot.strategy.band_momentum_strategy import BandMomentumStrategy
+from binance_bot.strategy.batch_actions import BatchActions
+
+N_ROWS = 2000
+SIDES = {'SELL': BatchActions.SELL, 'BUY': BatchActions.BUY}
+
+
+def test_strategy_without_features_is_rejected():
+    sweep_config = SweepConfig()
+    sweep_config.STRATEGY = 'random'
+    runner = ParameterSweepRunner(MainConfig(), FeatureConfig(), sweep_config, processes=1)
+    with pytest.raises(ValueError, match='FEATURES'):
+        runner.run(epochs=1)
+
+
+def test_band_momentum_actions_depend_on_the_features():
+    main_config = MainConfig()
+    klines = generate_klines(N_ROWS)
+    assets = Portfolio(symbols=[main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL], free=[1000, 10000])
+    strategy = BandMomentumStrategy(main_config)
+    narrow_config = FeatureConfig()
+    wide_config = copy.copy(narrow_config)
+    wide_config.BBANDS_UPPER = narrow_config.BBANDS_UPPER + 1
+    wide_config.BBANDS_LOWER = narrow_config.BBANDS_LOWER + 1
+    sides = [
+        strategy.apply_batch(klines, FeatureCalculator(config, features=BandMomentumStrategy.FEATURES)
+                             .calculate_features(klines), assets).sides
+        for config in (narrow_config, wide_config)
+    ]
+    assert (sides[0] != sides[1]).any()
+
+
+def test_band_momentum_apply_matches_apply_batch():
+    main_config = MainConfig()
+    klines = generate_klines(N_ROWS)
+    assets = Portfolio(symbols=[main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL], free=[1000, 10000])
+    strategy = BandMomentumStrategy(main_config)
+    features = FeatureCalculator(FeatureConfig(), features=BandMomentumStrategy.FEATURES).calculate_features(klines)
+    actions = strategy.apply_batch(klines, features, assets)
+    sides = []
+    for step in range(N_ROWS):
+        action = strategy.apply(klines.iloc[:step + 1], features.iloc[:step + 1], assets)
+        sides.append(BatchActions.HOLD if action is None else SIDES[action.side])
+    assert (np.array(sides) == actions.sides).all()
+    assert (actions.sides != 0).any()
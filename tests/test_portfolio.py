@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from binance_bot.state.portfolio import NegativeBalanceError, Portfolio
+
+
+def portfolio() -> Portfolio:
+    return Portfolio(symbols=['VET', 'USDT'], free=[100., 10.])
+
+
+def test_trade_updates_free_balances():
+    assets = portfolio()
+    assets.trade(target_symbol='VET', base_symbol='USDT', target_qty=50., base_qty=-5.)
+    assert assets.get_free('VET') == 150.
+    assert assets.get_free('USDT') == 5.
+
+
+def test_trade_overdraft_raises_and_keeps_balances():
+    assets = portfolio()
+    with pytest.raises(NegativeBalanceError):
+        assets.trade(target_symbol='VET', base_symbol='USDT', target_qty=200., base_qty=-20.)
+    np.testing.assert_array_equal(assets.free, [100., 10.])
+
+
+def test_trade_within_tolerance_is_accepted():
+    assets = portfolio()
+    assets.trade(target_symbol='VET', base_symbol='USDT', target_qty=-100. - Portfolio.TOLERANCE / 2, base_qty=1.)
+    assert assets.get_free('VET') <= 0.
+
+
+def test_apply_trades_returns_balances_after_each_trade():
+    assets = portfolio()
+    balances = assets.apply_trades(target_symbol='VET', base_symbol='USDT', target_qtys=np.array([10., -30.]),
+                                   base_qtys=np.array([-1., 3.]))
+    np.testing.assert_array_equal(balances, [[110., 9.], [80., 12.]])
+    np.testing.assert_array_equal(assets.free, [80., 12.])
+
+
+def test_apply_trades_overdraft_rejects_the_whole_batch():
+    assets = portfolio()
+    dataframe = assets.to_dataframe()
+    # The second trade overdraws the base asset, the first one must not be applied either
+    with pytest.raises(NegativeBalanceError, match='Trade number 1'):
+        assets.apply_trades(target_symbol='VET', base_symbol='USDT', target_qtys=np.array([10., 100.]),
+                            base_qtys=np.array([-1., -10.]))
+    np.testing.assert_array_equal(assets.free, [100., 10.])
+    assert assets.to_dataframe() is dataframe
@@ -0,0 +1,53 @@
+import numpy as np
+
+from binance_bot.state.ring_buffer import RingBuffer
+
+CAPACITY = 4
+
+
+def filled_buffer(rows: int) -> RingBuffer:
+    buffer = RingBuffer(['time_open', 'close'], CAPACITY)
+    for row in range(rows):
+        buffer.append([row, 10. * row])
+    return buffer
+
+
+def test_partial_window_keeps_the_appended_rows():
+    buffer = filled_buffer(3)
+    assert len(buffer) == 3
+    np.testing.assert_array_equal(buffer.column('time_open'), [0, 1, 2])
+
+
+def test_window_stays_chronological_after_wrapping_around():
+    for rows in range(CAPACITY, 3 * CAPACITY + 2):
+        buffer = filled_buffer(rows)
+        assert len(buffer) == CAPACITY
+        np.testing.assert_array_equal(buffer.column('time_open'), np.arange(rows - CAPACITY, rows))
+        np.testing.assert_array_equal(buffer.column('close'), 10. * np.arange(rows - CAPACITY, rows))
+        assert buffer.last('time_open') == rows - 1
+
+
+def test_replace_last_after_wrapping_around():
+    buffer = filled_buffer(CAPACITY + 1)
+    buffer.replace_last([CAPACITY, -1.])
+    np.testing.assert_array_equal(buffer.column('close'), [10., 20., 30., -1.])
+    buffer.append([CAPACITY + 1, 50.])
+    np.testing.assert_array_equal(buffer.column('close'), [20., 30., -1., 50.])
+
+
+def test_dataframe_is_a_view_of_the_window():
+    buffer = filled_buffer(CAPACITY + 2)
+    dataframe = buffer.to_dataframe()
+    assert list(dataframe.columns) == ['time_open', 'close']
+    np.testing.assert_array_equal(dataframe['time_open'], [2, 3, 4, 5])
+    assert np.shares_memory(dataframe['close'].to_numpy(), buffer.values)
+    buffer.append([6, 60.])
+    assert buffer.to_dataframe() is not dataframe
+
+
+def test_clear_empties_the_window():
+    buffer = filled_buffer(CAPACITY + 1)
+    buffer.clear()
+    assert len(buffer) == 0
+    buffer.append([9, 90.])
+    np.testing.assert_array_equal(buffer.column('time_open'), [9])
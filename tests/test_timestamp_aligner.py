@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from binance_bot.constants import KlineProps
+from binance_bot.processing.timestamp_aligner import MissingKlinePolicy, TimestampAligner
+
+TIMELINE = np.array([0., 1., 2., 3., 4.])
+# The pair has no kline at 2 and its first kline is opened after the timeline start
+TIME_OPENS = {'BTCUSDT': np.array([1., 3., 4.])}
+VALUES = {'BTCUSDT': np.array([[1., 10.], [3., 30.], [4., 40.]])}
+
+
+def test_forward_fill_uses_the_previous_kline():
+    keep, aligned = TimestampAligner(MissingKlinePolicy.FORWARD_FILL).align(TIMELINE, TIME_OPENS, VALUES)
+    assert keep.all()
+    np.testing.assert_array_equal(aligned['BTCUSDT'][:, 1], [np.nan, 10., 10., 30., 40.])
+
+
+def test_drop_removes_timestamps_without_a_kline():
+    keep, aligned = TimestampAligner(MissingKlinePolicy.DROP).align(TIMELINE, TIME_OPENS, VALUES)
+    np.testing.assert_array_equal(keep, [False, True, False, True, True])
+    np.testing.assert_array_equal(aligned['BTCUSDT'][:, 1], [10., 30., 40.])
+
+
+def test_wait_fills_like_forward_fill_and_reports_pairs_behind():
+    aligner = TimestampAligner(MissingKlinePolicy.WAIT)
+    keep, aligned = aligner.align(TIMELINE, TIME_OPENS, VALUES)
+    assert keep.all()
+    np.testing.assert_array_equal(aligned['BTCUSDT'][:, 1], [np.nan, 10., 10., 30., 40.])
+    assert aligner.pairs_behind(5., {'BTCUSDT': 4., 'ETHUSDT': 5.}) == ['BTCUSDT']
+    assert aligner.pairs_behind(4., {'BTCUSDT': 4.}) == []
+
+
+def test_align_dataframes_prefixes_the_columns_and_drops_target_klines():
+    target = pd.DataFrame({KlineProps.TIME_OPEN: TIMELINE, KlineProps.CLOSE: TIMELINE * 100})
+    pair = pd.DataFrame({KlineProps.TIME_OPEN: TIME_OPENS['BTCUSDT'], KlineProps.CLOSE: VALUES['BTCUSDT'][:, 1]})
+    target, aligned = TimestampAligner(MissingKlinePolicy.DROP).align_dataframes(target, {'BTCUSDT': pair})
+    assert list(target[KlineProps.TIME_OPEN]) == [1., 3., 4.]
+    assert list(aligned.columns) == ['BTCUSDT_' + KlineProps.TIME_OPEN, 'BTCUSDT_' + KlineProps.CLOSE]
+    assert list(aligned['BTCUSDT_' + KlineProps.CLOSE]) == [10., 30., 40.]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        TimestampAligner('interpolate')
@@ -1,34 +1,71 @@
-import time
+"""
+Train the strategy on random batches of the history in parallel epochs. With --batch, backtest it instead on the
+whole history after the indicator warm-up in one vectorized pass (see BatchSimulator).
 
-from binance.helpers import interval_to_milliseconds
+Usage: python train.py [--batch]
+"""
+import argparse
 
-from binance_bot.client.binance_client import BinanceClient
-from binance_bot.configs.credentials import Credentials
 from binance_bot.configs.feature_config import FeatureConfig
 from binance_bot.configs.main_config import MainConfig
-from binance_bot.constants import KlineProps
-from binance_bot.executor.strategy_executor import StrategyExecutor
-from binance_bot.executor.training_executor import TrainingExecutor
+from binance_bot.executor.batch_simulator import BatchSimulator
+from binance_bot.executor.parallel_training_runner import ParallelTrainingRunner
+from binance_bot.instrumentation import instrumentation
+from binance_bot.processing.feature_cache import FeatureCache
 from binance_bot.processing.feature_calculator import FeatureCalculator
-from binance_bot.state.single_asset_state import SingleAssetState, DataFrameMissmatchError
+from binance_bot.state.portfolio import Portfolio
 from binance_bot.state.training_state import TrainingState
 from binance_bot.strategy.random_strategy import RandomStrategy
 
 main_config = MainConfig()
 
-feature_calc = FeatureCalculator(FeatureConfig())
-state = TrainingState(main_config=main_config, feature_calculator=feature_calc)
-strategy = RandomStrategy(main_config)
-executor = TrainingExecutor(state=state, main_config=main_config)
+feature_cache = FeatureCache(
+    cache_dir=main_config.FEATURE_CACHE_DIR,
+    max_bytes=main_config.FEATURE_CACHE_MAX_MB * 1024 * 1024
+)
+feature_calc = FeatureCalculator(FeatureConfig(), feature_cache=feature_cache)
 
 
 EPOCHS = 100
+SEED = 0
+# Base balance at the start of a batch backtest
+INITIAL_BASE_BALANCE = 10000
 
-for epoch in range(0, EPOCHS):
-    state.next_batch()
-    for _ in range(0, state.BATCH_SIZE):
-        state.next_step()
-        print("Current asset value:", str(state.get_total_asset_value()))
-        action = strategy.apply(klines=state.klines, features=state.features, assets=state.assets)
-        executor.execute(action)
-    print("################ Asset value at end of epoch:", str(state.get_total_asset_value()))
+
+def run_batch_backtest() -> None:
+    state = TrainingState(main_config=main_config, feature_calculator=feature_calc)
+    klines = state.target_pair_table.iloc[state.warm_up_length:]
+    features = state.feature_table.iloc[state.warm_up_length:]
+    assets = Portfolio(symbols=[main_config.TARGET_SYMBOL, main_config.BASE_SYMBOL], free=[0, INITIAL_BASE_BALANCE])
+    _, asset_values = BatchSimulator(main_config).run(
+        RandomStrategy(main_config, seed=SEED),
+        klines=klines,
+        features=features,
+        assets=assets
+    )
+    print(f"Backtest over {klines.shape[0]} klines")
+    print("Asset value at start of backtest:", str(INITIAL_BASE_BALANCE))
+    print("Asset value at end of backtest:", str(asset_values[-1]))
+
+
+def run_training() -> None:
+    if main_config.INSTRUMENTATION_ENABLED:
+        instrumentation.enable(trace_path=main_config.INSTRUMENTATION_TRACE_FILE)
+        instrumentation.start_http_server(port=main_config.INSTRUMENTATION_HTTP_PORT)
+    runner = ParallelTrainingRunner(main_config=main_config, feature_calculator=feature_calc)
+    asset_values = runner.run(epochs=EPOCHS, seed=SEED)
+    for epoch_asset_values in asset_values:
+        print("################ Asset value at end of epoch:", str(epoch_asset_values[-1]))
+    print("Mean asset value at end of epoch:", str(asset_values[:, -1].mean()))
+    if main_config.INSTRUMENTATION_ENABLED:
+        print(instrumentation.render_prometheus())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch', action='store_true', help="backtest on the whole history instead of training")
+    args = parser.parse_args()
+    if args.batch:
+        run_batch_backtest()
+    else:
+        run_training()